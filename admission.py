@@ -0,0 +1,75 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from analyzer import DeadlineExceeded
+
+
+class Overloaded(Exception):
+    """Raised instead of queueing a request when the queue is already full."""
+
+
+class AdmissionController:
+    """Runs blocking analyses off the event loop, with bounded concurrency and queueing.
+
+    At most `concurrency` analyses run at once and at most `queue_depth`
+    more wait for a slot; anything beyond that is turned away right away
+    (Overloaded) instead of piling up. Every admitted request gets a
+    deadline of `timeout` seconds from admission, time spent queued
+    included; work that is still queued when it passes never starts, and
+    work already running is stopped by the walker's deadline checks.
+    """
+
+    def __init__(self, concurrency: int, queue_depth: int, timeout: float):
+        self.concurrency = concurrency
+        self.queue_depth = queue_depth
+        self.timeout = timeout
+        self.in_flight = 0
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="analysis")
+        return self._executor
+
+    async def run(self, fn, *args, timeout=None):
+        """Awaits fn(*args, deadline) on the executor.
+
+        `timeout` overrides the controller's for work that is known to
+        take longer, such as a whole batch. Only touched from the event
+        loop thread, so the in-flight count needs no lock.
+        """
+        if self.in_flight >= self.concurrency + self.queue_depth:
+            raise Overloaded("Too many analyses in progress")
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._get_executor(), _run_before, deadline, fn, args)
+            try:
+                # Cancelling drops the work if it is still queued
+                return await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded("Analysis deadline exceeded") from None
+        finally:
+            self.in_flight -= 1
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+
+def _run_before(deadline, fn, args):
+    # Queued past the deadline: don't start work nobody is waiting for
+    if time.monotonic() >= deadline:
+        raise DeadlineExceeded("Analysis deadline exceeded while queued")
+    return fn(*args, deadline)
+
+
+admission = AdmissionController(
+    concurrency=int(os.getenv("ANALYSIS_CONCURRENCY", "0")) or os.cpu_count() or 1,
+    queue_depth=int(os.getenv("ANALYSIS_QUEUE_DEPTH", "64")),
+    timeout=float(os.getenv("ANALYSIS_DEADLINE", "5")),
+)
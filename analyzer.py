@@ -1,212 +1,1062 @@
+import functools
+import os
 import re
-from tree_sitter import Language, Parser
-import tree_sitter_javascript as tsjs
-import tree_sitter_python as tspy
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from tree_sitter import Parser
+from operator_table import LINEAR, LOG, SORT, COLLECTION, COPY, GROW
+from complexity import Cost, ZERO, ONE, UNKNOWN, HEAP_PREFIX, split_variable
+from grammars import grammars
+from query_engine import QueryEngine
+from call_graph import build_call_graph
+from boundary_resolver import get_boundary_resolver, ResolverMemo
+from constant_table import build_constant_table
+from flat_tree import flatten
+from recursion import classify as classify_recurrences, REASONS as RECURSION_REASONS, DIVIDE, EXPONENTIAL
+
+# Bump whenever a change can alter results, so cached analyses are not reused.
+ANALYZER_VERSION = "9"
+
+
+# How a node's children are walked (see ComplexityAnalyzer._child_state)
+DEFAULT, SPLIT_LOOP, CALL, MEMBER, COMPREHENSION = range(5)
+
+# Python loop headers the regex fallback treats as constant
+NUMERIC_COMPARISON = re.compile(r'([<>]=?|[!=]=)\s*\d+')
+
+# --- SIZE VARIABLES ---
+# Sizes are named after the source text of the collection or count behind
+# them, so two loops over `arr` share one variable and `arr`, `grid[]` (an
+# element of grid) and `m` stay apart.
+
+# Properties that are a collection's size, not a collection
+SIZE_PROPERTIES = {"length", "size"}
+# Calls whose size is that of their (first or second) argument: range(n), len(xs)
+SIZE_FUNCTIONS = {"range", "len", "enumerate", "reversed", "sorted", "list", "set", "tuple", "dict", "zip"}
+# Wrappers that have the size of what they wrap
+TRANSPARENT_TYPES = {
+    "parenthesized_expression", "await_expression", "spread_element", "non_null_expression",
+    "unary_expression", "not_operator", "list_splat", "await",
+}
+COMPARISON_TYPES = {"binary_expression", "binary_operator", "comparison_operator", "boolean_operator"}
+# Loop counters compared against the bound (i in `i < n`) don't name a size
+UPPER_BOUND_OPERATORS = {"<", "<=", "!=", "!==", "not in"}
+PARAMETER_SKIP = {"self", "cls"}
+VARIABLE_ROOT = re.compile(r"[^.\[]*")
+
+# How many nodes the walker visits between deadline checks
+DEADLINE_CHECK_NODES = 1024
+# Summary of a leaf node that costs nothing: (cost, alloc, growth, volatile)
+LEAF = (ZERO, ZERO, ZERO, False)
+
+# --- SPACE ---
+# Extra space is what the code allocates (copies, new collections, kept
+# once) plus what it grows (one element per push/add, kept per iteration).
+
+# `[...xs]`, `{...obj}`, `[*xs]` copy what they spread
+SPREAD_TYPES = {"spread_element", "list_splat", "dictionary_splat"}
+SPREAD_CONTAINERS = {"array", "object", "list", "set", "tuple", "dictionary"}
+# `counts[x] = ...` grows counts when it was bound to one of these
+SUBSCRIPT_WRITE_TYPES = {"assignment_expression", "augmented_assignment_expression", "assignment", "augmented_assignment"}
+DICTIONARY_TYPES = {"object", "dictionary"}
+DICTIONARY_FUNCTIONS = {b"dict", b"defaultdict", b"Counter", b"OrderedDict"}
+
+
+class DeadlineExceeded(Exception):
+    """Raised from inside the walk when an analysis runs past its deadline."""
+
+
+class AnalysisContext:
+    """Per-analysis state, so a shared ComplexityAnalyzer can serve concurrent requests."""
+
+    def __init__(self, code_bytes: bytes, language: str, previous_summaries=None, deadline=None):
+        self.code_bytes = code_bytes
+        self.language = language
+        # time.monotonic() value the walk gives up at, or None for no limit
+        self.deadline = deadline
+        # Nodes the walker visited, and the deepest it went below a fold's root
+        self.nodes = 0
+        self.max_depth = 0
+        self.grammar = grammars.get(language)
+        self.matcher = self.grammar.matcher
+        self.cost = ZERO   # Symbolic cost of the whole tree (see complexity.py)
+        self.space = ZERO  # Extra space it needs, on the same terms
+
+        # Subtree summaries keyed by (start, end, type, chain flag). Only
+        # collected when the caller passes the previous run's table, along
+        # with `old_span` mapping a node's span back to the previous tree, or
+        # to None when the node was touched by an edit (see sessions.py).
+        self.previous_summaries = previous_summaries
+        self.summaries = {} if previous_summaries is not None else None
+        self.old_span = None
+        # Top-level nodes whose previous summaries stand for them whole: not
+        # flattened below their own slot
+        self.pruned = ()
+
+        # Local functions: the call graph, and each function's (cost, alloc,
+        # growth, volatile) summary memoized by node id and content hash, so a call to a known
+        # function reuses its cost instead of walking its body again
+        self.call_graph = None
+        # The tree as flat arrays, which the walker folds over (see flat_tree.py)
+        self.flat = None
+        self.function_types = self.grammar.function_types
+        self.function_summaries = {}
+        # Recursive functions: the ids of the component being solved (calls
+        # between them cost nothing until its recurrence is solved), and
+        # each solved function's Recurrence
+        self.solving = frozenset()
+        self.recurrences = {}
+        # Ids of functions called from outside their own component
+        self.called = frozenset()
+
+        # Constant bindings and the constancy/truthiness of loop-condition
+        # nodes, shared by every loop
+        self.constants = None
+        self.resolver_memo = ResolverMemo()
+
+    def check_deadline(self):
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            raise DeadlineExceeded("Analysis deadline exceeded")
+
+    def function_key(self, node):
+        return node.id, hash(self.code_bytes[node.start_byte:node.end_byte])
+
+    def cached_summary(self, start_byte, end_byte, node_type, is_chain):
+        span = (start_byte, end_byte)
+        if self.old_span is not None:
+            span = self.old_span(*span)
+            if span is None:
+                return None
+        return self.previous_summaries.get((span[0], span[1], node_type, is_chain))
+
+
+class ParserPool:
+    """Hands out one reusable Parser per (thread, language).
+
+    Parsers are not safe to share between threads, but creating one per
+    request is wasteful, so each worker thread keeps its own.
+    """
+
+    def __init__(self, registry):
+        self.registry = registry
+        self._local = threading.local()
+
+    def get(self, language: str) -> Parser:
+        parsers = getattr(self._local, "parsers", None)
+        if parsers is None:
+            parsers = self._local.parsers = {}
+        parser = parsers.get(language)
+        if parser is None:
+            parser = parsers[language] = Parser(self.registry.get(language).language)
+        return parser
+
 
 class ComplexityAnalyzer:
     def __init__(self):
-        try:
-            self.js_lang = Language(tsjs.language())
-            self.py_lang = Language(tspy.language())
-        except Exception as e:
-            print(f"Error loading languages: {e}")
-            raise e
-        
         # --- CONFIGURATION ---
-        self.iterators = [
-            b".map", b".filter", b".forEach", b".reduce", 
-            b".includes", b".indexOf", b".find", b".some", b".every"
-        ]
-        self.mutators = [
-            b".slice", b".splice", b".concat", b".shift", 
-            b".unshift", b".split", b".join", b".flat", b".reverse"
-        ]
-        self.statics = [
-            b"Array.from", b"Object.keys", b"Object.values", b"Object.entries"
-        ]
-        self.constructors = [
-            b"Set", b"Map", b"List", b"Dict"
-        ]
-        # NEW: Heap/Tree operations that imply O(log N)
-        self.log_ops = [
-            b".sort", b"MinPriorityQueue", b"MaxPriorityQueue", 
-            b".enqueue", b".dequeue", b"heapq", b"PriorityQueue"
-        ]
-        
-        self.linear_ops = self.iterators + self.mutators
+        # Grammars, node types and operator tables live in grammars.py and
+        # operator_table.py, loaded per language on first use
+        self.grammars = grammars
+        self.parsers = ParserPool(grammars)
+        self.query_engine = QueryEngine(self)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._kept = {}
+
+    def analyze(self, code: str, language: str = 'javascript', engine: str = 'walker'):
+        """Returns (complexity, reason) for `code`.
+
+        `language` is "javascript", "python" or "auto" to guess from the code.
+        engine="walker" visits every node with a TreeCursor; engine="query"
+        lets compiled tree-sitter queries find the loops/calls/constructors
+        and only scores those. Both produce the same result, except that
+        only the walker charges calls to local functions with their body's
+        cost.
+        """
+        language = self.resolve_language(language, code)
+        code_bytes = bytes(code, "utf8")
+        tree = self.parsers.get(language).parse(code_bytes)
+        return self.analyze_tree(AnalysisContext(code_bytes, language), tree, engine)
+
+    def analyze_report(self, code: str, language: str = 'javascript', deadline=None, stats=None):
+        """Whole-snippet time and space, plus one entry per named function or method.
+
+        With a `deadline` (a time.monotonic() value), raises DeadlineExceeded
+        once the walk runs past it. A `stats` dict gets the seconds spent in
+        "parse" and "traverse", and the "nodes" and "max_depth" of the walk.
+        """
+        language = self.resolve_language(language, code)
+        code_bytes = bytes(code, "utf8")
+        start = time.perf_counter()
+        tree = self.parsers.get(language).parse(code_bytes)
+        parsed = time.perf_counter()
+        ctx = AnalysisContext(code_bytes, language, deadline=deadline)
+        time_val, time_reason = self.analyze_tree(ctx, tree)
+        space_val, space_reason = self._describe_space(ctx.space)
+        if stats is not None:
+            stats.update(
+                parse=parsed - start, traverse=time.perf_counter() - parsed,
+                nodes=ctx.nodes, max_depth=ctx.max_depth,
+            )
+        return {
+            "time_complexity": time_val,
+            "time_reason": time_reason,
+            "space_complexity": space_val,
+            "space_reason": space_reason,
+            "functions": self.function_reports(ctx),
+        }
 
-    def analyze(self, code: str, language: str = 'javascript'):
-        parser = Parser()
-        if language == 'python':
-            parser.language = self.py_lang
+    def analyze_tree(self, ctx, tree, engine: str = 'walker'):
+        """Like analyze(), for a tree the caller already parsed from ctx.code_bytes."""
+        if ctx.constants is None:
+            self.resolve_constants(ctx, tree.root_node)
+        if engine == 'query':
+            self.query_engine.run(ctx, tree.root_node)
+        elif engine == 'walker':
+            root = tree.root_node
+            ctx.flat = flatten(root, self._kept_kinds(ctx.grammar)[1], spans=ctx.summaries is not None, prune=ctx.pruned)
+            ctx.call_graph = build_call_graph(ctx.language, ctx.grammar.language, root, ctx.code_bytes)
+            # Callees first, so every call to a local function finds its summary
+            components = ctx.call_graph.components()
+            ctx.called = ctx.call_graph.called_from_outside(components)
+            for component in components:
+                self._solve_component(ctx, component)
+            self._traverse(ctx, root)
+            # Functions still to summarize are flattened on their own (see _function_summary)
+            ctx.flat = None
         else:
-            parser.language = self.js_lang
-            
-        tree = parser.parse(bytes(code, "utf8"))
-        
-        self.code_bytes = bytes(code, "utf8")
-        self.max_depth = 0
-        self.found_log_op = False # Track if we found sorting/heap ops
-        
-        self._traverse(tree.root_node, current_depth=0, is_chain=False)
-        
+            raise ValueError(f"Unknown analysis engine: {engine}")
+        return self._describe(ctx.cost, ctx.recurrences.values())
+
+    def resolve_constants(self, ctx, root, reuse=None):
+        """Builds ctx's constant table, which loop-bound decisions read names from.
+
+        `reuse` is passed on to build_constant_table. Building it again
+        starts the resolver's memo over.
+        """
+        if ctx.constants is not None:
+            ctx.resolver_memo = ResolverMemo()
+        ctx.constants = build_constant_table(ctx.language, root, ctx.code_bytes, reuse)
+        ctx.resolver_memo.constants = ctx.constants.values
+
+    def function_reports(self, ctx):
+        reports = []
+        for node, name in ctx.call_graph.functions:
+            cost, alloc, growth, _ = self._function_summary(ctx, node)
+            complexity, reason = self._describe(cost, ctx.recurrences.values())
+            space, space_reason = self._describe_space(alloc + growth)
+            recurrence = ctx.recurrences.get(node.id)
+            if recurrence is not None:
+                reason = RECURSION_REASONS[recurrence.kind]
+            reports.append({
+                "name": name,
+                "start_line": node.start_point.row + 1,
+                "end_line": node.end_point.row + 1,
+                "complexity": complexity,
+                "reason": reason,
+                "space_complexity": space,
+                "space_reason": space_reason,
+            })
+        return reports
+
+    def _solve_component(self, ctx, component):
+        """Summarizes one strongly connected component of the call graph.
+
+        A recursive component is folded with its calls to itself costing
+        nothing, which leaves what one invocation costs; the recurrence
+        its recursive calls form (see recursion.py) then gives the total,
+        and its depth the space the pending calls hold.
+        """
+        if all(ctx.function_key(node) in ctx.function_summaries for node in component):
+            return
+        if not ctx.call_graph.is_recursive(component):
+            self._fold(ctx, component[0])
+            return
+
+        members = ctx.solving = frozenset(node.id for node in component)
+        body = body_space = ZERO
+        for node in component:
+            cost, alloc, growth, _ = self._fold(ctx, node)
+            body, body_space = body + cost, body_space + alloc + growth
+        ctx.solving = frozenset()
+
+        sites, parameters = {}, {}
+        for node in component:
+            sites[node.id] = [
+                (call, self._bind_arguments(ctx, call, target))
+                for call, target in ctx.call_graph.call_sites.get(node.id, ())
+                if target.id in members
+            ]
+            parameters[node.id] = self._parameter_names(ctx, node)
+        recurrences = classify_recurrences(ctx, component, sites, parameters, lambda node: self._repeats(ctx, node))
+        for node in component:
+            recurrence = ctx.recurrences[node.id] = recurrences[node.id]
+            ctx.function_summaries[ctx.function_key(node)] = (
+                recurrence.solve(body), recurrence.solve_space(body_space), ZERO, True)
+
+    def _function_summary(self, ctx, node):
+        summary = ctx.function_summaries.get(ctx.function_key(node))
+        if summary is None:
+            self._fold(ctx, node)
+            summary = ctx.function_summaries[ctx.function_key(node)]
+        return summary
+
+    def resolve_language(self, language: str, code: str = None) -> str:
+        # Anything we don't know is analyzed as JavaScript; "auto" looks at the code
+        return self.grammars.resolve(language, code)
+
+    def _describe(self, cost, recurrences=()):
         # --- RESULT REASONING ---
-        
+        degree = cost.degree()
+        # Log factors only matter on the terms that set the degree
+        leading = [term for term in cost.terms if term.degree() == degree]
+        has_log = any(term.log_degree() for term in leading)
+        complexity = f"O({cost.format()})"
+
+        if cost.is_exponential():
+            recurrence = self._recurrence_behind(leading, recurrences, EXPONENTIAL)
+            return complexity, RECURSION_REASONS[EXPONENTIAL] if recurrence else "Branching recursion grows exponentially"
+
+        # A log factor a divide-and-conquer recursion accounts for
+        if has_log and self._recurrence_behind(leading, recurrences, DIVIDE):
+            return complexity, RECURSION_REASONS[DIVIDE]
+
         # Case 1: Log Linear (Sorting or Heap in a loop)
-        # If we have depth 1 (Loop) AND a Log Op (Heap/Sort), it's N log N
-        if self.max_depth == 1 and self.found_log_op:
-             return "O(N log N)", "Heap operations or Sorting detected in linear flow"
+        if degree == 1 and has_log:
+            return complexity, "Heap operations or Sorting detected in linear flow"
 
         # Case 2: Standard Depths
-        if self.max_depth == 0:
+        if degree == 0:
+            if has_log:
+                return complexity, "Heap operations detected"
             return "O(1)", "Constant time operations"
-        elif self.max_depth == 1:
-            return "O(N)", "Single loop or linear operation detected"
+        elif degree == 1:
+            return complexity, "Single loop or linear operation detected"
         else:
-            return f"O(N^{self.max_depth})", f"Nested loops/operations detected (Depth {self.max_depth})"
+            return complexity, f"Nested loops/operations detected (Depth {degree})"
+
+    def _recurrence_behind(self, leading, recurrences, kind):
+        """A solved recurrence of `kind`, preferably one whose variable grows in
+        the `leading` terms (a call can rename it after its argument)."""
+        candidates = [recurrence for recurrence in recurrences if recurrence.kind == kind]
+        for recurrence in candidates:
+            if any(recurrence.variable in term.growth() for term in leading):
+                return recurrence
+        return candidates[0] if candidates else None
+
+    def _describe_space(self, space):
+        degree = space.degree()
+        complexity = f"O({space.format()})"
+        if degree == 0:
+            if space.has_log():
+                return complexity, "Logarithmic recursion depth"
+            return "O(1)", "Constant extra space"
+        if degree == 1:
+            return complexity, "Collections or copies proportional to the input"
+        return complexity, f"Nested collections or copies (Depth {degree})"
+
+    def analyze_many(self, snippets, max_workers=None, chunk_size: int = 64, deadline=None, timeout=None):
+        """Analyzes (code, language) pairs across worker processes.
+
+        Returns one (report, error) pair per snippet, in input order, where
+        report is what analyze_report() returns. A snippet that fails only
+        gets an error string of its own. Each snippet gets at most `timeout`
+        seconds, and none runs past `deadline` (a time.monotonic() value,
+        which worker processes on the same host share); those that do fail
+        with DeadlineExceeded.
+        """
+        snippets = list(snippets)
+        chunks = [snippets[i:i + chunk_size] for i in range(0, len(snippets), chunk_size)]
+
+        # Not worth the IPC round-trip for a single chunk
+        if len(chunks) <= 1 or max_workers == 1:
+            return [item for chunk in chunks for item in _analyze_chunk(chunk, self, deadline, timeout)]
+
+        results = []
+        task = functools.partial(_analyze_chunk, deadline=deadline, timeout=timeout)
+        try:
+            for chunk_results in self._get_pool(max_workers).map(task, chunks):
+                results.extend(chunk_results)
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory); fail what's left, not the whole batch
+            self.shutdown()
+            error = "BrokenProcessPool: analysis worker crashed"
+            results.extend((None, error) for _ in range(len(snippets) - len(results)))
+        return results
+
+    def _get_pool(self, max_workers=None):
+        with self._pool_lock:
+            if self._pool is None:
+                workers = max_workers or int(os.getenv("ANALYSIS_WORKERS", "0")) or os.cpu_count()
+                self._pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+            return self._pool
+
+    def preload(self, languages=None):
+        """Loads everything analyses otherwise build on first use: grammars,
+        operator matchers, flat-tree kind sets, capture queries and the
+        boundary resolver. Used before forking workers, so they inherit it
+        all instead of each building their own copy."""
+        languages = list(self.grammars.node_types if languages is None else languages)
+        for language in languages:
+            grammar = self.grammars.get(language)
+            self._kept_kinds(grammar)
+            self.query_engine.compile(grammar)
+        get_boundary_resolver()
+        return languages
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
+
+    def _traverse(self, ctx, root):
+        ctx.cost, alloc, growth, _ = self._fold(ctx, root)
+        ctx.space = alloc + growth
+
+    def _fold(self, ctx, root):
+        """Folds per-node costs bottom-up; returns (cost, alloc, growth, volatile) for root.
+
+        Runs over ctx.flat, the tree flattened into integer arrays, so most
+        nodes cost a few list lookups and never become Node objects; only
+        the kinds _score needs (see _kept_kinds) are looked up as Nodes, and
+        only when no summary stands in for them.
+        The walk is iterative, so deeply nested input can't hit the
+        recursion limit; `frames` holds one entry per ancestor of the
+        current node, so memory is bounded by tree depth.
+
+        A node's cost is what running it once costs, which doesn't depend on
+        where the node sits: its own work, plus its children's costs, with
+        the children inside it (a loop's body, a linear call's callback)
+        multiplied by its size. Space is folded in the same pass: what a
+        node allocates (a copy, a new collection) is counted once, what it
+        grows (a push, an add) is multiplied like time. When the context
+        carries summaries from a previous version of the tree, any subtree
+        an edit didn't touch is looked up instead of walked again. Subtrees
+        that call a local function are "volatile": their cost depends on
+        code elsewhere, so they are never reused that way.
 
-    def _traverse(self, node, current_depth, is_chain=False):
-        node_type = node.type
-        cost = 0
+        Every function node folded here has its summary memoized in
+        ctx.function_summaries, and is looked up there on later visits.
+        """
+        flat = ctx.flat
+        if flat is None or root.id not in flat.index:
+            # A function under a reused summary, or inside a pruned statement:
+            # the whole tree's arrays are gone (see analyze_tree) or leave it
+            # out, so only this one is flattened
+            ctx.flat = flatten(root, self._kept_kinds(ctx.grammar)[1], spans=ctx.summaries is not None)
+            try:
+                return self._fold(ctx, root)
+            finally:
+                ctx.flat = flat
+        types, fields, after = flat.types, flat.fields, flat.after
+        starts, ends = flat.start, flat.end
+        scored_kinds = self._kept_kinds(ctx.grammar)[0]
+        type_names, field_names = ctx.grammar.type_names, ctx.grammar.field_names
+        function_types, member_type = ctx.function_types, ctx.grammar.member_type
+
+        pruned = flat.pruned
+        i = flat.index[root.id]
+        frames = []
+        inside, is_chain = False, False
+        previous, summaries = ctx.previous_summaries, ctx.summaries
+        # Counts down to the next deadline check; never reaches 0 without a deadline
+        budget = 1 if ctx.deadline is not None else -1
+        visited = deepest = 0
+
+        while True:
+            visited += 1
+            budget -= 1
+            if not budget:
+                ctx.check_deadline()
+                budget = DEADLINE_CHECK_NODES
+            kind_id = types[i]
+            node_type = type_names[kind_id]
+            scored = kind_id in scored_kinds
+            child = i + 1 if after[i] > i + 1 else -1
+            summary = node = None
+            if not scored:
+                if child == -1 and not (pruned and i in pruned):
+                    # A leaf _score has nothing to say about (a name, a literal,
+                    # a token); a pruned slot is not one, a summary stands for it
+                    summary = LEAF
+            elif node_type in function_types:
+                node = flat.node(i)
+                summary = ctx.function_summaries.get(ctx.function_key(node))
+            if summary is None and previous is not None:
+                cached = ctx.cached_summary(starts[i], ends[i], node_type, is_chain)
+                if cached is not None:
+                    summary = cached + (False,)
+                    summaries[(starts[i], ends[i], node_type, is_chain)] = cached
+                    if node_type in function_types:
+                        ctx.function_summaries[ctx.function_key(node)] = summary
+
+            if summary is not None:
+                cost, alloc, growth, volatile = summary
+            else:
+                if not scored:
+                    # Only loops, calls and the like are scored; anything else is
+                    # a member access (which passes the chain flag on) or plain
+                    kind = MEMBER if node_type == member_type else DEFAULT
+                    size, pass_chain, own, alloc, growth, volatile = None, is_chain, ZERO, ZERO, ZERO, False
+                else:
+                    kind, size, pass_chain, own, alloc, growth, local = self._score(ctx, node_type, node or flat.node(i), is_chain)
+                    volatile = False
+                    if local is not None:
+                        own, alloc, growth = own + local[0], alloc + local[1], growth + local[2]
+                        volatile = True
+                if child != -1:
+                    # frame: slot, type, its chain flag and whether it sits inside its
+                    # parent, how children are walked, its size, the time of its own
+                    # work and children outside it and of its children inside it, what
+                    # it and its children allocate, what it and its children
+                    # outside/inside it grow, volatile, and whether it keeps what
+                    # its children allocate (out.push(new Array(m)))
+                    frames.append([i, node_type, is_chain, inside, kind, size, pass_chain, own, ZERO, alloc, growth, ZERO, volatile, growth is not ZERO])
+                    if len(frames) > deepest:
+                        deepest = len(frames)
+                    field = field_names[fields[child]]
+                    if kind == COMPREHENSION:
+                        field = field or type_names[types[child]]
+                    inside, is_chain = self._child_state(kind, size, pass_chain, field)
+                    i = child
+                    continue
+                cost = own if size is None else self._total(own, ZERO, size)
+                self._finish(ctx, i, node_type, is_chain, cost, alloc, growth, volatile)
+
+            # Fold finished nodes into their parents until one has a next sibling
+            while True:
+                if not frames:
+                    ctx.nodes += visited
+                    ctx.max_depth = max(ctx.max_depth, deepest)
+                    return cost, alloc, growth, volatile
+                if node_type in function_types and flat.node(i).id in ctx.called:
+                    # A function called locally runs where it's called, not where it's defined
+                    cost, alloc, growth, volatile = ZERO, ZERO, ZERO, True
+                frame = frames[-1]
+                if cost is not ZERO:
+                    frame[8 if inside else 7] += cost
+                if alloc is not ZERO:
+                    frame[9] += alloc
+                if growth is not ZERO:
+                    frame[11 if inside else 10] += growth
+                frame[12] = frame[12] or volatile
+                sibling = after[i]
+                if sibling < after[frame[0]]:
+                    kind = frame[4]
+                    field = field_names[fields[sibling]]
+                    if kind == COMPREHENSION:
+                        field = field or type_names[types[sibling]]
+                    inside, is_chain = self._child_state(kind, frame[5], frame[6], field)
+                    i = sibling
+                    break
+                frames.pop()
+                i, node_type, is_chain, inside, _, size, _, outer, inner, alloc, growth, grown, volatile, retains = frame
+                cost = self._total(outer, inner, size)
+                if retains and alloc is not ZERO:
+                    # Kept once per run, like the element it is pushed as
+                    growth, alloc = growth + alloc, ZERO
+                if grown is not ZERO:
+                    growth = growth + (grown if size is None else size * grown)
+                self._finish(ctx, i, node_type, is_chain, cost, alloc, growth, volatile)
+
+    def _total(self, outer, inner, size):
+        """Cost of a node: its own work and outer children once, inner children `size` times."""
+        if size is None:
+            return outer + inner if inner is not ZERO else outer
+        # A heap filled inside a loop grows with the loop
+        return outer + size * (ONE + inner.bind_heaps(size))
+
+    def _finish(self, ctx, i, node_type, is_chain, cost, alloc, growth, volatile):
+        """Records a freshly folded node's summary where later walks can find it."""
+        flat = ctx.flat
+        if node_type in ctx.function_types:
+            ctx.function_summaries[ctx.function_key(flat.node(i))] = (cost, alloc, growth, volatile)
+        if ctx.summaries is not None and not volatile and flat.after[i] > i + 1:
+            ctx.summaries[(flat.start[i], flat.end[i], node_type, is_chain)] = (cost, alloc, growth)
+
+    def _kept_kinds(self, grammar):
+        """(Node kinds _score reads as Nodes, the function kinds among them that
+        folds start from); only the latter are held by the flat tree, the
+        rest are looked up by slot when scored."""
+        kinds = self._kept.get(grammar.name)
+        if kinds is None:
+            names = set(grammar.loop_types) | grammar.comprehension_types | grammar.function_types
+            names |= SPREAD_TYPES | SUBSCRIPT_WRITE_TYPES | {grammar.call_type, grammar.new_type}
+            kinds = self._kept[grammar.name] = (grammar.kind_ids(names), grammar.kind_ids(grammar.function_types))
+        return kinds
+
+    def _score(self, ctx, node_type, node, is_chain):
+        """Returns (how children are walked, size its inner children run, chain flag
+        for the callee, its own cost, what it allocates, what it grows, and the
+        (cost, alloc, growth) of the local function it calls or None).
+
+        `node` is None unless `node_type` is one of the _kept_kinds."""
+        grammar = ctx.grammar
+        size = None
         is_linear = False
+        own = alloc = growth = ZERO
+        local_cost = None
         
         # --- 1. IDENTIFY NODE COST ---
         
         # Loops
-        if node_type in ["for_statement", "while_statement", "do_statement", "for_of_statement", "for_in_statement"]:
-            if self._is_constant_loop(node):
-                cost = 0
-            else:
-                cost = 1
+        if node_type in grammar.loop_types:
+            size = self._loop_size(ctx, node)
+
+        # Comprehensions: one factor per for-clause over a non-constant iterable
+        elif node_type in grammar.comprehension_types:
+            size = self._comprehension_size(ctx, node)
+            if node_type != "generator_expression":
+                alloc = size
                 
         # Methods
-        elif node_type == "call_expression":
-            if self._is_log_op(node):
-                self.found_log_op = True
-                # Log ops don't add "Integer Depth" (N^2), they add a "Log Factor"
-                # We track them separately.
-            elif self._is_linear_method(node) or self._is_static_linear(node):
+        elif node_type == grammar.call_type:
+            function = node.child_by_field_name("function")
+            kind = ctx.matcher.classify_callee(function, ctx.code_bytes)
+            if kind == COLLECTION:
+                # list(xs) copies xs; list() and dict(a=1) build from nothing
+                kind = LINEAR if self._is_linear_constructor(ctx, node) else None
+            if kind == LINEAR:
                 is_linear = True
-                if is_chain: cost = 0
-                else: cost = 1
+                if not is_chain:
+                    size = self._call_size(ctx, node)
+            else:
+                own = self._call_cost(ctx, node, kind)
+
+            space_kind = grammar.space_matcher.classify_callee(function, ctx.code_bytes)
+            if space_kind == COPY and not is_chain:
+                # A chain of copies (xs.map(f).filter(g)) is sized once, at its end
+                alloc = size if size is not None else self._copy_size(ctx, node)
+            elif space_kind == GROW:
+                growth = ONE
+
+            # Calls to functions defined in this file cost what their body costs,
+            # with its parameters' sizes replaced by the arguments'. Recursive
+            # calls are accounted for by the recurrence instead (_solve_component).
+            target = ctx.call_graph.call_targets.get(node.id) if ctx.call_graph else None
+            if target is not None:
+                local_cost = self._local_call_cost(ctx, node, target)
 
         # New Expressions (Constructors)
-        elif node_type == "new_expression":
-            if self._is_log_op(node): # new MinPriorityQueue
-                self.found_log_op = True
-            elif self._is_linear_constructor(node):
-                cost = 1
-
-        # --- 2. UPDATE DEPTH ---
-        next_depth = current_depth + cost
-        self.max_depth = max(self.max_depth, next_depth)
-        
-        # --- 3. RECURSE (THE SMART PART) ---
-        
+        elif node_type == grammar.new_type:
+            kind = ctx.matcher.classify_constructor(node.child_by_field_name("constructor"), ctx.code_bytes)
+            if kind == COLLECTION and self._is_linear_constructor(ctx, node):
+                size = alloc = self._call_size(ctx, node)
+
+        # Spreads into a new array/object, and writes to a dictionary
+        elif node_type in SPREAD_TYPES:
+            # A copy takes as long to make as it takes space
+            own = alloc = self._spread_size(ctx, node)
+        elif node_type in SUBSCRIPT_WRITE_TYPES:
+            if self._writes_dictionary(ctx, node):
+                growth = ONE
+
+        # --- 2. PICK HOW CHILDREN ARE WALKED ---
+        if node_type in grammar.split_loop_types:
+            return SPLIT_LOOP, size, False, own, alloc, growth, local_cost
+        if node_type in grammar.comprehension_types:
+            return COMPREHENSION, size, False, own, alloc, growth, local_cost
+        if node_type == grammar.call_type:
+            return CALL, size, is_linear or is_chain, own, alloc, growth, local_cost
+        if node_type == grammar.member_type:
+            return MEMBER, size, is_chain, own, alloc, growth, local_cost
+        return DEFAULT, size, False, own, alloc, growth, local_cost
+
+    def _child_state(self, kind, size, chain, field_name):
+        """Whether a child runs inside its parent (`size` times), and its chain flag,
+        given the parent's walk kind and the child's field."""
+
         # SPECIAL HANDLING: LOOPS
         # We must split the "Header" (Outer Scope) from the "Body" (Inner Scope)
-        if node_type in ["for_statement", "for_of_statement", "for_in_statement", "while_statement"]:
-            body_node = node.child_by_field_name("body")
-            
-            # 1. Traverse everything EXCEPT body at CURRENT_DEPTH
-            # This ensures Object.entries() in the header is NOT multiplied by the loop
-            for child in node.children:
-                if child != body_node:
-                    self._traverse(child, current_depth, is_chain=False)
-            
-            # 2. Traverse Body at NEXT_DEPTH
-            if body_node:
-                self._traverse(body_node, next_depth, is_chain=False)
-                
-            return # Done with this node
-            
-        # SPECIAL HANDLING: CALLS (Chaining)
-        if node_type == "call_expression":
-            function_node = node.child_by_field_name("function")
-            arguments_node = node.child_by_field_name("arguments")
-            
-            if function_node:
-                self._traverse(function_node, next_depth, is_chain=(is_linear or is_chain))
-            
-            if arguments_node:
-                self._traverse(arguments_node, next_depth, is_chain=False)
-                
-            for child in node.children:
-                if child != function_node and child != arguments_node:
-                    self._traverse(child, next_depth, is_chain=False)
-            return
+        # This ensures Object.entries() in the header is NOT multiplied by the loop
+        if kind == SPLIT_LOOP:
+            return field_name == "body", False
 
-        # SPECIAL HANDLING: MEMBERS (Chaining)
-        if node_type == "member_expression":
-            object_node = node.child_by_field_name("object")
-            property_node = node.child_by_field_name("property")
-            if object_node: self._traverse(object_node, next_depth, is_chain=is_chain)
-            if property_node: self._traverse(property_node, next_depth, is_chain=False)
-            return
+        # A comprehension's element runs inside every for-clause; the clauses
+        # themselves (and the first iterable) are walked outside. Conditions
+        # run per element too, but have no field, so they are passed as
+        # their node type (see _fold).
+        if kind == COMPREHENSION:
+            return field_name == "body" or field_name == "if_clause", False
+
+        # SPECIAL HANDLING: CALLS / MEMBERS (Chaining)
+        # The callee of a linear call (and the object of a chained member) is
+        # part of the same chain, so it doesn't multiply again
+        if kind == CALL and field_name == "function":
+            return True, chain
+        if kind == MEMBER and field_name == "object":
+            return True, chain
 
-        # Default Recursion
-        for child in node.children:
-            self._traverse(child, next_depth, is_chain=False)
+        return True, False
 
     # --- HELPER FUNCTIONS ---
 
-    def _is_constant_loop(self, node):
-        condition_node = node.child_by_field_name("condition")
-        collection_node = node.child_by_field_name("right") 
-        target_text = ""
-        if condition_node:
-            target_text = self.code_bytes[condition_node.start_byte:condition_node.end_byte].decode('utf8', errors='ignore')
-        else:
-            header_end = min(node.end_byte, node.start_byte + 150) 
-            target_text = self.code_bytes[node.start_byte:header_end].decode('utf8', errors='ignore')
-        is_numeric_comparison = re.search(r'([<>]=?|[!=]=)\s*\d+', target_text)
-        is_python_range = re.search(r'range\s*\(\s*\d+\s*\)', target_text)
-        return bool(is_numeric_comparison or is_python_range)
-
-    def _get_node_text(self, node):
-        end = min(node.end_byte, node.start_byte + 50)
-        return self.code_bytes[node.start_byte:end]
-
-    def _is_log_op(self, node):
-        text = self._get_node_text(node)
-        for op in self.log_ops:
-            if op in text: return True
+    def _is_constant_loop(self, ctx, node):
+        if ctx.language == "javascript":
+            return self._is_constant_js_loop(ctx, node)
+        if node.type == "while_statement":
+            condition = node.child_by_field_name("condition")
+            target_text = ctx.code_bytes[condition.start_byte:condition.end_byte].decode('utf8', errors='ignore')
+            return bool(NUMERIC_COMPARISON.search(target_text))
+        # for_statement / for_in_clause: bounded by a literal collection or range(<ints>)
+        iterable = node.child_by_field_name("right")
+        if iterable is None:
+            return False
+        if iterable.type in ("list", "tuple", "set", "string"):
+            return True
+        if iterable.type == "call":
+            function = iterable.child_by_field_name("function")
+            arguments = iterable.child_by_field_name("arguments")
+            if function is None or arguments is None or ctx.code_bytes[function.start_byte:function.end_byte] != b"range":
+                return False
+            return bool(arguments.named_children) and all(
+                arg.type == "integer" or (arg.type == "unary_operator" and arg.named_child(0).type == "integer")
+                for arg in arguments.named_children
+            )
         return False
 
-    def _is_linear_method(self, node):
-        text = self._get_node_text(node)
-        for op in self.linear_ops:
-            if op in text: return True
-        return False
+    def _is_constant_js_loop(self, ctx, node):
+        if node.type == "for_in_statement":
+            return get_boundary_resolver().is_constant(node.child_by_field_name("right"), ctx.resolver_memo)
+        condition = node.child_by_field_name("condition")
+        # for (;;) has an empty_statement where the condition would be
+        if condition is None or condition.type == "empty_statement":
+            return False
+        if condition.type == "expression_statement":
+            condition = condition.named_child(0)
+        return get_boundary_resolver().is_bounded_loop(condition, ctx.resolver_memo)
 
-    def _is_static_linear(self, node):
-        text = self._get_node_text(node)
-        for op in self.statics:
-            if op in text: return True
+    def _repeats(self, ctx, node):
+        """Whether `node` is a loop or comprehension that runs a non-constant number of times."""
+        if node.type in ctx.grammar.loop_types:
+            return not self._is_constant_loop(ctx, node)
+        if node.type in ctx.grammar.comprehension_types:
+            return self._comprehension_size(ctx, node) is not ONE
         return False
 
-    def _is_linear_constructor(self, node):
-        constructor_name = ""
-        constructor_node = node.child_by_field_name("constructor")
-        if constructor_node:
-            constructor_name = self.code_bytes[constructor_node.start_byte:constructor_node.end_byte].decode('utf8')
-        
-        if constructor_name not in ["Set", "Map", "Array", "List", "Dict"]:
+    def _loop_size(self, ctx, node):
+        if self._is_constant_loop(ctx, node):
+            return ONE
+        return Cost.var(self._loop_variable(ctx, node))
+
+    def _comprehension_size(self, ctx, node):
+        size = ONE
+        for clause in node.named_children:
+            if clause.type == "for_in_clause" and not self._is_constant_loop(ctx, clause):
+                size = size * Cost.var(self._loop_variable(ctx, clause))
+        return size
+
+    def _call_size(self, ctx, node):
+        """Size of the collection a linear call or constructor walks."""
+        return Cost.var(self.size_variable(ctx, node) or UNKNOWN)
+
+    def _call_cost(self, ctx, node, kind):
+        """Own cost of a call that isn't linear: a heap operation or a sort."""
+        if kind == LOG:
+            # A heap operation costs log of the heap's size
+            return Cost.log(HEAP_PREFIX + (self.size_variable(ctx, node) or UNKNOWN))
+        if kind == SORT:
+            size = self._call_size(ctx, node)
+            return size * size.log_of()
+        return ZERO
+
+    def _spread_size(self, ctx, node):
+        """Size of the copy a spread makes: what it spreads, if it spreads into a new array/object."""
+        if node.parent is None or node.parent.type not in SPREAD_CONTAINERS:
+            return ZERO
+        return self._copy_size(ctx, node.named_child(0))
+
+    def _copy_size(self, ctx, node):
+        """Space a copy of what `node` reads takes: nothing if that has a constant size."""
+        name = self.size_variable(ctx, node)
+        return Cost.var(name) if name else ZERO
+
+    def _writes_dictionary(self, ctx, node):
+        """True for `counts[x] = ...` where counts was bound to {} or dict()."""
+        target = node.child_by_field_name("left")
+        if target is None or target.type not in ("subscript_expression", "subscript"):
             return False
+        target = target.child_by_field_name("object") or target.child_by_field_name("value")
+        value = ctx.constants.values.get(target.start_byte) if target.type == "identifier" else None
+        if value is None:
+            return False
+        if value.type == ctx.grammar.call_type:
+            function = value.child_by_field_name("function")
+            return ctx.code_bytes[function.start_byte:function.end_byte] in DICTIONARY_FUNCTIONS
+        return value.type in DICTIONARY_TYPES
+
+    def _text(self, ctx, node):
+        return ctx.code_bytes[node.start_byte:node.end_byte].decode('utf8', errors='ignore')
+
+    def size_variable(self, ctx, node, seen=None):
+        """Name of the size `node` stands for, or None if it has a constant size.
+
+        Follows what sets the size: `arr.length` and `len(arr)` are `arr`,
+        `Object.keys(obj)` is `obj`, `xs.filter(f)` is `xs`, a const bound to
+        any of those is what it's bound to, and a for-of variable over `xs`
+        is an element of it, `xs[]`. `seen` holds the nodes already followed
+        on the way here, so an alias of itself (`nums = sorted(nums)`) ends.
+        """
+        suffix, fallback = "", None
+        seen = set() if seen is None else set(seen)
+        while node is not None and node.id not in seen:
+            seen.add(node.id)
+            node_type = node.type
+
+            if node_type in TRANSPARENT_TYPES:
+                node = node.named_child(0) if node_type != "unary_expression" else node.child_by_field_name("argument")
+            elif node_type == "identifier":
+                name = self._text(ctx, node) + suffix
+                if node.start_byte in ctx.constants.values:
+                    node = ctx.constants.values[node.start_byte]
+                elif node.start_byte in ctx.constants.elements:
+                    node, suffix = ctx.constants.elements[node.start_byte], "[]" + suffix
+                else:
+                    return name
+                # If the alias leads nowhere nameable, the first name will do
+                fallback = fallback or name
+            elif node_type == ctx.grammar.member_type:
+                prop = node.child_by_field_name("property") or node.child_by_field_name("attribute")
+                if prop is None or self._text(ctx, prop) not in SIZE_PROPERTIES:
+                    return self._text(ctx, node) + suffix
+                node = node.child_by_field_name("object")
+            elif node_type in ("subscript_expression", "subscript"):
+                # xs[i] is an element of xs, but the slice xs[a:b] is (at most) xs
+                if node.child_by_field_name("subscript") is None or node.child_by_field_name("subscript").type != "slice":
+                    suffix = "[]" + suffix
+                node = node.child_by_field_name("object") or node.child_by_field_name("value")
+            elif node_type == ctx.grammar.call_type:
+                node = self._call_size_node(ctx, node, seen)
+            elif node_type == ctx.grammar.new_type:
+                node = next(iter(self._arguments(node)), None)
+            elif node_type in COMPARISON_TYPES:
+                node = next((side for side in node.named_children if self.size_variable(ctx, side, seen)), None)
+            else:
+                break
+        return fallback
+
+    def _call_size_node(self, ctx, node, seen=None):
+        """The node a call's result takes its size from (`seen` as in size_variable)."""
+        function = node.child_by_field_name("function")
+        arguments = self._arguments(node)
+        if function.type == ctx.grammar.member_type:
+            receiver = function.child_by_field_name("object")
+            if ctx.code_bytes[receiver.start_byte:receiver.end_byte] in ctx.matcher.namespaces:
+                # Object.keys(obj), heapq.heappush(heap, x)
+                return arguments[0] if arguments else None
+            return receiver
+        if self._text(ctx, function) in SIZE_FUNCTIONS:
+            # range(n) and range(0, n) are both n
+            sized = [arg for arg in arguments[:2] if self.size_variable(ctx, arg, seen)]
+            return sized[-1] if sized else None
+        # Anything else is taken to return something the size of what it is
+        # given (mergeSort(xs) is xs); with no sized argument, it names itself
+        return next((arg for arg in arguments if self.size_variable(ctx, arg, seen)), function)
+
+    def _arguments(self, node):
+        arguments = node.child_by_field_name("arguments")
+        if arguments is None:
+            return []
+        return [arg for arg in arguments.named_children if arg.type not in ("comment", "keyword_argument")]
+
+    def _loop_variable(self, ctx, node):
+        """Size variable for how many times a (non-constant) loop runs."""
+        iterable = node.child_by_field_name("right")
+        if iterable is not None:
+            if self._is_range(ctx, iterable):
+                bounds = self._arguments(iterable)[:2]
+                outer = self._outer_counter(ctx, bounds[-1]) if bounds else None
+                if outer is not None:
+                    return outer
+            return self.size_variable(ctx, iterable) or UNKNOWN
+        condition = node.child_by_field_name("condition")
+        counters = set()
+        if node.type == "for_statement":
+            counters = self._counters(ctx, node)
+        return self._bound_variable(ctx, condition, counters) or UNKNOWN
+
+    def _counters(self, ctx, node):
+        """Names a C-style for loop declares or steps; they count iterations, not size."""
+        counters, stack = set(), [node.child_by_field_name("initializer"), node.child_by_field_name("increment")]
+        while stack:
+            part = stack.pop()
+            if part is None:
+                continue
+            if part.type == "variable_declarator":
+                part = part.child_by_field_name("name")
+            elif part.type in ("update_expression", "assignment_expression", "augmented_assignment_expression"):
+                part = part.child_by_field_name("argument") or part.child_by_field_name("left")
+            else:
+                stack.extend(part.named_children)
+                continue
+            if part is not None and part.type == "identifier":
+                counters.add(self._text(ctx, part))
+        return counters
+
+    def _is_range(self, ctx, node):
+        return node.type == ctx.grammar.call_type and self._text(ctx, node.child_by_field_name("function")) == "range"
+
+    def _outer_counter(self, ctx, bound):
+        """Size variable of the enclosing loop whose counter `bound` names, or None.
+
+        `j < i` inside `for (let i = 0; i < n; i++)`, or `range(i)` inside
+        `for i in range(n)` (or an earlier comprehension clause), runs at
+        most n times: a triangle, not a second size.
+        """
+        if bound.type != "identifier":
+            return None
+        name = self._text(ctx, bound)
+        grammar = ctx.grammar
+        node = bound.parent
+        while node is not None:
+            if node.type in grammar.comprehension_types:
+                loops = [c for c in node.named_children if c.type == "for_in_clause" and c.end_byte <= bound.start_byte]
+            else:
+                loops = [node] if node.type in grammar.loop_types else []
+            for loop in loops:
+                left, right = loop.child_by_field_name("left"), loop.child_by_field_name("right")
+                if right is None:
+                    counts = loop.type == "for_statement" and name in self._counters(ctx, loop)
+                else:
+                    counts = left is not None and self._text(ctx, left) == name and self._is_range(ctx, right)
+                if counts and not self._is_constant_loop(ctx, loop):
+                    return self._loop_variable(ctx, loop)
+            node = node.parent
+        return None
+
+    def _bound_variable(self, ctx, condition, counters):
+        stack = [condition]
+        while stack:
+            node = stack.pop()
+            if node is None or node.type == "empty_statement":
+                continue
+            if node.type in ("parenthesized_expression", "expression_statement", "unary_expression", "not_operator"):
+                stack.append(node.named_child(0) if node.type != "unary_expression" else node.child_by_field_name("argument"))
+                continue
+            if node.type not in COMPARISON_TYPES:
+                if self._text(ctx, node) not in counters:
+                    name = self._outer_counter(ctx, node) or self.size_variable(ctx, node)
+                    if name:
+                        return name
+                continue
+            operator = node.child_by_field_name("operator") or node.child_by_field_name("operators")
+            operator = self._text(ctx, operator) if operator is not None else ""
+            sides = node.named_children
+            if operator in ("&&", "||", "and", "or"):
+                stack.extend(reversed(sides))
+            elif operator in UPPER_BOUND_OPERATORS:
+                stack.extend(sides)         # right side first: `i < n`
+            else:
+                stack.extend(reversed(sides))   # left side first: `n > i`
+        return None
+
+    def _local_call_cost(self, ctx, node, target):
+        """What calling local function `target` at `node` costs, as (cost, alloc,
+        growth): its body's, with sizes named after its parameters renamed
+        after the arguments."""
+        summary = ctx.function_summaries.get(ctx.function_key(target))
+        if summary is None or target.id in ctx.solving:
+            return ZERO, ZERO, ZERO
+        sizes = self._argument_sizes(ctx, node, target)
+        mapping = {}
+        for var in summary[0].variables() | summary[1].variables() | summary[2].variables():
+            prefix, name = split_variable(var)
+            root = VARIABLE_ROOT.match(name).group()
+            if root in sizes:
+                size = sizes[root]
+                mapping[var] = ONE if size is None else Cost.var(prefix + size + name[len(root):])
+        return tuple(cost.substitute(mapping) for cost in summary[:3])
+
+    def _argument_sizes(self, ctx, node, target):
+        """Parameter name -> size variable of the argument passed for it (None: constant)."""
+        return {
+            name: self._argument_size(ctx, argument) if argument is not None else None
+            for name, argument in self._bind_arguments(ctx, node, target)
+        }
+
+    def _parameter_names(self, ctx, target):
+        """Names of `target`'s parameters in order (None for destructuring patterns)."""
+        parameters = target.child_by_field_name("parameters")
+        if parameters is not None:
+            parameters = parameters.named_children
+        else:
+            # `x => ...` has a single, unparenthesized parameter
+            parameters = [target.child_by_field_name("parameter")] if target.child_by_field_name("parameter") else []
+        names = []
+        for parameter in parameters:
+            if parameter.type in ("default_parameter", "typed_default_parameter"):
+                parameter = parameter.child_by_field_name("name")
+            elif parameter.type in ("assignment_pattern", "typed_parameter"):
+                parameter = parameter.child_by_field_name("left") or parameter.named_child(0)
+            names.append(self._text(ctx, parameter) if parameter.type == "identifier" else None)
+        return names
+
+    def _bind_arguments(self, ctx, node, target):
+        """(parameter name, argument node or None if not passed) for a call to `target`."""
+        names = self._parameter_names(ctx, target)
+        if names and names[0] in PARAMETER_SKIP and node.child_by_field_name("function").type == ctx.grammar.member_type:
+            names = names[1:]
+
+        bound = {name: None for name in names if name is not None}
+        for name, argument in zip(names, self._arguments(node)):
+            if name is not None:
+                bound[name] = argument
+        keywords = node.child_by_field_name("arguments")
+        for keyword in (keywords.named_children if keywords is not None else []):
+            if keyword.type == "keyword_argument":
+                name = self._text(ctx, keyword.child_by_field_name("name"))
+                if name in bound:
+                    bound[name] = keyword.child_by_field_name("value")
+        return list(bound.items())
 
+    def _argument_size(self, ctx, argument):
+        if ctx.language == "javascript" and get_boundary_resolver().is_constant(argument, ctx.resolver_memo):
+            return None
+        return self.size_variable(ctx, argument)
+
+    def _is_linear_constructor(self, ctx, node):
+        # The constructor or function name was already matched as a COLLECTION
         arguments_node = node.child_by_field_name("arguments")
         if not arguments_node:
             return False
-        args = [c for c in arguments_node.children if c.type not in ["(", ")", ",", "comment"]]
+        args = [c for c in arguments_node.children if c.type not in ["(", ")", ",", "comment", "keyword_argument"]]
         
         if not args:
             return False # new Set() -> O(1)
 
         first_arg = args[0]
-        if first_arg.type in ["array", "object", "array_literal", "object_literal"]:
-            content = [c for c in first_arg.children if c.type not in ["[", "]", "{", "}", ","]]
+        if first_arg.type in ["array", "object", "array_literal", "object_literal", "list", "dictionary", "set", "tuple"]:
+            content = [c for c in first_arg.children if c.type not in ["[", "]", "{", "}", "(", ")", ","]]
             if not content:
                 return False 
         return True
 
-analyzer = ComplexityAnalyzer()
\ No newline at end of file
+analyzer = ComplexityAnalyzer()
+
+
+# --- PROCESS POOL WORKERS ---
+
+def _init_worker():
+    # Warm parsers for the grammars the parent already loaded (inherited on
+    # fork); anything else is loaded the first time this worker needs it
+    for language in analyzer.grammars.loaded():
+        analyzer.parsers.get(language)
+
+
+def _analyze_chunk(chunk, instance=None, deadline=None, timeout=None):
+    instance = instance or analyzer
+    results = []
+    for code, language in chunk:
+        snippet_deadline = deadline
+        if timeout is not None:
+            snippet_deadline = time.monotonic() + timeout
+            if deadline is not None:
+                snippet_deadline = min(snippet_deadline, deadline)
+        try:
+            results.append((instance.analyze_report(code, language, snippet_deadline), None))
+        except Exception as e:
+            results.append((None, f"{type(e).__name__}: {e}"))
+    return results
@@ -0,0 +1,84 @@
+"""Memory benchmark: what the walk allocates per analyzed KB, against a git revision.
+
+Runs the same generated inputs (see bench_suite.py) through analyze_tree in
+a fresh interpreter for the working tree and for a revision extracted with
+`git archive`, and reports, per KB of source, the walk's tracemalloc peak
+and the number of memory blocks it left allocated (what the context holds
+on to once the walk is done; the flat tree is released by then), plus its
+wall time, taken in a separate untraced run. Run from the repo root:
+
+    python -m benchmarks.bench_ir [--ref HEAD~1] [--scale 1]
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.bench_startup import extract_ref
+from benchmarks.bench_suite import GENERATORS
+
+# Runs inside the tree being measured; reads [name, language, code] triples on stdin
+CHILD = """
+import json, sys, time, tracemalloc
+from analyzer import analyzer, AnalysisContext
+
+results = {}
+for name, language, code in json.load(sys.stdin):
+    code_bytes = code.encode("utf8")
+    tree = analyzer.parsers.get(language).parse(code_bytes)
+    ctx = AnalysisContext(code_bytes, language)
+    analyzer.resolve_constants(ctx, tree.root_node)
+    # Timed untraced (tracemalloc slows every allocation), then measured
+    timed = AnalysisContext(code_bytes, language)
+    analyzer.resolve_constants(timed, tree.root_node)
+    start = time.perf_counter()
+    analyzer.analyze_tree(timed, tree)
+    seconds = time.perf_counter() - start
+    del timed
+
+    tracemalloc.start()
+    blocks = sys.getallocatedblocks()
+    analyzer.analyze_tree(ctx, tree)
+    peak = tracemalloc.get_traced_memory()[1]
+    blocks = sys.getallocatedblocks() - blocks
+    tracemalloc.stop()
+    results[name] = {"kb": len(code_bytes) / 1024, "peak": peak, "blocks": blocks, "seconds": seconds}
+print(json.dumps(results))
+"""
+
+
+def measure(root, cases):
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD], cwd=root, input=json.dumps(cases),
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ref", default="HEAD~1", help="git revision to compare against")
+    parser.add_argument("--scale", type=float, default=1.0)
+    args = parser.parse_args()
+
+    cases = [[name, *generate(args.scale)] for name, generate in GENERATORS.items()]
+    with tempfile.TemporaryDirectory() as old_root:
+        extract_ref(args.ref, old_root)
+        before = measure(old_root, cases)
+    after = measure(".", cases)
+
+    print(f"{'per KB of source':<18} {'peak KB':>17} {'live blocks':>19} {'walk ms':>15}")
+    print(f"{'':<18} {args.ref:>8} {'now':>8} {args.ref:>9} {'now':>9} {args.ref:>7} {'now':>7}")
+    for name, _, _ in cases:
+        old, new = before[name], after[name]
+        kb = new["kb"]
+        print(
+            f"{name:<18} {old['peak'] / 1024 / kb:>8.1f} {new['peak'] / 1024 / kb:>8.1f} "
+            f"{old['blocks'] / kb:>9.1f} {new['blocks'] / kb:>9.1f} "
+            f"{old['seconds'] * 1000 / kb:>7.2f} {new['seconds'] * 1000 / kb:>7.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Microbenchmark: precompiled OperatorMatcher vs the old per-node substring scans.
+
+Run from the repo root:
+
+    python -m benchmarks.bench_matcher [--lines 20000] [--repeat 5]
+"""
+import argparse
+import time
+
+from analyzer import analyzer
+from grammars import grammars
+
+# The pattern lists the analyzer used to scan every call's text with
+LEGACY_LINEAR = [
+    b".map", b".filter", b".forEach", b".reduce", b".includes", b".indexOf", b".find", b".some", b".every",
+    b".slice", b".splice", b".concat", b".shift", b".unshift", b".split", b".join", b".flat", b".reverse",
+]
+LEGACY_STATICS = [b"Array.from", b"Object.keys", b"Object.values", b"Object.entries"]
+LEGACY_LOG = [
+    b".sort", b"MinPriorityQueue", b"MaxPriorityQueue", b".enqueue", b".dequeue", b"heapq", b"PriorityQueue",
+]
+
+LINES = [
+    "const out = items.map((x) => x * 2).filter(Boolean);",
+    "const total = Object.values(counts).reduce((a, b) => a + b, 0);",
+    "logger.info(formatMessage(user.name, user.id));",
+    "heap.enqueue([node, dist]);",
+    "const keys = helpers.mapValues(table, normalize);",
+    "result.push(compute(a, b, c));",
+]
+
+
+def make_source(lines):
+    return "\n".join(LINES[i % len(LINES)] for i in range(lines)).encode("utf8")
+
+
+def legacy_classify(node, code_bytes):
+    text = code_bytes[node.start_byte:min(node.end_byte, node.start_byte + 50)]
+    for op in LEGACY_LOG:
+        if op in text: return "log"
+    for op in LEGACY_LINEAR + LEGACY_STATICS:
+        if op in text: return "linear"
+    return None
+
+
+def collect_calls(tree):
+    calls, stack = [], [tree.root_node]
+    while stack:
+        node = stack.pop()
+        if node.type == "call_expression":
+            calls.append(node)
+        stack.extend(node.children)
+    return calls
+
+
+def best_of(repeat, fn):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    code_bytes = make_source(args.lines)
+    tree = analyzer.parsers.get("javascript").parse(code_bytes)
+    calls = collect_calls(tree)
+    matcher = grammars.get("javascript").matcher
+
+    legacy = best_of(args.repeat, lambda: [legacy_classify(c, code_bytes) for c in calls])
+    compiled = best_of(args.repeat, lambda: [
+        matcher.classify_callee(c.child_by_field_name("function"), code_bytes) for c in calls
+    ])
+
+    print(f"{len(code_bytes) / 1024:.0f} KB, {len(calls)} calls")
+    print(f"{'legacy substring scan':<24} {legacy * 1000:8.2f} ms  {len(calls) / legacy:12,.0f} calls/s")
+    print(f"{'precompiled matcher':<24} {compiled * 1000:8.2f} ms  {len(calls) / compiled:12,.0f} calls/s")
+    print(f"speedup: {legacy / compiled:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Cold-start benchmark: how long a fresh interpreter takes to import a module.
+
+Compares the working tree against a git revision (extracted with
+`git archive`), so the cost of import-time work shows up directly.
+Run from the repo root:
+
+    python -m benchmarks.bench_startup [--ref HEAD~1] [--repeat 10]
+"""
+import argparse
+import io
+import os
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+
+MODULES = ["boundary_resolver", "analyzer"]
+
+
+def extract_ref(ref, dest):
+    archive = subprocess.run(["git", "archive", ref], check=True, capture_output=True).stdout
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(dest)
+
+
+def cold_import(root, module, repeat):
+    """Best wall time of `import module` in a fresh interpreter rooted at `root`."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-c", f"import {module}"],
+            cwd=root, check=True, stdout=subprocess.DEVNULL,
+            env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+        )
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ref", default="HEAD~1", help="git revision to compare against")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    baseline = cold_import(".", "sys", args.repeat)
+    print(f"interpreter startup: {baseline * 1000:.1f} ms (subtracted below)")
+    with tempfile.TemporaryDirectory() as old_root:
+        extract_ref(args.ref, old_root)
+        print(f"{'module':<20} {args.ref:>12} {'working tree':>14}")
+        for module in MODULES:
+            before = cold_import(old_root, module, args.repeat) - baseline
+            after = cold_import(".", module, args.repeat) - baseline
+            print(f"{module:<20} {before * 1000:9.1f} ms {after * 1000:11.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""Benchmark suite for the analyzer hot path, with a regression gate.
+
+Times the three stages of an analysis separately on synthetic inputs and a
+JSONL corpus of real snippets:
+
+    parse    Parser.parse
+    resolve  the constant table plus the BoundaryResolver's loop decisions
+    walk     the walker: call graph, function summaries and _traverse
+
+and records throughput (bytes/s for parse, nodes/s for the rest) and the
+peak Python heap of a full analyze_report (tracemalloc). Results are
+compared against a stored baseline; the run exits with status 1 if any
+throughput, relative to a fixed reference workload timed alongside it,
+dropped by more than --threshold, twice in a row. Run from the repo root:
+
+    python -m benchmarks.bench_suite [--repeat 5] [--min-time 0.2] [--scale 1] [--threshold 0.25]
+    python -m benchmarks.bench_suite --update      # store this run as the baseline
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+from analyzer import analyzer, AnalysisContext
+from bulk import iter_jsonl
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(HERE, "baseline.json")
+DEFAULT_CORPUS = os.path.join(HERE, "corpus.jsonl")
+STAGES = ("parse", "resolve", "walk")
+
+
+# --- GENERATORS ---
+# Each returns (language, source) for a given scale; scale 1 takes a few
+# hundred milliseconds per stage.
+
+def deep_nesting(scale):
+    depth = int(200 * scale)
+    opening = "".join(f"for (let i{d} = 0; i{d} < xs{d % 3}.length; i{d}++) {{\n" for d in range(depth))
+    return "javascript", opening + "total += 1;\n" + "}\n" * depth
+
+
+def long_chains(scale):
+    links = ["map(f)", "filter(g)", "slice(1)", "concat(ys)", "reduce(h, 0)"]
+    chain = ".".join(links[i % len(links)] for i in range(int(2000 * scale)))
+    return "javascript", f"const result = items.{chain};\n"
+
+
+def wide_file(scale):
+    blocks = [
+        "function f{i}(xs, ys) {{\n"
+        "    const seen = new Set(xs);\n"
+        "    for (const y of ys) {{ if (seen.has(y)) return y; }}\n"
+        "    return xs.map((x) => x * {i}).filter(Boolean);\n"
+        "}}\n",
+        "for (let i = 0; i < 10; i++) {{ total += f{j}(a, b); }}\n",
+        "const out{i} = Object.keys(table).sort().map((k) => table[k]);\n",
+        "while (queue.length) {{ const node = queue.shift(); heap.enqueue(node); }}\n",
+    ]
+    count = int(4000 * scale)
+    return "javascript", "".join(blocks[i % len(blocks)].format(i=i, j=max(i - 4, 0)) for i in range(count))
+
+
+def large_conditions(scale):
+    terms = int(1500 * scale)
+    constants = "".join(f"const c{i} = {i};\n" for i in range(terms))
+    bound = " + ".join(f"c{i}" for i in range(terms))
+    flags = " && ".join(f"(c{i} < {terms} || n > c{i})" for i in range(terms))
+    return "javascript", (
+        constants
+        + f"for (let i = 0; i < {bound}; i++) {{ total += i; }}\n"
+        + f"while ({flags}) {{ n--; }}\n"
+    )
+
+
+def wide_python(scale):
+    block = (
+        "def f{i}(xs, ys):\n"
+        "    seen = set(xs)\n"
+        "    out = [y for y in ys if y in seen]\n"
+        "    for x in sorted(xs):\n"
+        "        out.append(x * {i})\n"
+        "    return out\n\n"
+    )
+    return "python", "".join(block.format(i=i) for i in range(int(2000 * scale)))
+
+
+GENERATORS = {
+    "deep_nesting": deep_nesting,
+    "long_chains": long_chains,
+    "wide_file": wide_file,
+    "large_conditions": large_conditions,
+    "wide_python": wide_python,
+}
+
+
+# --- MEASUREMENT ---
+
+def count_nodes(tree):
+    count, cursor = 0, tree.walk()
+    while True:
+        count += 1
+        if cursor.goto_first_child() or cursor.goto_next_sibling():
+            continue
+        while cursor.goto_parent():
+            if cursor.goto_next_sibling():
+                break
+        else:
+            return count
+
+
+def loop_headers(ctx, root):
+    """Every loop and comprehension clause the resolver is asked about."""
+    grammar, nodes, stack = ctx.grammar, [], [root]
+    while stack:
+        node = stack.pop()
+        if node.type in grammar.loop_types or node.type == "for_in_clause":
+            nodes.append(node)
+        stack.extend(node.children)
+    return nodes
+
+
+def reference():
+    """A fixed slice of pure-Python work, timed next to every stage.
+
+    Shared hosts can run at half speed for tens of seconds, which moves
+    every throughput well past the threshold. A stage's time relative to
+    this one is what the gate compares, since a slower host slows both.
+    """
+    start = time.perf_counter()
+    counts = {}
+    for i in range(10_000):
+        key = i & 255
+        counts[key] = counts.get(key, 0) + 1
+    return time.perf_counter() - start
+
+
+def _autorange(timed, min_time):
+    calls = 1
+    while (elapsed := sum(timed() for _ in range(calls))) < min_time:
+        calls *= 2
+    return calls, elapsed
+
+
+def best_of(repeat, timed, min_time):
+    """(seconds per call, and per reference() call) of `timed` over `repeat` batches.
+
+    `timed` returns the seconds it took. As in verifier.py, a batch repeats
+    the call, doubling the count, until it has taken `min_time`, so a stage
+    of a millisecond or two is not timed on single calls, whose noise alone
+    can cross the threshold. Each batch is followed by one of reference()
+    of about as long; the seconds are the best batch's, the ratio the median
+    one, since a batch caught by a change of host speed skews it both ways.
+    """
+    calls, elapsed = _autorange(timed, min_time)
+    reference_calls, _ = _autorange(reference, min_time)
+    seconds, ratios = [], []
+    for i in range(repeat):
+        if i:
+            elapsed = sum(timed() for _ in range(calls))
+        host = sum(reference() for _ in range(reference_calls)) / reference_calls
+        seconds.append(elapsed / calls)
+        ratios.append(elapsed / calls / host)
+    return min(seconds), statistics.median(ratios)
+
+
+def measure(snippets, repeat, min_time=0.2):
+    """Stage timings, throughput and peak heap for a list of (language, code).
+
+    Each stage is timed over all the snippets at once, so a corpus of small
+    snippets is batched as a whole rather than snippet by snippet.
+    """
+    prepared = []
+    nodes = size = peak = 0
+    for language, code in snippets:
+        code_bytes = code.encode("utf8")
+        parser = analyzer.parsers.get(language)
+        tree = parser.parse(code_bytes)
+        prepared.append((language, code_bytes, parser, tree))
+        nodes += count_nodes(tree)
+        size += len(code_bytes)
+
+    def resolve(language, code_bytes, tree):
+        ctx = AnalysisContext(code_bytes, language)
+        analyzer.resolve_constants(ctx, tree.root_node)
+        for node in loop_headers(ctx, tree.root_node):
+            analyzer._is_constant_loop(ctx, node)
+        return ctx
+
+    def parse_all():
+        start = time.perf_counter()
+        for _, code_bytes, parser, _ in prepared:
+            parser.parse(code_bytes)
+        return time.perf_counter() - start
+
+    def resolve_all():
+        start = time.perf_counter()
+        for language, code_bytes, _, tree in prepared:
+            resolve(language, code_bytes, tree)
+        return time.perf_counter() - start
+
+    def walk_all():
+        # Constants and loop decisions are ready, so only the walk is timed
+        contexts = [resolve(language, code_bytes, tree) for language, code_bytes, _, tree in prepared]
+        start = time.perf_counter()
+        for ctx, (_, _, _, tree) in zip(contexts, prepared):
+            analyzer.analyze_tree(ctx, tree)
+        return time.perf_counter() - start
+
+    timings = {
+        "parse": best_of(repeat, parse_all, min_time),
+        "resolve": best_of(repeat, resolve_all, min_time),
+        "walk": best_of(repeat, walk_all, min_time),
+    }
+    totals = {stage: seconds for stage, (seconds, _) in timings.items()}
+    units = {"parse": size, "resolve": nodes, "walk": nodes}
+    # After the timings, so what the first analysis builds once isn't counted
+    for language, code in snippets:
+        tracemalloc.start()
+        analyzer.analyze_report(code, language)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return {
+        "bytes": size,
+        "nodes": nodes,
+        "seconds": {stage: round(totals[stage], 6) for stage in STAGES},
+        "throughput": {
+            "parse": round(size / totals["parse"]),
+            "resolve": round(nodes / totals["resolve"]),
+            "walk": round(nodes / totals["walk"]),
+        },
+        # Bytes or nodes per reference() call: what the gate compares
+        "relative": {stage: round(units[stage] / relative, 1) for stage, (_, relative) in timings.items()},
+        "peak_kb": round(peak / 1024),
+    }
+
+
+def load_corpus(path):
+    snippets = []
+    for _, code, language, error in iter_jsonl(path, "code", "id", "javascript"):
+        if error is None:
+            snippets.append((analyzer.resolve_language(language, code), code))
+    return snippets
+
+
+def compare(results, baseline, threshold):
+    """Lines describing every throughput more than `threshold` below the baseline.
+
+    Throughput is taken relative to the host's speed at the time (see
+    reference()), unless the baseline predates that.
+    """
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get("cases", {}).get(name)
+        if before is None:
+            continue
+        key = "relative" if "relative" in before else "throughput"
+        for stage in STAGES:
+            old, new = before[key].get(stage), result[key][stage]
+            if old and new < old * (1 - threshold):
+                unit = "/reference" if key == "relative" else "/s"
+                regressions.append(f"{name}/{stage}: {new:,}{unit} vs baseline {old:,}{unit} ({new / old - 1:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="batches per stage; the best one counts")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds each batch runs for at least")
+    parser.add_argument("--scale", type=float, default=1.0, help="size of the synthetic inputs")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="JSONL file of {code, language} records")
+    parser.add_argument("--cases", nargs="*", help="only run these cases")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed throughput drop, as a fraction")
+    parser.add_argument("--update", action="store_true", help="write this run as the new baseline")
+    args = parser.parse_args()
+
+    cases = {name: [generate(args.scale)] for name, generate in GENERATORS.items()}
+    cases["corpus"] = load_corpus(args.corpus)
+    if args.cases:
+        cases = {name: snippets for name, snippets in cases.items() if name in args.cases}
+
+    results = {}
+    print(f"{'case':<18} {'nodes':>9} {'parse MB/s':>11} {'resolve n/s':>12} {'walk n/s':>11} {'peak KB':>9}")
+    for name, snippets in cases.items():
+        result = results[name] = measure(snippets, args.repeat, args.min_time)
+        throughput = result["throughput"]
+        print(
+            f"{name:<18} {result['nodes']:>9,} {throughput['parse'] / 1e6:>11.1f} "
+            f"{throughput['resolve']:>12,} {throughput['walk']:>11,} {result['peak_kb']:>9,}"
+        )
+
+    if args.update:
+        with open(args.baseline, "w", encoding="utf8") as f:
+            json.dump({"scale": args.scale, "cases": results}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"baseline written to {args.baseline}")
+        return
+
+    try:
+        with open(args.baseline, "r", encoding="utf8") as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        print(f"no baseline at {args.baseline}; run with --update to create one")
+        return
+    if baseline.get("scale") != args.scale:
+        print(f"baseline was recorded at scale {baseline.get('scale')}, not {args.scale}; not comparing")
+        return
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        # Measured again before failing: a real regression shows up twice
+        flagged = {line.split("/", 1)[0] for line in regressions}
+        retried = {name: measure(cases[name], args.repeat, args.min_time) for name in flagged}
+        regressions = compare(retried, baseline, args.threshold)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    if regressions:
+        sys.exit(1)
+    print(f"no throughput regression beyond {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
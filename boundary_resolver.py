@@ -1,10 +1,29 @@
-import tree_sitter_javascript as tsjs
+import sys
+import threading
+from functools import lru_cache
 from tree_sitter import Language, Parser
 
+# What a rule computes about a node; also indexes ResolverMemo.tables
+TRUTHINESS, CONSTANT = range(2)
+
+
+@lru_cache(maxsize=None)
+def javascript_language():
+    # Loading the grammar's shared library is most of this module's import
+    # cost, so it waits until something actually needs to parse
+    import tree_sitter_javascript as tsjs
+    return Language(tsjs.language())
+
+
 class BoundaryResolver:
+    """Decides whether a loop condition is bounded by a constant.
+
+    Works on nodes of an already-parsed tree; the grammar and `parser` are
+    only loaded when something asks to parse source directly.
+    """
+
     def __init__(self):
-        self.js_lang = Language(tsjs.language())
-        self.parser = Parser(self.js_lang)
+        self._local = threading.local()
         self.comparison_ops = {"<", ">", "<=", ">=", "==", "===", "!=", "!=="}
         self.literal_types = {
             "number", "string", "boolean", "true", "false", 
@@ -12,13 +31,93 @@ class BoundaryResolver:
         }
         self.pure_globals = {"Math", "Number", "Object", "Array"}
 
-    def get_truthiness(self, node):
+    @property
+    def js_lang(self):
+        return javascript_language()
+
+    @property
+    def parser(self):
+        # Parsers can't be shared between threads, so each thread gets its own
+        parser = getattr(self._local, "parser", None)
+        if parser is None:
+            parser = self._local.parser = Parser(self.js_lang)
+        return parser
+
+    def parse_condition(self, src: str):
+        """Parses `src` as a while-loop condition and returns its expression node."""
+        tree = self.parser.parse(bytes(f"while({src});", "utf8"))
+        # JS tree-sitter: while_statement -> condition is a named field
+        cond = tree.root_node.children[0].child_by_field_name("condition")
+        # Structural fallback for unwrapping
+        if cond and cond.type == "parenthesized_expression":
+            cond = cond.named_child(0)
+        return cond
+
+    def is_bounded_loop(self, condition, memo=None):
+        """True if a loop guarded by `condition` runs a constant number of times.
+
+        An always-true condition never ends the loop, an always-false one
+        never enters it; anything else is bounded when is_constant says so.
+        """
+        memo = memo if memo is not None else ResolverMemo()
+        truth = self.get_truthiness(condition, memo)
+        if truth is not None:
+            return not truth
+        return self.is_constant(condition, memo)
+
+    def get_truthiness(self, node, memo=None):
         """Returns True (always truthy), False (always falsy), or None (unknown)."""
-        if not node: return None
-        
+        return self._evaluate(TRUTHINESS, node, memo if memo is not None else ResolverMemo())
+
+    def is_constant(self, node, memo=None):
+        return self._evaluate(CONSTANT, node, memo if memo is not None else ResolverMemo())
+
+    def _evaluate(self, rule, node, memo):
+        """Runs `rule` on `node` without recursing in Python.
+
+        Rules are generators that yield (rule, child) for each child value
+        they need and get it sent back. Pending rules sit on an explicit
+        stack, so deeply nested conditions don't hit the recursion limit,
+        and every result lands in the memo before anything asks again.
+        """
+        value = self._lookup(rule, node, memo)
+        if value is not _UNSEEN:
+            return value
+        stack = [self._start(rule, node, memo)]
+        value = None
+        while stack:
+            rule, node, pending = stack[-1]
+            try:
+                child_rule, child = pending.send(value)
+            except StopIteration as done:
+                stack.pop()
+                value = memo.tables[rule][node.id] = done.value
+                continue
+            value = self._lookup(child_rule, child, memo)
+            if value is _UNSEEN:
+                stack.append(self._start(child_rule, child, memo))
+                value = None
+        return value
+
+    def _start(self, rule, node, memo):
+        # Constants can refer to each other (`const a = b, b = a`), so a node
+        # being evaluated reads as unknown until its rule finishes
+        memo.tables[rule][node.id] = None if rule == TRUTHINESS else False
+        return rule, node, (self._truthiness if rule == TRUTHINESS else self._is_constant)(node, memo)
+
+    def _lookup(self, rule, node, memo):
+        if not node:
+            return None if rule == TRUTHINESS else False
+        return memo.tables[rule].get(node.id, _UNSEEN)
+
+    def _truthiness(self, node, memo):
         # Unwrap parentheses for truthiness check
         if node.type == "parenthesized_expression":
-            return self.get_truthiness(node.named_child(0))
+            return (yield TRUTHINESS, node.named_child(0))
+
+        # Names bound to a constant take their initializer's value
+        if node.type == "identifier":
+            return (yield TRUTHINESS, memo.constants.get(node.start_byte))
 
         if node.type in ["true", "regex", "array", "object"]:
             return True
@@ -26,48 +125,50 @@ class BoundaryResolver:
             return False
         
         if node.type == "number":
-            return node.text.decode('utf8') not in ["0", "0n"]
+            return memo.text_of(node) not in ["0", "0n"]
         
         if node.type == "string":
-            return node.text.decode('utf8') not in ["''", '""']
+            return memo.text_of(node) not in ["''", '""']
 
         if node.type == "unary_expression":
             op = node.child_by_field_name("operator")
             arg = node.child_by_field_name("argument")
-            if op and op.text.decode('utf8') == "!" and arg:
-                val = self.get_truthiness(arg)
+            if op and memo.text_of(op) == "!" and arg:
+                val = (yield TRUTHINESS, arg)
                 return not val if val is not None else None
         
         return None
 
-    def is_constant(self, node):
-        if not node: return False
-
+    def _is_constant(self, node, memo):
         # 1. Structural Unwrapping
         if node.type == "parenthesized_expression":
-            return self.is_constant(node.named_child(0))
+            return (yield CONSTANT, node.named_child(0))
         
         if node.type == "unary_expression":
-            return self.is_constant(node.child_by_field_name("argument"))
+            return (yield CONSTANT, node.child_by_field_name("argument"))
 
         # 2. Base Cases
         if node.type in self.literal_types:
             return True
+
+        # const LIMIT = 10 (see constant_table.py)
+        if node.type == "identifier":
+            return (yield CONSTANT, memo.constants.get(node.start_byte))
             
         # Whitelist globals (Math.PI)
         if node.type == "member_expression":
             obj = node.child_by_field_name("object")
-            if not obj or obj.text.decode('utf8') not in self.pure_globals:
+            if not obj or memo.text_of(obj) not in self.pure_globals:
                 return False
             
             prop = node.child_by_field_name("property")
             if prop:
-                prop_text = prop.text.decode('utf8')
+                prop_text = memo.text_of(prop)
                 known_constants = {
                     "Math": {"PI", "E", "LN10", "LN2", "LOG10E", "LOG2E", "SQRT1_2", "SQRT2"},
                     "Number": {"MAX_SAFE_INTEGER", "MIN_SAFE_INTEGER", "MAX_VALUE", "MIN_VALUE"},
                 }
-                obj_name = obj.text.decode('utf8')
+                obj_name = memo.text_of(obj)
                 if obj_name in known_constants and prop_text in known_constants[obj_name]:
                     return True
             
@@ -84,20 +185,20 @@ class BoundaryResolver:
                 
                 # Logical Short-Circuiting
                 if op in ["&&", "||"]:
-                    l_truth = self.get_truthiness(left)
-                    r_truth = self.get_truthiness(right)
+                    l_truth = (yield TRUTHINESS, left)
+                    r_truth = (yield TRUTHINESS, right)
 
                     if op == "&&":
                         # If either is false, loop is O(1) [0 iterations]
                         if l_truth is False or r_truth is False: return True
                         # If left is true, complexity depends on right
-                        if l_truth is True: return self.is_constant(right)
-                        return self.is_constant(left) and self.is_constant(right)
+                        if l_truth is True: return (yield CONSTANT, right)
+                        return (yield CONSTANT, left) and (yield CONSTANT, right)
 
                     if op == "||":
                         # If either is true, loop is O(inf) [Non-constant]
                         if l_truth is True or r_truth is True: return False
-                        return self.is_constant(left) and self.is_constant(right)
+                        return (yield CONSTANT, left) and (yield CONSTANT, right)
 
                 # Call Guard: Soundness first
                 if left.type == "call_expression" or right.type == "call_expression":
@@ -105,96 +206,83 @@ class BoundaryResolver:
 
                 # Math and Comparison
                 if op in ["+", "-", "*", "/"]:
-                    return self.is_constant(left) and self.is_constant(right)
+                    return (yield CONSTANT, left) and (yield CONSTANT, right)
                 if op in self.comparison_ops:
-                    return self.is_constant(left) or self.is_constant(right)
+                    return (yield CONSTANT, left) or (yield CONSTANT, right)
 
-         # 4. Ternary (IMPROVED: short-circuit on condition)
+        # 4. Ternary (IMPROVED: short-circuit on condition)
         if node.type == "conditional_expression":
             condition = node.child_by_field_name("condition")
             consequence = node.child_by_field_name("consequence")
             alternative = node.child_by_field_name("alternative")
             
-            cond_truth = self.get_truthiness(condition)
+            cond_truth = self.get_truthiness(condition, memo)
             if cond_truth is True:
-                return self.is_constant(consequence)
+                return (yield CONSTANT, consequence)
             if cond_truth is False:
-                return self.is_constant(alternative)
+                return (yield CONSTANT, alternative)
             
-            return self.is_constant(consequence) and self.is_constant(alternative)
+            return (yield CONSTANT, consequence) and (yield CONSTANT, alternative)
         
-				# Assignment expressions: check RHS
+        # Assignment expressions: check RHS
         if node.type == "assignment_expression":
             value = node.child_by_field_name("right")
-            return self.is_constant(value) if value else False
+            return (yield CONSTANT, value) if value else False
         
-				        # Guard: optional chaining and nullish coalescing are non-constant
+        # Guard: optional chaining and nullish coalescing are non-constant
         if node.type in ["optional_chain", "nullish_coalescing_expression"]:
             return False
 
         return False
 
-# --- TEST DRIVE ---
-# Initialize the resolver correctly
-boundary_resolver = BoundaryResolver()
-
-test_cases = [
-    "i < 10",                      # True
-    "i === 5",                     # True
-    "i !== 0",                     # True
-    "i < n",                       # False
-    "i < 10 && i < n",             # False
-    "i < 10 || i < n",             # False
-    "i === 'stop'",                # True
-    "i < n && j < m",              # False
-    "(i < 10 && i < n) || j < k",  # False
-    "i < 10 && (j < 5 || k < 3)",  # False
-    "i < 10 + 2",                  # True
-    "i < n + 1",                   # False
-    "i < -5",                      # True
-    "!flag",                       # False
-    "!!true",                      # True
-    "true",                        # True
-    "false",                       # True
-    "0",                           # True
-    "'x'",                         # True
-    "i",                           # False
-    "arr.length < 10",             # True
-    "i < getN()",                  # False
-    "getN() < 10",                 # False
-    "value === null",              # True
-    "value === undefined",         # True
-    "5 < 10",                      # True
-    "true || false",               # False  # always-true ⇒ non-constant
-    "true && false",               # True   # always-false ⇒ bounded
-    "((i < 10)) && (i < n)",       # False
-
-    # Additional edges:
-    "Math.PI < 4",                 # True   # pure_global whitelist
-    "Math[foo] < 10",              # False  # non-constant property access
-    "0 && 1",                      # True   # always false ⇒ bounded
-    "0 || 1",                      # False  # always true ⇒ unbounded
-    "'' || 'a'",                   # False  # always true ⇒ unbounded
-    "'' && 'a'",                   # True   # always false ⇒ bounded
-    "((true))",                    # True   # parenthesis unwrap
-    "(flag ? 1 : 2) < 10",         # True   # both branches literal
-    "(flag ? getN() : 2) < 10",    # False  # call in a branch
-    "(true ? 1 : getN()) < 10",    # True   # condition always true ⇒ consequence checked
-    "(false ? getN() : 2) < 10",   # True   # condition always false ⇒ alternative checked
-]
-
-print(f"{'Code':<30} | {'Constant'}")
-print("-" * 45)
-
-for src in test_cases:
-    tree = boundary_resolver.parser.parse(bytes(f"while({src});", "utf8"))
-    # JS tree-sitter: while_statement -> condition is a named field
-    while_node = tree.root_node.children[0]
-    cond = while_node.child_by_field_name("condition")
-    
-    # Structural fallback for unwrapping
-    if cond and cond.type == "parenthesized_expression":
-        cond = cond.named_child(0)
-
-    result = boundary_resolver.is_constant(cond)
-    print(f"{src:<25} | {result}")
\ No newline at end of file
+
+_UNSEEN = object()
+
+
+class ResolverMemo:
+    """Results for one analysis, keyed by node id.
+
+    Each node's truthiness, constancy and decoded text are computed at most
+    once, so resolving a condition stays linear in its size however often
+    the &&/|| and ternary rules revisit the same children. Node ids are
+    only unique within one tree, so a memo must not outlive its analysis.
+
+    `constants` is the analysis' ConstantTable.values; identifiers found
+    there are judged by their initializer.
+    """
+
+    def __init__(self, constants=None):
+        self.constants = constants if constants is not None else {}  # identifier start byte -> initializer
+        self.truthiness = {}    # node id -> True / False / None (unknown)
+        self.constant = {}      # node id -> bool
+        self.text = {}          # node id -> decoded source text
+        self.tables = (self.truthiness, self.constant)
+
+    def text_of(self, node):
+        text = self.text.get(node.id)
+        if text is None:
+            text = self.text[node.id] = node.text.decode('utf8')
+        return text
+
+
+_resolver = None
+_resolver_lock = threading.Lock()
+
+
+def get_boundary_resolver() -> BoundaryResolver:
+    """The shared resolver, built on first use rather than at import."""
+    global _resolver
+    if _resolver is None:
+        with _resolver_lock:
+            if _resolver is None:
+                _resolver = BoundaryResolver()
+    return _resolver
+
+
+if __name__ == "__main__":
+    # python boundary_resolver.py "i < 10" "i < n"
+    resolver = get_boundary_resolver()
+    print(f"{'Code':<30} | {'Constant'}")
+    print("-" * 45)
+    for src in sys.argv[1:]:
+        print(f"{src:<30} | {resolver.is_constant(resolver.parse_condition(src))}")
@@ -0,0 +1,162 @@
+"""Offline bulk analysis, no HTTP involved.
+
+    python -m bulk submissions.jsonl -o results.jsonl --workers 8
+    python -m bulk path/to/repo -o results.jsonl --resume
+
+Input is either a JSONL file (one record per line, the code under
+--code-field) or a directory, whose .js/.py files are analyzed in sorted
+order. Records are analyzed in windows of workers * chunk-size across a
+process pool, and the checkpoint is updated after every window, so an
+interrupted run can pick up where it stopped with --resume.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from analyzer import analyzer
+
+EXTENSIONS = {
+    ".js": "javascript", ".mjs": "javascript", ".cjs": "javascript", ".jsx": "javascript",
+    ".py": "python",
+}
+
+
+def iter_jsonl(path, code_field, id_field, language):
+    with open(path, "r", encoding="utf8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                code = record[code_field]
+            except (ValueError, KeyError, TypeError) as e:
+                yield line_no, None, None, f"Invalid record: {type(e).__name__}: {e}"
+                continue
+            record_id = record.get(id_field, line_no) if isinstance(record, dict) else line_no
+            record_language = record.get("language", language)
+            if not isinstance(code, str) or not isinstance(record_language, str):
+                # Caught here, not in the pool, so one bad record can't abort the run (and every --resume)
+                field = code_field if not isinstance(code, str) else "language"
+                yield record_id, None, None, f"Invalid record: {field!r} must be a string"
+                continue
+            yield record_id, code, record_language, None
+
+
+def iter_source_paths(root, exclude=()):
+    """(path, language) of every .js/.py file under root, in sorted order.
+
+    Directories named in `exclude` are not descended into.
+    """
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(name for name in dirnames if name not in exclude)
+        for name in sorted(filenames):
+            language = EXTENSIONS.get(os.path.splitext(name)[1])
+            if language is not None:
+                yield os.path.join(dirpath, name), language
+
+
+def iter_directory(root):
+    for path, language in iter_source_paths(root):
+        try:
+            with open(path, "r", encoding="utf8") as f:
+                yield os.path.relpath(path, root), f.read(), language, None
+        except (OSError, UnicodeDecodeError) as e:
+            yield os.path.relpath(path, root), None, language, f"{type(e).__name__}: {e}"
+
+
+def load_checkpoint(path, source):
+    try:
+        with open(path, "r", encoding="utf8") as f:
+            checkpoint = json.load(f)
+    except FileNotFoundError:
+        return 0, 0
+    if checkpoint.get("input") != os.path.abspath(source):
+        raise SystemExit(f"Checkpoint {path} belongs to {checkpoint.get('input')}, not {source}")
+    return checkpoint["records_done"], checkpoint["output_bytes"]
+
+
+def save_checkpoint(path, source, records_done, output_bytes):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf8") as f:
+        json.dump({"input": os.path.abspath(source), "records_done": records_done, "output_bytes": output_bytes}, f)
+    os.replace(tmp, path)
+
+
+def run(args):
+    if os.path.isdir(args.input):
+        records = iter_directory(args.input)
+    else:
+        records = iter_jsonl(args.input, args.code_field, args.id_field, args.language)
+
+    checkpoint_path = args.checkpoint or args.output + ".checkpoint"
+    records_done, output_bytes = 0, 0
+    if args.resume:
+        records_done, output_bytes = load_checkpoint(checkpoint_path, args.input)
+
+    # Drop anything written after the last checkpoint (e.g. a half-written window)
+    out = open(args.output, "r+b" if args.resume and os.path.exists(args.output) else "wb")
+    out.truncate(output_bytes)
+    out.seek(output_bytes)
+
+    for _ in range(records_done):
+        next(records, None)
+
+    window_size = args.workers * args.chunk_size
+    started = time.perf_counter()
+    analyzed, code_bytes = 0, 0
+    try:
+        while True:
+            window = [r for _, r in zip(range(window_size), records)]
+            if not window:
+                break
+
+            runnable = [(code, language) for _, code, language, error in window if error is None]
+            results = iter(analyzer.analyze_many(runnable, max_workers=args.workers, chunk_size=args.chunk_size))
+            for record_id, code, _, error in window:
+                report = None
+                if error is None:
+                    report, error = next(results)
+                    code_bytes += len(code)
+                line = {"id": record_id, **(report or {}), "status": "error" if error else "success"}
+                if error:
+                    line["error"] = error
+                out.write(json.dumps(line).encode("utf8") + b"\n")
+
+            out.flush()
+            os.fsync(out.fileno())
+            records_done += len(window)
+            analyzed += len(window)
+            save_checkpoint(checkpoint_path, args.input, records_done, out.tell())
+
+            elapsed = time.perf_counter() - started
+            print(
+                f"{records_done} records done, {analyzed / elapsed:,.0f} records/s, "
+                f"{code_bytes / 1024 / elapsed:,.0f} KB/s",
+                file=sys.stderr,
+            )
+    finally:
+        out.close()
+        analyzer.shutdown()
+
+    elapsed = time.perf_counter() - started
+    print(f"Analyzed {analyzed} records in {elapsed:.1f}s", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bulk", description="Analyze JSONL records or a source tree offline.")
+    parser.add_argument("input", help="JSONL file or directory of .js/.py files")
+    parser.add_argument("-o", "--output", required=True, help="JSONL results file")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=64, help="records per worker task")
+    parser.add_argument("--code-field", default="code", help="JSONL field holding the source (default: code)")
+    parser.add_argument("--id-field", default="id", help="JSONL field echoed back as id (default: line number)")
+    parser.add_argument("--language", default="javascript", help="language for records that don't set one (javascript, python or auto)")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: OUTPUT.checkpoint)")
+    parser.add_argument("--resume", action="store_true", help="continue from the checkpoint instead of starting over")
+    run(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    main()
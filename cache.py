@@ -0,0 +1,133 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_code(code: str) -> str:
+    """Drops differences that can't change the result (line endings, trailing blanks).
+
+    Leading whitespace stays: it is indentation in Python, and blank lines
+    at the top move every reported line number.
+    """
+    lines = code.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).rstrip()
+
+
+def make_cache_key(code: str, language: str, version: str) -> str:
+    digest = hashlib.sha256()
+    for part in (version, language, normalize_code(code)):
+        digest.update(part.encode("utf8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class SQLiteBackend:
+    """On-disk cache tier, shared by every worker process on the host.
+
+    Values are stored as JSON, so only plain lists/dicts/strings can be cached.
+    """
+
+    def __init__(self, path: str, clock=time.time, prune_every: int = 500):
+        self.path = path
+        self.clock = clock
+        self.prune_every = prune_every
+        self._local = threading.local()
+        self._writes = 0
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str):
+        row = self._conn().execute(
+            "SELECT value, expires_at FROM results WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if row[1] <= self.clock():
+            self._conn().execute("DELETE FROM results WHERE key = ?", (key,))
+            return None
+        return json.loads(row[0])
+
+    def set(self, key: str, value, ttl: float):
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO results (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), self.clock() + ttl),
+        )
+        self._writes += 1
+        if self._writes % self.prune_every == 0:
+            conn.execute("DELETE FROM results WHERE expires_at <= ?", (self.clock(),))
+
+
+class ResultCache:
+    """Bounded in-memory LRU with per-entry TTL, optionally backed by SQLiteBackend."""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600.0, backend=None, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.backend = backend
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > self.clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+        value = self.backend.get(key) if self.backend else None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._store(key, value)
+        return value
+
+    def set(self, key: str, value):
+        with self._lock:
+            self._store(key, value)
+        if self.backend:
+            self.backend.set(key, value, self.ttl)
+
+    def _store(self, key, value):
+        self._entries[key] = (value, self.clock() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
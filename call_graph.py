@@ -0,0 +1,190 @@
+from tree_sitter import Query, QueryCursor
+
+# Named functions and the calls that can reach them. Anonymous callbacks are
+# not listed: their cost is part of whatever encloses them.
+QUERY_SOURCES = {
+    "javascript": """
+        (function_declaration name: (identifier) @name) @function
+        (generator_function_declaration name: (identifier) @name) @function
+        (variable_declarator
+            name: (identifier) @name
+            value: [(arrow_function) (function_expression)] @function)
+        (method_definition name: (property_identifier) @name) @method
+        (call_expression function: (identifier) @callee) @call
+        (call_expression
+            function: (member_expression object: (this) property: (property_identifier) @callee)) @method_call
+    """,
+    "python": """
+        (function_definition name: (identifier) @name) @function
+        (call function: (identifier) @callee) @call
+        (call
+            function: (attribute object: (identifier) @receiver attribute: (identifier) @callee)
+            (#any-of? @receiver "self" "cls")) @method_call
+    """,
+}
+
+FUNCTION_TYPES = {
+    "javascript": {
+        "function_declaration", "generator_function_declaration", "function_expression",
+        "arrow_function", "method_definition",
+    },
+    "python": {"function_definition"},
+}
+
+
+class CallGraph:
+    """Named functions in one file and the local calls between them.
+
+    Built from a single query pass. Names resolve file-wide: `f()` reaches
+    any function named f, `this.m()` any method named m, and the last
+    definition of a name wins. In Python, `self.m()` and `cls.m()` reach
+    the method m of the class they are made in, and `f()` no method.
+    """
+
+    def __init__(self, functions, by_name, methods, edges, call_targets, call_sites=None):
+        self.functions = functions          # [(node, name)] in source order
+        self.by_name = by_name              # name bytes -> function node
+        self.methods = methods              # method name bytes (Python: (class id, name)) -> method node
+        self.edges = edges                  # function node id -> [callee nodes]
+        self.call_targets = call_targets    # call node id -> callee function node
+        self.call_sites = call_sites or {}  # function node id -> [(call node, callee node)]
+
+    def components(self):
+        """Strongly connected components, callees first (Tarjan's algorithm).
+
+        Each component is a list of function nodes; a component with more
+        than one function, or one that calls itself, is recursive.
+        """
+        index, lowlink, on_stack = {}, {}, set()
+        stack, components = [], []
+        for root, _ in self.functions:
+            if root.id in index:
+                continue
+            work = [(root, iter(self.edges.get(root.id, ())))]
+            index[root.id] = lowlink[root.id] = len(index)
+            stack.append(root)
+            on_stack.add(root.id)
+            while work:
+                node, callees = work[-1]
+                for callee in callees:
+                    if callee.id not in index:
+                        index[callee.id] = lowlink[callee.id] = len(index)
+                        stack.append(callee)
+                        on_stack.add(callee.id)
+                        work.append((callee, iter(self.edges.get(callee.id, ()))))
+                        break
+                    if callee.id in on_stack:
+                        lowlink[node.id] = min(lowlink[node.id], index[callee.id])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        lowlink[parent.id] = min(lowlink[parent.id], lowlink[node.id])
+                    if lowlink[node.id] == index[node.id]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member.id)
+                            component.append(member)
+                            if member.id == node.id:
+                                break
+                        components.append(component)
+        return components
+
+    def called_from_outside(self, components):
+        """Ids of functions some call reaches from outside their own component
+        (top-level code included); the rest are only entry points."""
+        component_of = {node.id: i for i, component in enumerate(components) for node in component}
+        internal = set()
+        for caller_id, sites in self.call_sites.items():
+            for call, callee in sites:
+                if component_of.get(caller_id) == component_of.get(callee.id):
+                    internal.add(call.id)
+        return frozenset(
+            self.call_targets[call_id].id for call_id in self.call_targets if call_id not in internal
+        )
+
+    def is_recursive(self, component):
+        if len(component) > 1:
+            return True
+        node = component[0]
+        return any(callee.id == node.id for callee in self.edges.get(node.id, ()))
+
+
+_queries = {}
+
+
+def _python_class(node, direct):
+    """The class_definition `node` is a method of (`direct`), or sits anywhere in."""
+    node = node.parent
+    if not direct:
+        while node is not None and node.type != "class_definition":
+            node = node.parent
+        return node
+    if node is not None and node.type == "decorated_definition":
+        node = node.parent
+    if node is None or node.type != "block" or node.parent is None:
+        return None
+    return node.parent if node.parent.type == "class_definition" else None
+
+
+def build_call_graph(language_name, language, root, code_bytes) -> CallGraph:
+    query = _queries.get(language_name)
+    if query is None:
+        query = _queries[language_name] = Query(language, QUERY_SOURCES[language_name])
+
+    functions, by_name, methods, calls = [], {}, {}, []
+    for _, captures in QueryCursor(query).matches(root):
+        if "function" in captures or "method" in captures:
+            node = (captures.get("function") or captures["method"])[0]
+            name_node = captures["name"][0]
+            name = code_bytes[name_node.start_byte:name_node.end_byte]
+            functions.append((node, name.decode("utf8", errors="replace")))
+            owner = _python_class(node, True) if language_name == "python" else None
+            if owner is not None:
+                methods[owner.id, name] = node
+            else:
+                (methods if "method" in captures else by_name)[name] = node
+        else:
+            call = (captures.get("call") or captures["method_call"])[0]
+            callee = captures["callee"][0]
+            name = code_bytes[callee.start_byte:callee.end_byte]
+            if "method_call" not in captures:
+                calls.append((call, by_name, name))
+            elif language_name != "python":
+                calls.append((call, methods, name))
+            else:
+                owner = _python_class(call, False)
+                if owner is not None:
+                    calls.append((call, methods, (owner.id, name)))
+
+    functions.sort(key=lambda item: item[0].start_byte)
+
+    # Resolve calls, then sweep them in source order against the stack of
+    # enclosing functions to find which function each call is made from
+    call_targets = {}
+    resolved = []
+    for call, table, name in calls:
+        target = table.get(name)
+        if target is not None:
+            call_targets[call.id] = target
+            resolved.append((call, target))
+    resolved.sort(key=lambda item: item[0].start_byte)
+
+    edges, call_sites = {}, {}
+    stack = []
+    function_iter = iter(functions)
+    next_function = next(function_iter, None)
+    for call, target in resolved:
+        while next_function is not None and next_function[0].start_byte <= call.start_byte:
+            while stack and stack[-1].end_byte <= next_function[0].start_byte:
+                stack.pop()
+            stack.append(next_function[0])
+            next_function = next(function_iter, None)
+        while stack and stack[-1].end_byte <= call.start_byte:
+            stack.pop()
+        if stack:
+            edges.setdefault(stack[-1].id, []).append(target)
+            call_sites.setdefault(stack[-1].id, []).append((call, target))
+
+    return CallGraph(functions, by_name, methods, edges, call_targets, call_sites)
@@ -0,0 +1,320 @@
+"""Symbolic costs: sums of products of size variables and their logarithms.
+
+A Term is one product, e.g. N^2 * M log M, stored as sorted
+(variable, power, log power) factors. A Cost is a sum of terms kept in
+canonical form: no term in it is dominated by another, so N^2 + N log N + 1
+is just N^2, while N + M log M stays as it is.
+
+Both are hash-consed: building the same term or cost twice returns the same
+object, so equality is identity and results of add/mul/substitute are
+memoized on the operands themselves. The memo tables are bounded and simply
+cleared when full; interning is weak, so costs nobody holds are dropped.
+Analyses run on a thread pool, so a miss is filled in under a lock: two
+threads building the same term get the same object.
+"""
+import re
+import threading
+import weakref
+
+# Variables named "heap:<name>" stand for the size of a heap. A loop binds
+# them to its own size, since a heap grows with the loop that fills it.
+HEAP_PREFIX = "heap:"
+# "exp:<base>:<name>" stands for base^name, e.g. the 2^N of a branching recursion
+EXP_PREFIX = "exp:"
+UNKNOWN = "?"               # size of a loop whose bound can't be named
+LETTERS = "NMKPQRSTUVW"
+
+MEMO_LIMIT = 100_000
+_memo = {}
+# Guards filling in _memo and the interning tables; lookups that hit don't take it
+_lock = threading.Lock()
+
+
+def _memoized(key, compute):
+    value = _memo.get(key)
+    if value is None:
+        # compute() can memoize too, so it runs outside the lock
+        value = compute()
+        with _lock:
+            if len(_memo) >= MEMO_LIMIT:
+                _memo.clear()
+            value = _memo.setdefault(key, value)
+    return value
+
+
+def split_variable(var):
+    """(prefix, name) of a heap or exponential variable; ("", var) for a plain one."""
+    if var.startswith(HEAP_PREFIX):
+        return HEAP_PREFIX, var[len(HEAP_PREFIX):]
+    if var.startswith(EXP_PREFIX):
+        name = var[len(EXP_PREFIX):].partition(":")[2]
+        return var[:len(var) - len(name)], name
+    return "", var
+
+
+class Term:
+    __slots__ = ("factors", "_growth", "__weakref__")
+    _interned = weakref.WeakValueDictionary()
+
+    def __new__(cls, factors=()):
+        factors = tuple(factors)
+        term = cls._interned.get(factors)
+        if term is None:
+            with _lock:
+                term = cls._interned.get(factors)
+                if term is None:
+                    term = object.__new__(cls)
+                    term.factors = factors      # ((var, power, log power), ...) sorted by var
+                    term._growth = None
+                    cls._interned[factors] = term
+        return term
+
+    def __reduce__(self):
+        return Term, (self.factors,)
+
+    def degree(self):
+        return sum(power for var, power, _ in self.factors if not var.startswith(EXP_PREFIX))
+
+    def log_degree(self):
+        return sum(log for _, _, log in self.factors)
+
+    def is_exponential(self):
+        return any(var.startswith(EXP_PREFIX) for var, _, _ in self.factors)
+
+    def growth(self):
+        """name -> (exponential base, power, log power): how fast the term grows in each size."""
+        if self._growth is None:
+            growth = {}
+            for var, power, log in self.factors:
+                prefix, name = split_variable(var)
+                base, p, l = growth.get(name, (1, 0, 0))
+                if prefix.startswith(EXP_PREFIX):
+                    base *= int(prefix[len(EXP_PREFIX):-1]) ** power
+                else:
+                    p, l = p + power, l + log
+                growth[name] = (base, p, l)
+            self._growth = growth
+        return self._growth
+
+    def dominates(self, other):
+        """True if self grows at least as fast as `other` in every variable.
+
+        Per variable, a bigger exponential base beats any power, and a bigger
+        power beats any log factor.
+        """
+        mine = self.growth()
+        return all(mine.get(name, (1, 0, 0)) >= growth for name, growth in other.growth().items())
+
+    def __mul__(self, other):
+        def compute():
+            merged = {var: (power, log) for var, power, log in self.factors}
+            for var, power, log in other.factors:
+                p, l = merged.get(var, (0, 0))
+                merged[var] = (p + power, l + log)
+            return Term((var, p, l) for var, (p, l) in sorted(merged.items()))
+        return _memoized(("term*", self, other), compute)
+
+
+class Cost:
+    __slots__ = ("terms", "__weakref__")
+    _interned = weakref.WeakValueDictionary()
+
+    def __new__(cls, terms=()):
+        terms = frozenset(_prune(terms))
+        cost = cls._interned.get(terms)
+        if cost is None:
+            with _lock:
+                cost = cls._interned.get(terms)
+                if cost is None:
+                    cost = object.__new__(cls)
+                    cost.terms = terms
+                    cls._interned[terms] = cost
+        return cost
+
+    def __reduce__(self):
+        return Cost, (tuple(self.terms),)
+
+    @staticmethod
+    def var(name):
+        return Cost([Term([(name, 1, 0)])])
+
+    @staticmethod
+    def log(name):
+        return Cost([Term([(name, 0, 1)])])
+
+    @staticmethod
+    def exp(base, name):
+        return Cost([Term([(f"{EXP_PREFIX}{base}:{name}", 1, 0)])])
+
+    def __add__(self, other):
+        if self is ZERO or self is other:
+            return other
+        if other is ZERO:
+            return self
+        key = ("+", self, other) if id(self) < id(other) else ("+", other, self)
+        return _memoized(key, lambda: Cost(self.terms | other.terms))
+
+    def __mul__(self, other):
+        if self is ONE or other is ZERO:
+            return other
+        if other is ONE or self is ZERO:
+            return self
+        key = ("*", self, other) if id(self) < id(other) else ("*", other, self)
+        return _memoized(key, lambda: Cost(a * b for a in self.terms for b in other.terms))
+
+    def variables(self):
+        return {var for term in self.terms for var, _, _ in term.factors}
+
+    def substitute(self, mapping):
+        """Replaces variables by costs, e.g. a function's parameter by its argument's size."""
+        mapping = {var: cost for var, cost in mapping.items() if var in self.variables()}
+        if not mapping:
+            return self
+        key = ("subst", self, tuple(sorted(mapping.items(), key=lambda item: item[0])))
+
+        def compute():
+            total = ZERO
+            for term in self.terms:
+                product = ONE
+                renamed = []
+                for var, power, log in term.factors:
+                    replacement = mapping.get(var)
+                    if replacement is None:
+                        renamed.append((var, power, log))
+                    elif _is_plain_variable(replacement):
+                        # Just a rename (n -> xs): N^p log^l N becomes XS^p log^l XS
+                        renamed.append((next(iter(replacement.terms)).factors[0][0], power, log))
+                    else:
+                        product = product * replacement.power(power) * replacement.log_of().power(log)
+                for factor in renamed:
+                    product = product * Cost([Term([factor])])
+                total = total + product
+            return total
+        return _memoized(key, compute)
+
+    def bind_heaps(self, size):
+        """Heap sizes inside a loop of `size` iterations become that size."""
+        if size is ONE:
+            return self
+        heaps = [var for var in self.variables() if var.startswith(HEAP_PREFIX)]
+        if not heaps:
+            return self
+        return self.substitute({var: size for var in heaps})
+
+    def power(self, n):
+        result, base = ONE, self
+        while n:
+            if n & 1:
+                result = result * base
+            n >>= 1
+            if n:
+                base = base * base
+        return result
+
+    def log_of(self):
+        """log of this cost: log(N^2 M) ~ log N + log M, log(2^N) ~ N, and log(1) = 1."""
+        return _memoized(("log", self), lambda: sum((
+            Cost.var(split_variable(var)[1]) if var.startswith(EXP_PREFIX) else Cost.log(var)
+            for var in self.variables()), ZERO) or ONE)
+
+    def degree(self):
+        return max((term.degree() for term in self.terms), default=0)
+
+    def has_log(self):
+        return any(term.log_degree() for term in self.terms)
+
+    def is_exponential(self):
+        return any(term.is_exponential() for term in self.terms)
+
+    def __bool__(self):
+        return self is not ZERO
+
+    def __repr__(self):
+        return f"Cost({self.format()!r})"
+
+    def format(self):
+        """Big-O text, naming variables N, M, K, ... in order of the terms they lead."""
+        if not self.terms or self.terms == ONE.terms:
+            return "1"
+        names = {}
+        for term in _ordered(self.terms):
+            for var, _, _ in sorted(term.factors, key=lambda f: (not f[0].startswith(EXP_PREFIX), -f[1], -f[2], f[0])):
+                name = split_variable(var)[1]
+                if name not in names:
+                    names[name] = LETTERS[len(names)] if len(names) < len(LETTERS) else f"N{len(names)}"
+        return " + ".join(_term_text(term, names) for term in _ordered(self.terms))
+
+
+def _ordered(terms):
+    # Biggest terms first; ties broken by variable name so the text is stable
+    return sorted(terms, key=lambda t: (
+        not t.is_exponential(), -t.degree(), -t.log_degree(), [f[0] for f in t.factors]))
+
+
+def _is_plain_variable(cost):
+    if len(cost.terms) != 1:
+        return False
+    factors = next(iter(cost.terms)).factors
+    return len(factors) == 1 and factors[0][1:] == (1, 0) and not factors[0][0].startswith(EXP_PREFIX)
+
+
+def _prune(terms):
+    """Drops every term dominated by another (and the constant when anything else is there)."""
+    terms = set(terms)
+    kept = []
+    for term in sorted(terms, key=lambda t: (not t.is_exponential(), -t.degree(), -t.log_degree())):
+        if not any(other.dominates(term) for other in kept):
+            kept.append(term)
+    # Exponentials don't sort by degree, so one may dominate a term kept before it
+    if len(kept) > 1 and kept[0].is_exponential():
+        kept = [term for term in kept if not any(other is not term and other.dominates(term) for other in kept)]
+    return kept
+
+
+def _rank(letter):
+    return LETTERS.index(letter) if letter in LETTERS else len(LETTERS) + int(letter[1:])
+
+
+def _term_text(term, names):
+    exponentials, powers, logs = [], [], []
+    for var, power, log in sorted(term.factors, key=lambda f: _rank(names[split_variable(f[0])[1]])):
+        prefix, var = split_variable(var)
+        name = names[var]
+        if prefix.startswith(EXP_PREFIX):
+            exponentials.append(f"{int(prefix[len(EXP_PREFIX):-1]) ** power}^{name}")
+            continue
+        if power:
+            powers.append(name if power == 1 else f"{name}^{power}")
+        if log:
+            logs.append(f"log {name}" if log == 1 else f"log^{log} {name}")
+    text = "*".join(exponentials + powers)
+    if logs:
+        text = f"{text} {' '.join(logs)}" if text else " ".join(logs)
+    return text or "1"
+
+
+def leading_order(text):
+    """(exponential base, degree, log degree) of the first term of a Big-O string.
+
+    Reads back what format() writes, whose first term is the biggest, so
+    stored reports can be ranked without their Costs: "O(2^N)" > "O(N^2)"
+    > "O(N log N)" > "O(N)" > "O(1)".
+    """
+    term = text[2:-1].split(" + ")[0] if text.startswith("O(") else text
+    base, degree, logs = 1, 0, 0
+    product, _, log_text = term.partition(" ")
+    if product.startswith("log"):
+        product, log_text = "", term
+    for factor in filter(None, product.split("*")):
+        left, _, right = factor.partition("^")
+        if left.isdigit():
+            base *= int(left)
+        elif left != "1":
+            degree += int(right or 1)
+    for factor in re.findall(r"log(?:\^(\d+))?", log_text):
+        logs += int(factor or 1)
+    return base, degree, logs
+
+
+ZERO = Cost()
+ONE = Cost([Term()])
@@ -0,0 +1,516 @@
+from collections import Counter
+from boundary_resolver import get_boundary_resolver
+
+# Nodes that open a scope for let/const, and the subset that also holds var
+# declarations and parameters
+SCOPE_TYPES = {
+    "program", "statement_block", "for_statement", "for_in_statement", "catch_clause",
+    "function_declaration", "generator_function_declaration", "function_expression",
+    "arrow_function", "method_definition", "class_body", "switch_body",
+}
+FUNCTION_SCOPE_TYPES = {
+    "program", "function_declaration", "generator_function_declaration", "function_expression",
+    "arrow_function", "method_definition",
+}
+# Identifier-like nodes that name a binding inside a pattern
+PATTERN_NAME_TYPES = {"identifier", "shorthand_property_identifier_pattern"}
+ASSIGNMENT_TYPES = {"assignment_expression", "augmented_assignment_expression"}
+
+# Python: names are local to a function (or lambda, class, comprehension),
+# not to a block
+PYTHON_SCOPE_TYPES = {
+    "module", "function_definition", "lambda", "class_definition",
+    "list_comprehension", "set_comprehension", "dictionary_comprehension", "generator_expression",
+}
+PYTHON_PATTERN_TYPES = {"pattern_list", "tuple_pattern", "list_pattern", "list_splat_pattern", "parenthesized_expression"}
+PYTHON_PARAMETER_TYPES = {"default_parameter", "typed_default_parameter", "typed_parameter"}
+
+# Top-level statements whose part of the table a session carries over from
+# the previous version of the file while their text stays the same: any
+# that declares no let/const there (JavaScript), or a definition (Python,
+# where any other statement can bind a module-level name)
+FRAGMENT_TYPES = {
+    "javascript": {
+        "function_declaration", "generator_function_declaration", "class_declaration",
+        "expression_statement", "if_statement", "for_statement", "for_in_statement",
+        "while_statement", "do_statement", "try_statement", "switch_statement", "statement_block",
+    },
+    "python": {"function_definition", "class_definition", "decorated_definition"},
+}
+
+
+class Binding:
+    __slots__ = ("name", "value", "reassigned", "element_of", "reads")
+
+    def __init__(self, name, value):
+        self.name = name
+        self.value = value              # initializer node, or None if it can never be constant
+        self.reassigned = False
+        self.element_of = None          # for `for (const x of xs)`: the xs node
+        self.reads = 0                  # identifiers that resolve to it
+
+
+class Scope:
+    __slots__ = ("parent", "names", "is_function")
+
+    def __init__(self, parent, is_function):
+        self.parent = parent
+        self.names = {}                 # name bytes -> Binding
+        self.is_function = is_function
+
+    def declare(self, name, value):
+        """Adds a binding; returns it, or None if the name was already declared here."""
+        if name in self.names:
+            # Redeclared (var, or invalid code): don't trust either value
+            self.names[name].value = None
+            self.names[name].element_of = None
+            return None
+        binding = self.names[name] = Binding(name, value)
+        return binding
+
+    def resolve(self, name):
+        scope = self
+        while scope is not None:
+            binding = scope.names.get(name)
+            if binding is not None:
+                return binding
+            scope = scope.parent
+        return None
+
+
+class Fragment:
+    """What one top-level statement adds to the table, without positions.
+
+    Nothing outside it can see its own bindings, so the rest of the file
+    only needs the names it declares at the top level and the names it
+    reads and writes there (or leaves unresolved). Built with a `reuse`
+    map, a table records one per top-level statement of FRAGMENT_TYPES, and
+    takes a reused one in place of walking the statement again.
+    """
+
+    __slots__ = ("key", "declared", "reads", "writes", "shared", "bindings", "functions", "entries")
+
+    def __init__(self, key):
+        self.key = key                  # see fragment_key
+        self.declared = []              # names it declares in the top-level scope
+        self.reads = Counter()          # names it reads from there, or leaves unresolved
+        self.writes = set()             # the same for writes
+        self.shared = set()             # Python `global`/`nonlocal` names
+        self.bindings = []              # its own bindings and named functions, until
+        self.functions = []             # fingerprint() has turned them into `entries`
+        self.entries = None
+
+
+def fragment_key(node, code_bytes):
+    """What a fragment is reused by: the statement's kind and text."""
+    return node.type, hash(code_bytes[node.start_byte:node.end_byte])
+
+
+class ConstantTable:
+    """The initializer behind every identifier that reads a constant-candidate binding.
+
+    `values` maps an identifier reference's start byte to the initializer of
+    the `const`, or never-reassigned `let`, it resolves to. Whether that
+    initializer is itself constant is left to the BoundaryResolver, which
+    follows these entries when it meets an identifier. `elements` does the
+    same for for-of loop variables, mapping each read to the iterable, so
+    sizes can be traced back to it. Reads inside reused fragments are not
+    in either.
+    """
+
+    def __init__(self, values=None, bindings=(), elements=None, functions=(), fragments=(), shared=frozenset(), free=frozenset()):
+        self.values = values if values is not None else {}
+        self.bindings = bindings
+        self.elements = elements if elements is not None else {}
+        self.functions = functions      # names of named functions and methods
+        self.fragments = fragments
+        self.shared = shared            # Python `global`/`nonlocal` names
+        self.free = free                # names read somewhere without a binding
+
+    def fingerprint(self, memo, size_variable):
+        """What the bindings look like to the resolver, independent of where they are.
+
+        Two versions of a file with the same fingerprint resolve every name
+        the same way, so loop decisions and loop sizes made against one hold
+        for the other. `size_variable(node)` names the size of an initializer
+        or iterable. Each binding counts the reads that reach it, so a
+        parameter, var or function that starts shadowing one changes it too,
+        and the names of local functions are listed, since calls resolve to
+        them by name, as are names read without a binding somewhere and
+        bound elsewhere, which that binding can start to reach. A
+        fragment's entries are taken once and kept with it: while the rest
+        of the fingerprint stays the same, so do they.
+        """
+        resolver = get_boundary_resolver()
+
+        def entries(bindings, functions):
+            listed = [("function", name) for name in functions]
+            listed.extend(
+                ("binding", b.name, b.reads, resolver.is_constant(b.value, memo), resolver.get_truthiness(b.value, memo), size_variable(b.value))
+                if b.value is not None else ("binding", b.name, b.reads, None, None, size_variable(b.element_of))
+                for b in bindings
+                if not b.reassigned and (b.value is not None or b.element_of is not None)
+            )
+            return listed
+
+        fingerprint = Counter(entries(self.bindings, self.functions))
+        fingerprint.update(("global", name) for name in self.shared)
+        for fragment in self.fragments:
+            if fragment.entries is None:
+                fragment.entries = entries(fragment.bindings, fragment.functions)
+                fragment.bindings = fragment.functions = None
+            if fragment.entries:
+                fingerprint.update(fragment.entries)
+        bound = {entry[1] for entry in fingerprint if entry[0] == "binding"}
+        fingerprint.update(("free", name) for name in self.free & bound)
+        return fingerprint
+
+
+def _resolve(program, bindings, reads, writes, reused, shared=frozenset()):
+    """Resolves the collected writes and reads; returns (values, elements, shared, free).
+
+    `reads` and `writes` hold (start byte, name, scope, fragment) and
+    (name, scope, fragment); each one that leaves its fragment for the
+    top-level `program` scope is recorded in the fragment. The `reused`
+    fragments' top-level reads and writes are applied by name. A binding
+    whose name is `shared` (Python `global`/`nonlocal`), in a reused
+    fragment or not, counts as reassigned. `free` holds the names read
+    without a binding.
+    """
+    for name, write_scope, fragment in writes:
+        binding = write_scope.resolve(name)
+        if binding is not None:
+            binding.reassigned = True
+        if fragment is not None and (binding is None or program.names.get(name) is binding):
+            fragment.writes.add(name)
+    for fragment in reused:
+        for name in fragment.writes:
+            binding = program.names.get(name)
+            if binding is not None:
+                binding.reassigned = True
+        shared = shared | fragment.shared
+    if shared:
+        # `global x` lets another function rebind x
+        for binding in bindings:
+            if binding.name in shared:
+                binding.reassigned = True
+
+    values, elements, free = {}, {}, set()
+    for start_byte, name, read_scope, fragment in reads:
+        binding = read_scope.resolve(name)
+        if fragment is not None and (binding is None or program.names.get(name) is binding):
+            fragment.reads[name] += 1
+        if binding is None:
+            free.add(name)
+            continue
+        if binding.reassigned:
+            continue
+        binding.reads += 1
+        if binding.value is not None:
+            values[start_byte] = binding.value
+        elif binding.element_of is not None:
+            elements[start_byte] = binding.element_of
+    for fragment in reused:
+        for name, count in fragment.reads.items():
+            binding = program.names.get(name)
+            if binding is None:
+                free.add(name)
+            elif not binding.reassigned:
+                binding.reads += count
+    return values, elements, shared, free
+
+
+def _pattern_names(node):
+    """Identifiers bound by a declarator name, parameter or assignment target."""
+    names, stack = [], [node]
+    while stack:
+        node = stack.pop()
+        if node.type in PATTERN_NAME_TYPES:
+            names.append(node)
+        elif node.type in ("array_pattern", "object_pattern", "rest_pattern"):
+            stack.extend(node.named_children)
+        elif node.type == "pair_pattern":
+            stack.append(node.child_by_field_name("value"))
+        elif node.type in ("assignment_pattern", "object_assignment_pattern"):
+            stack.append(node.child_by_field_name("left"))
+    return names
+
+
+def build_constant_table(language_name, root, code_bytes, reuse=None) -> ConstantTable:
+    """Builds the table in one cursor pass over the tree.
+
+    Declarations, writes and reads are collected per scope on the way down;
+    reads and writes are resolved afterwards, once every scope knows all of
+    its names (let/const are visible in their whole block, not just after
+    the declaration).
+
+    With `reuse` (top-level node id -> Fragment, see sessions.py), each
+    top-level statement of FRAGMENT_TYPES gets a fragment, and those in
+    `reuse` are taken from it instead of walked.
+    """
+    if language_name == "python":
+        return _build_python_table(root, code_bytes, reuse)
+    if language_name != "javascript":
+        return ConstantTable()
+
+    def text(node):
+        return code_bytes[node.start_byte:node.end_byte]
+
+    def function_scope(scope):
+        while not scope.is_function:
+            scope = scope.parent
+        return scope
+
+    scope_nodes, bindings, reads, writes, functions = [], [], [], [], []
+    fragments, reused = [], []
+    fragment, owned, named = None, bindings, functions
+    scope = program = None
+    depth = 0
+    cursor = root.walk()
+    while True:
+        node = cursor.node
+        node_type = node.type
+        descend = True
+
+        if depth == 1 and reuse is not None:
+            fragment = reuse.get(node.id)
+            if fragment is not None:
+                for name in fragment.declared:
+                    scope.declare(name, None)
+                reused.append(fragment)
+                # Not walked: what it declares, reads and writes is in the fragment
+                node_type, descend = None, False
+            elif node_type in FRAGMENT_TYPES["javascript"]:
+                fragment = Fragment(fragment_key(node, code_bytes))
+            if fragment is not None:
+                fragments.append(fragment)
+            if fragment is None:
+                owned, named = bindings, functions
+            else:
+                owned, named = fragment.bindings, fragment.functions
+
+        if node_type in ("function_declaration", "generator_function_declaration", "class_declaration", "method_definition"):
+            name = node.child_by_field_name("name")
+            if name is not None and scope is not None:
+                if node_type != "class_declaration":
+                    named.append(text(name))
+                if node_type != "method_definition":
+                    scope.declare(text(name), None)
+                    if fragment is not None and scope.parent is None:
+                        fragment.declared.append(text(name))
+
+        if node_type in SCOPE_TYPES or program is None:
+            # The root opens the top-level scope whatever its type: half-typed
+            # code can parse to an ERROR root
+            scope = Scope(scope, node_type in FUNCTION_SCOPE_TYPES or program is None)
+            scope_nodes.append(node.id)
+            program = program or scope
+            if node_type == "arrow_function":
+                parameter = node.child_by_field_name("parameter")
+                if parameter is not None:
+                    scope.declare(text(parameter), None)
+            elif node_type == "catch_clause":
+                parameter = node.child_by_field_name("parameter")
+                if parameter is not None:
+                    for name in _pattern_names(parameter):
+                        scope.declare(text(name), None)
+            elif node_type == "for_in_statement":
+                left = node.child_by_field_name("left")
+                # `for (const x of xs)`: x takes a new value every iteration
+                operator = node.child_by_field_name("operator")
+                is_of = operator is not None and operator.type == "of"
+                for name in _pattern_names(left):
+                    if node.child_by_field_name("kind") is not None:
+                        binding = scope.declare(text(name), None)
+                        if binding is not None and is_of:
+                            binding.element_of = node.child_by_field_name("right")
+                            owned.append(binding)
+                    else:
+                        writes.append((text(name), scope, fragment))
+
+        elif node_type == "lexical_declaration":
+            for declarator in node.named_children:
+                if declarator.type != "variable_declarator":
+                    continue
+                name = declarator.child_by_field_name("name")
+                if name.type == "identifier":
+                    binding = scope.declare(text(name), declarator.child_by_field_name("value"))
+                    if binding is not None:
+                        owned.append(binding)
+                else:
+                    for identifier in _pattern_names(name):
+                        scope.declare(text(identifier), None)
+
+        elif node_type == "variable_declaration":
+            target = function_scope(scope)
+            for declarator in node.named_children:
+                if declarator.type == "variable_declarator":
+                    for identifier in _pattern_names(declarator.child_by_field_name("name")):
+                        target.declare(text(identifier), None)
+                        if fragment is not None and target is program:
+                            fragment.declared.append(text(identifier))
+
+        elif node_type == "formal_parameters":
+            for parameter in node.named_children:
+                for identifier in _pattern_names(parameter):
+                    scope.declare(text(identifier), None)
+
+        elif node_type in ASSIGNMENT_TYPES:
+            for identifier in _pattern_names(node.child_by_field_name("left")):
+                writes.append((text(identifier), scope, fragment))
+
+        elif node_type == "update_expression":
+            argument = node.child_by_field_name("argument")
+            if argument is not None and argument.type == "identifier":
+                writes.append((text(argument), scope, fragment))
+
+        elif node_type == "identifier":
+            reads.append((node.start_byte, text(node), scope, fragment))
+
+        if descend and cursor.goto_first_child():
+            depth += 1
+            continue
+        # Leave finished nodes, closing their scopes, until one has a next sibling
+        finished = False
+        while not finished:
+            if scope_nodes and scope_nodes[-1] == cursor.node.id:
+                scope_nodes.pop()
+                scope = scope.parent
+            if cursor.goto_next_sibling():
+                break
+            finished = not cursor.goto_parent()
+            depth -= 1
+        if finished:
+            break
+
+    values, elements, _, free = _resolve(program, (), reads, writes, reused)
+    return ConstantTable(values, bindings, elements, functions, fragments, free=free)
+
+
+def _python_names(node):
+    """Identifiers bound by an assignment target, loop target or parameter."""
+    names, stack = [], [node]
+    while stack:
+        node = stack.pop()
+        if node is None:
+            continue
+        if node.type == "identifier":
+            names.append(node)
+        elif node.type in PYTHON_PATTERN_TYPES:
+            stack.extend(node.named_children)
+        elif node.type in PYTHON_PARAMETER_TYPES:
+            stack.append(node.child_by_field_name("name") or node.named_child(0))
+    return names
+
+
+def _build_python_table(root, code_bytes, reuse=None):
+    """Python flavor of build_constant_table.
+
+    A name assigned exactly once in its function is an alias for its value,
+    and a for-loop or comprehension target is an element of its iterable.
+    Nothing here is a constant for the BoundaryResolver (Python loops are
+    judged by _is_constant_loop), it only lets sizes be traced.
+    """
+    def text(node):
+        return code_bytes[node.start_byte:node.end_byte]
+
+    scope_nodes, bindings, reads, writes, functions, shared = [], [], [], [], [], set()
+    fragments, reused = [], []
+    fragment, owned, named = None, bindings, functions
+    scope = program = None
+    depth = 0
+    cursor = root.walk()
+    while True:
+        node = cursor.node
+        node_type = node.type
+        descend = True
+
+        if depth == 1 and reuse is not None:
+            fragment = reuse.get(node.id)
+            if fragment is not None:
+                reused.append(fragment)
+                # Not walked: what it declares, reads and writes is in the fragment
+                node_type, descend = None, False
+            elif node_type in FRAGMENT_TYPES["python"]:
+                fragment = Fragment(fragment_key(node, code_bytes))
+            if fragment is not None:
+                fragments.append(fragment)
+            if fragment is None:
+                owned, named = bindings, functions
+            else:
+                owned, named = fragment.bindings, fragment.functions
+
+        if node_type in ("function_definition", "class_definition"):
+            name = node.child_by_field_name("name")
+            if name is not None and scope is not None:
+                writes.append((text(name), scope, fragment))
+                if node_type == "function_definition":
+                    named.append(text(name))
+
+        if node_type in PYTHON_SCOPE_TYPES or program is None:
+            scope = Scope(scope, True)
+            scope_nodes.append(node.id)
+            program = program or scope
+            parameters = node.child_by_field_name("parameters")
+            for parameter in (parameters.named_children if parameters is not None else ()):
+                for name in _python_names(parameter):
+                    scope.declare(text(name), None)
+
+        if node_type == "assignment":
+            left = node.child_by_field_name("left")
+            value = node.child_by_field_name("right")
+            if left.type == "identifier" and value is not None:
+                binding = scope.declare(text(left), value)
+                if binding is None:
+                    writes.append((text(left), scope, fragment))
+                else:
+                    owned.append(binding)
+            else:
+                for name in _python_names(left):
+                    writes.append((text(name), scope, fragment))
+
+        elif node_type in ("for_statement", "for_in_clause"):
+            left = node.child_by_field_name("left")
+            if left is not None and left.type == "identifier":
+                binding = scope.declare(text(left), None)
+                if binding is None:
+                    writes.append((text(left), scope, fragment))
+                else:
+                    binding.element_of = node.child_by_field_name("right")
+                    owned.append(binding)
+            else:
+                for name in _python_names(left):
+                    writes.append((text(name), scope, fragment))
+
+        elif node_type in ("augmented_assignment", "named_expression", "as_pattern_target"):
+            target = node.child_by_field_name("left") or node.child_by_field_name("name") or node.named_child(0)
+            for name in _python_names(target):
+                writes.append((text(name), scope, fragment))
+
+        elif node_type in ("global_statement", "nonlocal_statement"):
+            names = [text(name) for name in node.named_children if name.type == "identifier"]
+            shared.update(names)
+            if fragment is not None:
+                fragment.shared.update(names)
+
+        elif node_type == "identifier":
+            reads.append((node.start_byte, text(node), scope, fragment))
+
+        if descend and cursor.goto_first_child():
+            depth += 1
+            continue
+        finished = False
+        while not finished:
+            if scope_nodes and scope_nodes[-1] == cursor.node.id:
+                scope_nodes.pop()
+                scope = scope.parent
+            if cursor.goto_next_sibling():
+                break
+            finished = not cursor.goto_parent()
+            depth -= 1
+        if finished:
+            break
+
+    walked = bindings + [b for f in fragments if f.entries is None and f.bindings for b in f.bindings]
+    values, elements, shared, free = _resolve(program, walked, reads, writes, reused, shared)
+    return ConstantTable(values, bindings, elements, functions, fragments, shared, free)
@@ -0,0 +1,99 @@
+from array import array
+from bisect import bisect_right
+
+
+class FlatTree:
+    """A parsed tree as parallel arrays, one slot per node in pre-order.
+
+    `types` holds interned node-kind ids (Grammar.type_names turns them back
+    into names) and `fields` the id of the field a node sits in under its
+    parent (0 for none; Grammar.field_names). Links are implicit in the
+    pre-order: `after[i]` is the slot just past i's subtree, so i's first
+    child is i + 1 when after[i] > i + 1, and the next sibling of a child
+    i of p is after[i] when that is below after[p]. Walking these is plain
+    integer indexing: no Node objects, child lists or calls into tree-sitter.
+
+    `start` and `end` (byte offsets) are only filled in when asked for.
+    No Node objects are held: `index` maps the Node.id of nodes whose kind
+    is in the `roots` set passed to flatten() (and of the tree's root) to
+    their slot, and node() makes the Node for a slot again, since a slot
+    is also that node's descendant index under the root.
+
+    Subtrees passed to flatten() as `prune` keep their own slot, listed in
+    `pruned`, but none for their descendants, so they look like leaves;
+    `skips` holds the slot after each of them and how many descendants
+    were left out before it, which node() adds back.
+    """
+
+    __slots__ = ("types", "fields", "after", "start", "end", "index", "cursor", "pruned", "skips", "skipped")
+
+    def __init__(self, root, spans, size):
+        # Allocated once at full size and filled in place. Field ids fit a
+        # byte (both grammars have under 40 fields); kind ids don't
+        self.types = array("H", [0]) * size
+        self.fields = array("B", [0]) * size
+        self.after = array("I", [0]) * size
+        self.start = array("I", [0]) * size if spans else None
+        self.end = array("I", [0]) * size if spans else None
+        self.index = {}     # Node.id -> slot, for root kinds and the tree's root
+        self.cursor = root.walk()
+        self.pruned = set()
+        self.skips = []     # slot after a pruned one, ascending
+        self.skipped = []   # descendants left out up to there
+
+    def __len__(self):
+        return len(self.types)
+
+    def node(self, slot):
+        """The Node in `slot`, found with TreeCursor.goto_descendant."""
+        if self.skips:
+            i = bisect_right(self.skips, slot)
+            if i:
+                slot += self.skipped[i - 1]
+        self.cursor.goto_descendant(slot)
+        return self.cursor.node
+
+
+def flatten(root, roots=frozenset(), spans=False, prune=()) -> FlatTree:
+    """Flattens the tree under `root` in one TreeCursor pass.
+
+    `roots` is a set of node-kind ids the caller will start walks from (see
+    FlatTree); every other node is only read here, and later through its
+    slot. `spans` also records byte offsets. The descendants of the nodes
+    in `prune`, children of `root`, are not flattened (see FlatTree).
+    """
+    pruned = {node.id for node in prune}
+    size = root.descendant_count - sum(node.descendant_count - 1 for node in prune)
+    flat = FlatTree(root, spans, size)
+    types, fields, after = flat.types, flat.fields, flat.after
+    start, end, index = flat.start, flat.end, flat.index
+    skips, skipped = flat.skips, flat.skipped
+    index[root.id] = 0
+
+    cursor = root.walk()
+    slot = 0
+    while True:
+        node = cursor.node
+        kind = types[slot] = node.kind_id
+        fields[slot] = cursor.field_id or 0
+        if spans:
+            start[slot] = node.start_byte
+            end[slot] = node.end_byte
+        if kind in roots:
+            index[node.id] = slot
+
+        if pruned and node.id in pruned:
+            after[slot] = slot + 1
+            flat.pruned.add(slot)
+            slot += 1
+            skips.append(slot)
+            skipped.append((skipped[-1] if skipped else 0) + node.descendant_count - 1)
+        else:
+            after[slot] = slot + node.descendant_count
+            slot += 1
+            if cursor.goto_first_child():
+                continue
+        while not cursor.goto_next_sibling():
+            if not cursor.goto_parent():
+                after[0] = size
+                return flat
@@ -0,0 +1,137 @@
+import importlib
+import re
+import threading
+from tree_sitter import Language
+from operator_table import OperatorMatcher, TABLES, SPACE_TABLES
+from call_graph import FUNCTION_TYPES
+
+# --- NODE TYPES ---
+# loops:          nodes that repeat their body
+# split_loops:    loops whose header runs once, outside the body
+# comprehensions: expressions that loop over their for-clauses (Python)
+# call/member/new: the node types the walker treats as calls, member
+#                  access and constructors (None if the language has none)
+
+NODE_TYPES = {
+    "javascript": {
+        "module": "tree_sitter_javascript",
+        "loops": {"for_statement", "while_statement", "do_statement", "for_of_statement", "for_in_statement"},
+        "split_loops": {"for_statement", "for_of_statement", "for_in_statement", "while_statement"},
+        "comprehensions": set(),
+        "call": "call_expression",
+        "member": "member_expression",
+        "new": "new_expression",
+    },
+    "python": {
+        "module": "tree_sitter_python",
+        "loops": {"for_statement", "while_statement"},
+        "split_loops": {"for_statement", "while_statement"},
+        "comprehensions": {
+            "list_comprehension", "set_comprehension", "dictionary_comprehension", "generator_expression",
+        },
+        "call": "call",
+        "member": "attribute",
+        "new": None,
+    },
+}
+
+ALIASES = {"js": "javascript", "jsx": "javascript", "node": "javascript", "py": "python", "python3": "python"}
+DEFAULT_LANGUAGE = "javascript"
+ERROR_KIND = 0xFFFF  # kind id tree-sitter gives ERROR nodes
+
+
+class Grammar:
+    """One language's tree-sitter grammar plus the tables the analyzer reads it with."""
+
+    def __init__(self, name, language, matcher, node_types, space_matcher=None):
+        self.name = name
+        self.language = language
+        self.matcher = matcher
+        self.space_matcher = space_matcher
+        self.loop_types = node_types["loops"]
+        self.split_loop_types = node_types["split_loops"]
+        self.comprehension_types = node_types["comprehensions"]
+        self.call_type = node_types["call"]
+        self.member_type = node_types["member"]
+        self.new_type = node_types["new"]
+        self.function_types = FUNCTION_TYPES[name]
+        # Node-kind and field ids to names, for trees read as flat arrays (flat_tree.py)
+        # A dict, since ERROR nodes carry the out-of-range id 0xFFFF
+        self.type_names = {i: language.node_kind_for_id(i) for i in range(language.node_kind_count)}
+        self.type_names[ERROR_KIND] = "ERROR"
+        self.field_names = [None] + [language.field_name_for_id(i) for i in range(1, language.field_count + 1)]
+
+    def kind_ids(self, names):
+        """Every node-kind id (aliases included) whose name is in `names`."""
+        return frozenset(i for i, name in self.type_names.items() if name in names)
+
+
+class GrammarRegistry:
+    """Loads each language's grammar module and tables the first time it is asked for.
+
+    A process that only ever sees JavaScript never imports the Python
+    grammar, which keeps startup and per-worker memory down.
+    """
+
+    def __init__(self, node_types=NODE_TYPES):
+        self.node_types = node_types
+        self._grammars = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> Grammar:
+        grammar = self._grammars.get(name)
+        if grammar is None:
+            with self._lock:
+                grammar = self._grammars.get(name)
+                if grammar is None:
+                    grammar = self._grammars[name] = self._load(name)
+        return grammar
+
+    def _load(self, name):
+        node_types = self.node_types[name]
+        module = importlib.import_module(node_types["module"])
+        return Grammar(
+            name, Language(module.language()), OperatorMatcher(TABLES[name]), node_types,
+            OperatorMatcher(SPACE_TABLES[name]),
+        )
+
+    def loaded(self):
+        """Names of the grammars loaded so far."""
+        return list(self._grammars)
+
+    def resolve(self, language: str, code: str = None) -> str:
+        """Canonical name for `language`; "auto" detects it from `code`.
+
+        Unknown names fall back to JavaScript.
+        """
+        language = (language or DEFAULT_LANGUAGE).lower()
+        if language == "auto":
+            return detect_language(code or "")
+        language = ALIASES.get(language, language)
+        return language if language in self.node_types else DEFAULT_LANGUAGE
+
+
+# --- LANGUAGE DETECTION ---
+# Line-level signals that are common in one language and rare in the other.
+# Only the first few KB are looked at; ties go to JavaScript.
+
+DETECT_BYTES = 4096
+PYTHON_SIGNALS = re.compile(
+    r"^\s*(?:def \w+\s*\(.*\)\s*(?:->.*)?:|class \w+.*:|(?:el)?if .*:|else:|for \w.* in .*:|while .*:"
+    r"|import \w[\w.]*(?: as \w+)?|from [\w.]+ import |elif |try:|except\b.*:|with .*:|return\b[^;{]*)\s*(?:#.*)?$",
+    re.MULTILINE,
+)
+JAVASCRIPT_SIGNALS = re.compile(
+    r"(?:[;{}]\s*$|\bfunction\b|=>|\b(?:const|let|var)\s+\w|===|!==|\bnew\s+[A-Z]|//|\bconsole\.)",
+    re.MULTILINE,
+)
+
+
+def detect_language(code: str) -> str:
+    sample = code[:DETECT_BYTES]
+    python = len(PYTHON_SIGNALS.findall(sample))
+    javascript = len(JAVASCRIPT_SIGNALS.findall(sample))
+    return "python" if python > javascript else "javascript"
+
+
+grammars = GrammarRegistry()
@@ -1,9 +1,22 @@
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 from routes import router as analyze_router
+from admission import admission
+from metrics import metrics, CONTENT_TYPE
+from prefork import state, memory, warm_up
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app):
+    # Nothing is served before a warm-up analysis per preloaded language (see prefork.py)
+    await warm_up()
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
 
 ALLOWED_ORIGIN = os.getenv("FRONTEND_URL", "*")
 
@@ -18,6 +31,20 @@ app.add_middleware(
 # Include Routes
 app.include_router(analyze_router, prefix="/api")
 
+metrics.gauge("analysis_in_flight", "Analyses running or queued.", lambda: admission.in_flight)
+metrics.gauge("worker_cold_start_seconds", "Start to ready, warm-up included.", lambda: state.cold_start or 0)
+metrics.gauge("worker_rss_bytes", "Resident memory of this worker.", lambda: memory()["rss"])
+
 @app.get("/")
 def health_check():
-    return {"status": "Backend is running"}
\ No newline at end of file
+    return {"status": "Backend is running"}
+
+@app.get("/ready")
+def readiness():
+    if not state.ready:
+        return JSONResponse({"status": "warming up"}, status_code=503)
+    return {"status": "ready", "pid": os.getpid(), "cold_start_seconds": state.cold_start, "memory": memory()}
+
+@app.get("/metrics")
+def metrics_endpoint():
+    return Response(metrics.render(), media_type=CONTENT_TYPE)
\ No newline at end of file
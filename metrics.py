@@ -0,0 +1,223 @@
+import cProfile
+import heapq
+import os
+import random
+import threading
+import time
+
+# Prometheus text exposition format, version 0.0.4
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+NODE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000)
+DEPTH_BUCKETS = (5, 10, 25, 50, 100, 250, 1_000)
+# Code sizes (characters) latency is broken down by, named after their upper bound
+SIZE_BUCKETS = ((1_000, "1k"), (10_000, "10k"), (100_000, "100k"))
+# Grammar names, as ComplexityAnalyzer.resolve_language gives them
+LANGUAGE_LABELS = {"javascript", "python"}
+STAGES = ("queue", "parse", "traverse", "serialize")
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{value}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.label_names, labels)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram, one series per label combination."""
+
+    def __init__(self, name, help_text, buckets, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets) + (float("inf"),)
+        self.label_names = label_names
+        self._series = {}       # labels -> [per-bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        names = self.label_names + ("le",)
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f"{self.name}_bucket{_labels(names, labels + (_number(bound),))} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {_number(total)}")
+                lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {count}")
+        return lines
+
+
+class ServiceMetrics:
+    """Everything /metrics reports about analysis requests."""
+
+    def __init__(self):
+        self.requests = Counter(
+            "analysis_requests_total", "Analysis requests by language and outcome.", ("language", "status"))
+        self.latency = Histogram(
+            "analysis_request_seconds", "End-to-end analysis latency by language and code size.",
+            LATENCY_BUCKETS, ("language", "size"))
+        self.stages = Histogram(
+            "analysis_stage_seconds", "Time spent per stage: queue, parse, traverse, serialize.",
+            LATENCY_BUCKETS, ("stage",))
+        self.nodes = Histogram("analysis_nodes", "Syntax tree nodes walked per analysis.", NODE_BUCKETS)
+        self.depth = Histogram("analysis_max_depth", "Deepest nesting the walk reached per analysis.", DEPTH_BUCKETS)
+        self.gauges = {}        # name -> (help, zero-argument function)
+
+    def gauge(self, name, help_text, read):
+        self.gauges[name] = (help_text, read)
+
+    def observe(self, language, code_size, seconds, stats, status="success"):
+        """Records one request; `stats` is what the analysis filled in (see analyze_report).
+
+        `language` is the grammar the code was analyzed with, so that "py",
+        "auto" and the like count under the language they resolved to.
+        """
+        language = _language_label(language)
+        self.requests.inc(language, status)
+        self.latency.observe(seconds, language, size_label(code_size))
+        self._observe_stages(stats)
+
+    def observe_batch(self, members, stats):
+        """Records a batch: one (language, status) per snippet, and the batch's own `stats`.
+
+        Snippets are analyzed in worker processes, so they are counted but
+        not timed one by one.
+        """
+        for language, status in members:
+            self.requests.inc(_language_label(language), status)
+        self._observe_stages(stats)
+
+    def _observe_stages(self, stats):
+        for stage in STAGES:
+            if stage in stats:
+                self.stages.observe(stats[stage], stage)
+        if "nodes" in stats:
+            self.nodes.observe(stats["nodes"])
+            self.depth.observe(stats["max_depth"])
+
+    def render(self):
+        lines = []
+        for metric in (self.requests, self.latency, self.stages, self.nodes, self.depth):
+            lines.extend(metric.render())
+        for name, (help_text, read) in sorted(self.gauges.items()):
+            lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {_number(read())}"])
+        return "\n".join(lines) + "\n"
+
+
+def _language_label(language):
+    return language if language in LANGUAGE_LABELS else "other"
+
+
+def size_label(code_size):
+    for bound, label in SIZE_BUCKETS:
+        if code_size <= bound:
+            return label
+    return "more"
+
+
+# --- PROFILING ---
+
+class SlowRequestProfiler:
+    """Opt-in sampling profiler that keeps the cProfile dumps of the slowest requests.
+
+    A `sample_rate` fraction of calls run under cProfile, in the thread that
+    does the work, one at a time (a sample that would overlap another runs
+    unprofiled). Of those, the `keep` slowest are dumped to `directory` as
+    <milliseconds>-<sequence>.prof (readable with pstats or snakeviz); a
+    dump pushed out of the top `keep` is deleted.
+    """
+
+    def __init__(self, directory=None, keep=10, sample_rate=0.0):
+        self.directory = directory
+        self.keep = keep
+        self.sample_rate = sample_rate if directory else 0.0
+        self._slowest = []      # min-heap of (seconds, path)
+        self._sequence = 0
+        self._lock = threading.Lock()
+        # Only one cProfile can be active per process, so samples don't overlap
+        self._profiling = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            directory=os.getenv("ANALYSIS_PROFILE_DIR") or None,
+            keep=int(os.getenv("ANALYSIS_PROFILE_KEEP", "10")),
+            sample_rate=float(os.getenv("ANALYSIS_PROFILE_SAMPLE", "0.01")),
+        )
+
+    def run(self, fn, *args, **kwargs):
+        if not self.sample_rate or random.random() >= self.sample_rate:
+            return fn(*args, **kwargs)
+        if not self._profiling.acquire(blocking=False):
+            return fn(*args, **kwargs)
+        try:
+            profile = cProfile.Profile()
+            start = time.perf_counter()
+            try:
+                return profile.runcall(fn, *args, **kwargs)
+            finally:
+                self._record(time.perf_counter() - start, profile)
+        finally:
+            self._profiling.release()
+
+    def _record(self, seconds, profile):
+        with self._lock:
+            if len(self._slowest) >= self.keep and seconds <= self._slowest[0][0]:
+                return
+            self._sequence += 1
+            path = os.path.join(self.directory, f"{seconds * 1000:.0f}ms-{self._sequence}.prof")
+            os.makedirs(self.directory, exist_ok=True)
+            profile.dump_stats(path)
+            heapq.heappush(self._slowest, (seconds, path))
+            if len(self._slowest) > self.keep:
+                os.remove(heapq.heappop(self._slowest)[1])
+
+    def slowest(self):
+        """(seconds, path) of the dumps kept, slowest first."""
+        with self._lock:
+            return sorted(self._slowest, reverse=True)
+
+
+metrics = ServiceMetrics()
+profiler = SlowRequestProfiler.from_env()
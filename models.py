@@ -1,10 +1,55 @@
+from typing import List, Optional
 from pydantic import BaseModel
 
 class CodeSnippet(BaseModel):
     code: str
+    language: str = "javascript"  # or "python", or "auto" to detect it
+
+class FunctionReport(BaseModel):
+    name: str
+    start_line: int
+    end_line: int
+    complexity: str
+    reason: str
+    space_complexity: Optional[str] = None
+    space_reason: Optional[str] = None
 
 class AnalysisResponse(BaseModel):
     complexity: str
     time_complexity: str
     time_reason: str
-    status: str
\ No newline at end of file
+    space_complexity: str
+    space_reason: str
+    status: str
+    functions: List[FunctionReport] = []
+
+class BatchRequest(BaseModel):
+    snippets: List[CodeSnippet]
+
+class BatchItemResult(BaseModel):
+    time_complexity: Optional[str] = None
+    time_reason: Optional[str] = None
+    space_complexity: Optional[str] = None
+    space_reason: Optional[str] = None
+    functions: Optional[List[FunctionReport]] = None
+    status: str
+    error: Optional[str] = None
+
+class BatchResponse(BaseModel):
+    results: List[BatchItemResult]
+
+class SessionResponse(BaseModel):
+    session_id: str
+    complexity: str
+    time_complexity: str
+    time_reason: str
+    status: str
+
+class TextEdit(BaseModel):
+    # UTF-8 byte offsets into the buffer as left by the previous edit
+    start_byte: int
+    old_end_byte: int
+    new_text: str
+
+class EditRequest(BaseModel):
+    edits: List[TextEdit]
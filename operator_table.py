@@ -0,0 +1,176 @@
+LINEAR = "linear"
+LOG = "log"                # One heap operation: log of the heap's size
+SORT = "sort"              # N log N in the size of what is sorted
+HEAP = "heap"              # Building an empty heap: constant
+COLLECTION = "collection"  # Linear only when built from a non-empty source (see _is_linear_constructor)
+
+
+# --- LANGUAGE TABLES ---
+# methods:      callee property name -> kind, whatever the receiver
+# statics:      (receiver, property) -> kind, for calls like Object.keys(x)
+# receivers:    receiver name -> kind, for any property (heapq.heappush)
+#               Receivers named here and in statics are namespaces: the size
+#               that matters is their first argument's, not theirs
+# functions:    bare callee name -> kind
+# constructors: `new` target name -> kind
+
+JAVASCRIPT = {
+    "member_type": "member_expression",
+    "object_field": "object",
+    "property_field": "property",
+    "methods": {
+        # Iterators
+        "map": LINEAR, "filter": LINEAR, "forEach": LINEAR, "reduce": LINEAR,
+        "includes": LINEAR, "indexOf": LINEAR, "find": LINEAR, "some": LINEAR, "every": LINEAR,
+        # Mutators/Copies
+        "slice": LINEAR, "splice": LINEAR, "concat": LINEAR, "shift": LINEAR,
+        "unshift": LINEAR, "split": LINEAR, "join": LINEAR, "flat": LINEAR, "reverse": LINEAR,
+        # Heap/Tree operations that imply O(log N)
+        "sort": SORT, "enqueue": LOG, "dequeue": LOG,
+    },
+    "statics": {
+        ("Array", "from"): LINEAR,
+        ("Object", "keys"): LINEAR,
+        ("Object", "values"): LINEAR,
+        ("Object", "entries"): LINEAR,
+    },
+    "receivers": {},
+    "functions": {
+        "MinPriorityQueue": HEAP, "MaxPriorityQueue": HEAP, "PriorityQueue": HEAP,
+    },
+    "constructors": {
+        "MinPriorityQueue": HEAP, "MaxPriorityQueue": HEAP, "PriorityQueue": HEAP,
+        "Set": COLLECTION, "Map": COLLECTION, "Array": COLLECTION,
+        "List": COLLECTION, "Dict": COLLECTION,
+    },
+}
+
+PYTHON = {
+    "member_type": "attribute",
+    "object_field": "object",
+    "property_field": "attribute",
+    "methods": {
+        "index": LINEAR, "count": LINEAR, "copy": LINEAR, "reverse": LINEAR,
+        "split": LINEAR, "join": LINEAR,
+        "sort": SORT,
+    },
+    "statics": {
+        ("heapq", "heapify"): LINEAR,
+    },
+    "receivers": {
+        "heapq": LOG,
+    },
+    "functions": {
+        "PriorityQueue": HEAP,
+        "sorted": SORT,
+        # Copies
+        "list": COLLECTION, "set": COLLECTION, "dict": COLLECTION, "tuple": COLLECTION,
+    },
+    "constructors": {},
+}
+
+TABLES = {"javascript": JAVASCRIPT, "python": PYTHON}
+
+
+# --- SPACE TABLES ---
+# Same layout as the tables above, read by a second OperatorMatcher; the
+# kind says what a call leaves allocated.
+COPY = "copy"   # A new collection the size of what it reads (see size_variable)
+GROW = "grow"   # One more element kept in an existing collection
+
+JAVASCRIPT_SPACE = {
+    "member_type": "member_expression",
+    "object_field": "object",
+    "property_field": "property",
+    "methods": {
+        "map": COPY, "filter": COPY, "slice": COPY, "concat": COPY, "split": COPY, "flat": COPY,
+        "flatMap": COPY, "toSorted": COPY, "toReversed": COPY,
+        "push": GROW, "unshift": GROW, "add": GROW, "set": GROW, "enqueue": GROW,
+    },
+    "statics": {
+        ("Array", "from"): COPY,
+        ("Object", "keys"): COPY,
+        ("Object", "values"): COPY,
+        ("Object", "entries"): COPY,
+    },
+    "receivers": {},
+    "functions": {},
+    "constructors": {},
+}
+
+PYTHON_SPACE = {
+    "member_type": "attribute",
+    "object_field": "object",
+    "property_field": "attribute",
+    "methods": {
+        "copy": COPY, "split": COPY,
+        "append": GROW, "appendleft": GROW, "add": GROW, "insert": GROW, "setdefault": GROW, "put": GROW,
+    },
+    "statics": {
+        ("heapq", "heappush"): GROW,
+    },
+    "receivers": {},
+    "functions": {
+        "sorted": COPY, "list": COPY, "set": COPY, "dict": COPY, "tuple": COPY,
+    },
+    "constructors": {},
+}
+
+SPACE_TABLES = {"javascript": JAVASCRIPT_SPACE, "python": PYTHON_SPACE}
+
+
+class OperatorMatcher:
+    """Classifies a call by its callee's name instead of scanning the call's text.
+
+    Tables are compiled once into byte-keyed dicts, so classifying a call is a
+    dictionary lookup on the property (or identifier) actually being called:
+    `.mapValues(...)` no longer counts as `.map`, and `f(a.map(g))` only
+    counts the inner call.
+    """
+
+    def __init__(self, table):
+        self.member_type = table["member_type"]
+        self.object_field = table["object_field"]
+        self.property_field = table["property_field"]
+
+        # property -> (kind for any receiver, {receiver: kind})
+        self.members = {}
+        for name, kind in table["methods"].items():
+            self.members[name.encode()] = (kind, {})
+        for (receiver, name), kind in table["statics"].items():
+            default, by_receiver = self.members.setdefault(name.encode(), (None, {}))
+            by_receiver[receiver.encode()] = kind
+        self.receivers = {name.encode(): kind for name, kind in table["receivers"].items()}
+        self.functions = {name.encode(): kind for name, kind in table["functions"].items()}
+        self.constructors = {name.encode(): kind for name, kind in table["constructors"].items()}
+        self.namespaces = set(self.receivers) | {receiver.encode() for receiver, _ in table["statics"]}
+
+    def classify_callee(self, callee, code_bytes):
+        """Kind of the call whose `function` child is `callee`, or None."""
+        if callee is None:
+            return None
+        if callee.type == "identifier":
+            return self.functions.get(code_bytes[callee.start_byte:callee.end_byte])
+
+        if callee.type != self.member_type:
+            return None
+        prop = callee.child_by_field_name(self.property_field)
+        obj = callee.child_by_field_name(self.object_field)
+        receiver = None
+        if obj is not None and obj.type == "identifier":
+            receiver = code_bytes[obj.start_byte:obj.end_byte]
+
+        rule = self.members.get(code_bytes[prop.start_byte:prop.end_byte]) if prop is not None else None
+        if rule is not None:
+            default, by_receiver = rule
+            kind = by_receiver.get(receiver, default) if by_receiver else default
+            if kind is not None:
+                return kind
+        return self.receivers.get(receiver) if receiver is not None else None
+
+    def classify_constructor(self, constructor, code_bytes):
+        """Kind of `new X(...)` whose `constructor` child is `constructor`, or None."""
+        if constructor is None or constructor.type != "identifier":
+            return None
+        return self.constructors.get(code_bytes[constructor.start_byte:constructor.end_byte])
+
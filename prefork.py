@@ -0,0 +1,228 @@
+"""Pre-forking server launcher: load everything once, then fork warm workers.
+
+    python -m prefork [--workers 4] [--host 0.0.0.0] [--port 8000] [--app main:app]
+
+With `uvicorn --workers N` every worker imports the app and then builds
+its own grammars, operator matchers, queries and tables. Here the parent
+does that once: it imports the app, runs ComplexityAnalyzer.preload() and
+one analysis for each language in ANALYSIS_PRELOAD, and freezes the result out of the garbage
+collector's reach (gc.freeze), so collections in the workers don't write
+to, and so copy, those pages. It then binds the socket and forks the
+workers, which share all of it copy-on-write.
+
+Each worker's startup (see main.py) sends one warm-up analysis per
+preloaded language through the admission path before it accepts a connection, then
+logs its cold start (fork or process start to ready) and memory. /ready
+and /metrics serve the same numbers. Workers that die are replaced.
+
+Workers share nothing once forked: editor sessions (sessions.py) stay in
+the worker that created them, while any worker may accept the next
+request, so /api/sessions needs --workers 1. Results are cached per worker
+unless ANALYSIS_CACHE_DB names a SQLite file they all use (services.py).
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+
+from admission import admission
+from analyzer import analyzer
+
+WARM_UP = {
+    "javascript": "function f(xs) { for (const x of xs) { xs.map((y) => y).sort(); } return new Set(xs); }",
+    "python": "def f(xs):\n    for x in xs:\n        sorted(xs)\n    return [x for x in xs]\n",
+}
+# A worker that exits sooner than this after being forked is failing to
+# start, so it isn't replaced
+MIN_LIFETIME = 1.0
+
+
+def _preload_languages(value):
+    """Languages loaded before forking and warmed up in every worker, from a
+    comma-separated list; the others load on first use."""
+    languages = [name.strip() for name in value.split(",") if name.strip()]
+    unknown = [name for name in languages if name not in WARM_UP]
+    if unknown:
+        raise ValueError(f"ANALYSIS_PRELOAD names unknown languages: {', '.join(unknown)}")
+    return languages
+
+
+PRELOAD = _preload_languages(os.getenv("ANALYSIS_PRELOAD", ",".join(WARM_UP)))
+
+
+def _process_started():
+    """time.monotonic() of this process's start, from /proc where available
+    (so imports count toward the cold start), else of this module's import."""
+    try:
+        with open("/proc/self/stat", "r", encoding="ascii") as f:
+            # Field 22, counted after the parenthesized command name
+            ticks = int(f.read().rpartition(")")[2].split()[19])
+        age = time.clock_gettime(time.CLOCK_BOOTTIME) - ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return time.monotonic()
+    return time.monotonic() - max(age, 0.0)
+
+
+class WorkerState:
+    """When this process started (or was forked), and whether it has been warmed up."""
+
+    def __init__(self):
+        self.started = _process_started()
+        self.ready = False
+        self.cold_start = None
+
+
+state = WorkerState()
+
+
+def memory():
+    """This process's memory in bytes: rss, plus pss and the shared and private
+    parts of rss where /proc/self/smaps_rollup exists (Linux)."""
+    try:
+        with open("/proc/self/smaps_rollup", "r", encoding="ascii") as f:
+            fields = {}
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1]) * 1024
+    except OSError:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return {"rss": peak if sys.platform == "darwin" else peak * 1024}
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "shared": fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0),
+        "private": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+
+def _describe_memory(usage):
+    text = f"rss {usage['rss'] / 2**20:.1f} MB"
+    if "private" in usage:
+        text += f" ({usage['private'] / 2**20:.1f} MB private, pss {usage['pss'] / 2**20:.1f} MB)"
+    return text
+
+
+async def warm_up():
+    """Runs one analysis per preloaded language the way /analyze does, then marks this worker ready.
+
+    Goes straight to the analyzer rather than through the result cache, so
+    every worker really walks a tree (and no warm-up result is cached).
+    """
+    for language in PRELOAD:
+        await admission.run(analyzer.analyze_report, WARM_UP[language], language)
+    state.cold_start = time.monotonic() - state.started
+    state.ready = True
+    print(
+        f"worker {os.getpid()} ready in {state.cold_start * 1000:.0f} ms, {_describe_memory(memory())}",
+        file=sys.stderr, flush=True,
+    )
+
+
+def prepare():
+    """Does, once, everything a worker would otherwise do for itself on startup."""
+    for language in analyzer.preload(PRELOAD):
+        analyzer.analyze_report(WARM_UP[language], language)
+    gc.collect()
+    gc.freeze()
+
+
+def serve(app="main:app", host="127.0.0.1", port=8000, workers=2):
+    import uvicorn
+    from uvicorn.importer import import_from_string
+
+    started = time.monotonic()
+    application = import_from_string(app)
+    prepare()
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    if workers > 1:
+        print(
+            f"note: sessions are kept per worker; with {workers} workers, "
+            "edits to /api/sessions may reach a worker that doesn't have them (use --workers 1)",
+            file=sys.stderr, flush=True,
+        )
+    print(
+        f"parent {os.getpid()} loaded in {(time.monotonic() - started) * 1000:.0f} ms, "
+        f"{_describe_memory(memory())}; serving on {host}:{port}",
+        file=sys.stderr, flush=True,
+    )
+
+    children = {}       # pid -> when it was forked
+
+    def spawn():
+        pid = os.fork()
+        if pid:
+            children[pid] = time.monotonic()
+            return
+        status = 1
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            state.started = time.monotonic()
+            uvicorn.Server(uvicorn.Config(application, lifespan="on")).run(sockets=[sock])
+            status = 0
+        except Exception:
+            traceback.print_exc()
+        finally:
+            os._exit(status)
+
+    for _ in range(workers):
+        spawn()
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    status = 0
+    while children:
+        try:
+            pid, code = os.wait()
+        except ChildProcessError:
+            break
+        forked = children.pop(pid, None)
+        if forked is None or stopping:
+            continue
+        if time.monotonic() - forked < MIN_LIFETIME:
+            print(f"worker {pid} failed to start (status {code}); stopping", file=sys.stderr, flush=True)
+            status = 1
+            stop(signal.SIGTERM, None)
+            continue
+        print(f"worker {pid} exited (status {code}); starting a replacement", file=sys.stderr, flush=True)
+        spawn()
+    sock.close()
+    sys.exit(status)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m prefork", description=__doc__.splitlines()[0])
+    parser.add_argument("--app", default="main:app", help="ASGI app to serve (default: main:app)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "2")))
+    args = parser.parse_args(argv)
+    serve(args.app, args.host, args.port, args.workers)
+
+
+if __name__ == "__main__":
+    # Run the imported module rather than __main__, so the state the app
+    # reads (from prefork import state) is the one the workers update
+    import prefork
+    prefork.main()
@@ -0,0 +1,149 @@
+from tree_sitter import Query, QueryCursor
+from operator_table import LINEAR, COLLECTION
+from complexity import ZERO, ONE
+
+# Only the nodes that can carry a cost are captured; everything else is
+# matched (and skipped) inside the tree-sitter runtime.
+QUERY_SOURCES = {
+    "javascript": """
+        [(for_statement) (for_in_statement) (while_statement) (do_statement)] @loop
+        (call_expression) @call
+        (new_expression) @new
+        (spread_element) @spread
+    """,
+    "python": """
+        [(for_statement) (while_statement)] @loop
+        [(list_comprehension) (set_comprehension) (dictionary_comprehension) (generator_expression)] @comprehension
+        (call) @call
+        [(list_splat) (dictionary_splat)] @spread
+    """,
+}
+
+# Event order for nodes sharing the same span: a loop body opens before the
+# node it wraps is scored, and a call/new is scored before its own scope opens.
+_OPEN_BODY, _SCORE, _OPEN_SELF = range(3)
+
+
+class QueryEngine:
+    """Computes the same cost as the cursor walker from query captures.
+
+    Instead of visiting every node, it scores only the captured loops, calls,
+    constructors and spreads, then sweeps them in source order with a stack of open
+    scopes (a loop's body, or a whole linear call/constructor) to recover
+    how many times each one runs.
+    """
+
+    def __init__(self, analyzer):
+        self.analyzer = analyzer
+        self._queries = {}
+
+    def compile(self, grammar):
+        """The grammar's capture query, compiled on first use."""
+        query = self._queries.get(grammar.name)
+        if query is None:
+            query = self._queries[grammar.name] = Query(grammar.language, QUERY_SOURCES[grammar.name])
+        return query
+
+    def run(self, ctx, root):
+        captures = QueryCursor(self.compile(ctx.grammar)).captures(root)
+
+        events = []
+        for node in captures.get("loop", ()):
+            self._score_loop(ctx, node, events)
+        for node in captures.get("comprehension", ()):
+            self._score_comprehension(ctx, node, events)
+        for node in captures.get("call", ()):
+            self._score_call(ctx, node, events)
+        for node in captures.get("new", ()):
+            self._score_new(ctx, node, events)
+        for node in captures.get("spread", ()):
+            cost = self.analyzer._spread_size(ctx, node)
+            if cost:
+                self._add(events, node, _SCORE, cost)
+        events.sort(key=lambda event: event[:4])
+
+        # stack of (scope end byte, times the scope runs, innermost non-constant size)
+        stack = []
+        total = ZERO
+        for start, _neg_end, order, _index, end, cost in events:
+            while stack and stack[-1][0] <= start:
+                stack.pop()
+            times, size = stack[-1][1:] if stack else (ONE, None)
+            if order == _SCORE:
+                # Heaps grow with the innermost loop that fills them (see the walker's _total)
+                if size is not None:
+                    cost = cost.bind_heaps(size)
+                total = total + times * cost
+            else:
+                stack.append((end, times * cost, cost if cost is not ONE else size))
+        ctx.cost = total
+
+    def _add(self, events, node, order, cost):
+        events.append((node.start_byte, -node.end_byte, order, len(events), node.end_byte, cost))
+
+    def _score_loop(self, ctx, node, events):
+        size = self.analyzer._loop_size(ctx, node)
+        self._add(events, node, _SCORE, size)
+        if size is ONE:
+            return
+        if node.type == "do_statement":
+            self._add(events, node, _OPEN_SELF, size)
+        else:
+            body = node.child_by_field_name("body")
+            if body is not None:
+                self._add(events, body, _OPEN_BODY, size)
+
+    def _score_comprehension(self, ctx, node, events):
+        size = self.analyzer._comprehension_size(ctx, node)
+        self._add(events, node, _SCORE, size)
+        if size is ONE:
+            return
+        # The element and the if-clauses run inside every for-clause
+        for child in node.named_children:
+            if child.type == "if_clause" or child == node.child_by_field_name("body"):
+                self._add(events, child, _OPEN_BODY, size)
+
+    def _score_call(self, ctx, node, events):
+        kind = ctx.matcher.classify_callee(node.child_by_field_name("function"), ctx.code_bytes)
+        if kind == COLLECTION:
+            kind = LINEAR if self.analyzer._is_linear_constructor(ctx, node) else None
+        if kind == LINEAR:
+            if not self._in_chain(ctx, node):
+                size = self.analyzer._call_size(ctx, node)
+                self._add(events, node, _SCORE, size)
+                self._add(events, node, _OPEN_SELF, size)
+        else:
+            cost = self.analyzer._call_cost(ctx, node, kind)
+            if cost:
+                self._add(events, node, _SCORE, cost)
+
+    def _score_new(self, ctx, node, events):
+        kind = ctx.matcher.classify_constructor(node.child_by_field_name("constructor"), ctx.code_bytes)
+        if kind == COLLECTION and self.analyzer._is_linear_constructor(ctx, node):
+            size = self.analyzer._call_size(ctx, node)
+            self._add(events, node, _SCORE, size)
+            self._add(events, node, _OPEN_SELF, size)
+
+    def _in_chain(self, ctx, node):
+        """True if `node` is the receiver side of a linear call further up.
+
+        Mirrors the walker: the chain flag flows from a linear call into its
+        callee, through member objects and non-linear calls, and stops at
+        anything else.
+        """
+        grammar = ctx.grammar
+        child, parent = node, node.parent
+        while parent is not None:
+            if parent.type == grammar.member_type:
+                if parent.child_by_field_name("object") != child:
+                    return False
+            elif parent.type == grammar.call_type:
+                callee = parent.child_by_field_name("function")
+                if callee != child:
+                    return False
+                if ctx.matcher.classify_callee(callee, ctx.code_bytes) == LINEAR:
+                    return True
+            else:
+                return False
+            child, parent = parent, parent.parent
+        return False
@@ -0,0 +1,266 @@
+import math
+from bisect import bisect_left
+from complexity import Cost, ONE, UNKNOWN, split_variable
+
+# How a recursive call's argument moves toward the base case, weakest first:
+# passed as is, a part of it (node.left), a step up (i + 1) or down (n - 1),
+# or a half (n / 2, xs.slice(0, mid))
+UNCHANGED, STRUCTURAL, INCREASE, DECREASE, HALVE = range(5)
+
+# Recurrence kinds, as reported
+LINEAR = "linear"
+DIVIDE = "divide-and-conquer"
+EXPONENTIAL = "exponential"
+STRUCTURE = "structural"
+
+REASONS = {
+    LINEAR: "Linear recursion (one call per level, size shrinking by a step)",
+    DIVIDE: "Divide-and-conquer recursion (calls on halves)",
+    EXPONENTIAL: "Branching recursion (several calls per level, or one per loop iteration)",
+    STRUCTURE: "Recursion over the parts of a structure (each part visited once)",
+}
+
+# A recursive call in one of these runs instead of one in the other arm
+BRANCH_TYPES = {"if_statement", "conditional_expression", "ternary_expression"}
+BLOCK_TYPES = {"statement_block", "block", "program", "module"}
+EXIT_TYPES = {"return_statement", "throw_statement", "raise_statement"}
+BINARY_TYPES = {"binary_expression", "binary_operator"}
+HALVING_OPERATORS = {"/", "//", ">>", ">>>"}
+NUMBER_TYPES = {"number", "integer", "float"}
+# A recursive call in the body of a loop that runs a non-constant number of
+# times is made once per iteration: at least this many times per level
+LOOP_BRANCHING = 2
+
+
+class Recurrence:
+    """How one recursive function's cost grows with the size it recurses on.
+
+    `variable` is the parameter that shrinks (a size variable, as in
+    Cost.var), `branching` the most recursive calls one invocation makes.
+    """
+
+    __slots__ = ("kind", "branching", "variable")
+
+    def __init__(self, kind, branching, variable):
+        self.kind = kind
+        self.branching = branching
+        self.variable = variable
+
+    def solve(self, body):
+        """Total cost, given what one invocation costs apart from its recursive calls."""
+        n = Cost.var(self.variable)
+        step = ONE + body
+        if self.kind == EXPONENTIAL:
+            return Cost.exp(self.branching, self.variable) * step
+        if self.kind == STRUCTURE:
+            # The parts (node.children, node[]) are what the recursion walks,
+            # so a loop over them inside the body is already counted by it
+            return n * (ONE + body.substitute(self._parts(body)))
+        if self.kind == DIVIDE:
+            # Master theorem for T(n) = a T(n/2) + f(n), with a = branching
+            critical = math.ceil(math.log2(self.branching)) if self.branching > 1 else 0
+            degree = max((term.growth().get(self.variable, (1, 0, 0))[1] for term in step.terms), default=0)
+            leaves = n.power(critical)
+            if degree < critical:
+                return leaves + step
+            if degree == critical:
+                return leaves + step * Cost.log(self.variable)
+            return leaves + step
+        return n * step
+
+    def solve_space(self, body):
+        """Extra space, given what one invocation allocates: every pending call
+        on the way down holds its frame and its allocations."""
+        n = Cost.var(self.variable)
+        if self.kind == DIVIDE:
+            # log n frames, holding halves that add up to what the first holds
+            return Cost.log(self.variable) + body
+        if self.kind == STRUCTURE:
+            return n * (ONE + body.substitute(self._parts(body)))
+        return n * (ONE + body)
+
+    def _parts(self, body):
+        prefix = self.variable + "."
+        return {
+            var: ONE for var in body.variables()
+            if split_variable(var)[1].startswith((prefix, self.variable + "["))
+        }
+
+
+def classify(ctx, component, sites, parameters, repeats=None):
+    """Recurrence for every function of one strongly connected component.
+
+    `sites` maps each function's node id to its recursive calls, as
+    (call node, [(parameter name, argument node)]) pairs; `parameters` maps
+    it to its parameter names. `repeats(node)` tells whether a loop or
+    comprehension runs a non-constant number of times (see count_branches).
+    """
+    members = {node.id: node for node in component}
+    branching = 1
+    looped = False
+    motion = None
+    into = {node.id: [] for node in component}      # callee id -> [{parameter: motion}]
+    for node in component:
+        calls = sites.get(node.id, ())
+        if calls:
+            branches, in_loop = count_branches(node, {call.id for call, _ in calls}, repeats)
+            branching, looped = max(branching, branches), looped or in_loop
+        for call, arguments in calls:
+            motions = {name: argument_motion(ctx, argument, name) for name, argument in arguments if argument is not None}
+            target = ctx.call_graph.call_targets[call.id]
+            if target.id in members:
+                into[target.id].append(motions)
+            site = max(motions.values(), default=UNCHANGED)
+            motion = site if motion is None else min(motion, site)
+    motion = UNCHANGED if motion is None else motion
+
+    if motion == HALVE:
+        kind = DIVIDE
+    elif looped and motion != STRUCTURAL:
+        # Backtracking: a call per iteration (subsets, permutations), whatever
+        # the arguments do; over a structure's parts the loop is the recursion
+        kind = EXPONENTIAL
+    elif motion in (DECREASE, INCREASE) and branching > 1:
+        kind = EXPONENTIAL
+    elif motion == STRUCTURAL:
+        kind = STRUCTURE
+    else:
+        kind = LINEAR
+
+    recurrences = {}
+    for node in component:
+        names = [name for name in parameters.get(node.id, ()) if name is not None]
+        recurrences[node.id] = Recurrence(kind, branching, _variable(names, into[node.id], motion))
+    return recurrences
+
+
+def _variable(names, calls, motion):
+    """The parameter a function recurses on: the last one that moves the way
+    the recursion does, else the last one every call passes unchanged."""
+    if motion in (STRUCTURAL, DECREASE, HALVE):
+        moving = [name for name in names if any(motions.get(name) == motion for motions in calls)]
+        if moving:
+            return moving[-1]
+    unchanged = [name for name in names if all(motions.get(name, UNCHANGED) == UNCHANGED for motions in calls)]
+    if unchanged:
+        return unchanged[-1]
+    return names[0] if names else UNKNOWN
+
+
+def argument_motion(ctx, argument, parameter):
+    """How `argument` relates to the value `parameter` had (see the constants above).
+
+    Looks through the whole argument, and through the initializers of
+    constants it reads, so `mid - 1` with `const mid = (lo + hi) >> 1` is
+    a halving.
+    """
+    code_bytes = ctx.code_bytes
+    parameter = parameter.encode()
+    motion = UNCHANGED
+    stack, seen = [argument], set()
+    while stack:
+        node = stack.pop()
+        if node is None or node.id in seen:
+            continue
+        seen.add(node.id)
+        node_type = node.type
+        if node_type in BINARY_TYPES:
+            operator = node.child_by_field_name("operator")
+            right = node.child_by_field_name("right")
+            operator = code_bytes[operator.start_byte:operator.end_byte] if operator is not None else b""
+            constant = right is not None and right.type in NUMBER_TYPES
+            if operator.decode() in HALVING_OPERATORS and constant:
+                motion = max(motion, HALVE)
+            elif operator == b"-" and constant:
+                motion = max(motion, DECREASE)
+            elif operator == b"+" and constant:
+                motion = max(motion, INCREASE)
+        elif node_type == "slice" and any(child.type in NUMBER_TYPES for child in node.named_children):
+            motion = max(motion, DECREASE)          # xs[1:]
+        elif node_type in ("member_expression", "attribute", "subscript_expression", "subscript"):
+            target = node.child_by_field_name("object") or node.child_by_field_name("value")
+            if target is not None and code_bytes[target.start_byte:target.end_byte] == parameter:
+                motion = max(motion, STRUCTURAL)    # node.left, node[i]
+            if node_type == "member_expression":
+                prop = node.child_by_field_name("property")
+                if prop is not None and code_bytes[prop.start_byte:prop.end_byte] in (b"slice", b"substring"):
+                    call = node.parent
+                    arguments = call.child_by_field_name("arguments") if call is not None else None
+                    if arguments is not None and any(a.type in NUMBER_TYPES for a in arguments.named_children):
+                        motion = max(motion, DECREASE)     # xs.slice(1)
+        elif node_type == "identifier":
+            if node.start_byte in ctx.constants.values:
+                stack.append(ctx.constants.values[node.start_byte])
+            elif node.start_byte in ctx.constants.elements:
+                motion = max(motion, STRUCTURAL)    # for (const child of node.children) f(child)
+        stack.extend(node.named_children)
+    return motion
+
+
+def count_branches(function_node, call_ids, repeats=None):
+    """Most of the calls in `call_ids` one run of `function_node` can make,
+    and whether any of them is made once per iteration of a loop.
+
+    Calls in different arms of an if/else or ternary, or on either side of
+    an `if (...) return`, don't add up. Calls in the body of a loop for
+    which `repeats(node)` is true count LOOP_BRANCHING times. Only the
+    nodes on the way to a call are visited, without recursion.
+    """
+    starts = []
+    stack = [function_node]
+    while stack:
+        node = stack.pop()
+        if node.id in call_ids:
+            starts.append(node.start_byte)
+        stack.extend(node.named_children)
+    starts.sort()
+
+    def contains_call(node):
+        i = bisect_left(starts, node.start_byte)
+        return i < len(starts) and starts[i] < node.end_byte
+
+    counts = {}
+    looped = False
+    stack = [(function_node, False)]
+    while stack:
+        node, done = stack.pop()
+        if not done:
+            stack.append((node, True))
+            stack.extend((child, False) for child in node.children if contains_call(child))
+            continue
+        own = 1 if node.id in call_ids else 0
+        if node.type in BRANCH_TYPES:
+            condition = node.child_by_field_name("condition")
+            arms = [counts.get(child.id, 0) for child in node.named_children if condition is None or child.id != condition.id]
+            counts[node.id] = own + (counts.get(condition.id, 0) if condition is not None else 0) + max(arms, default=0)
+        elif node.type in BLOCK_TYPES:
+            rest = 0
+            for child in reversed(node.named_children):
+                if _returns_early(child):
+                    condition = child.child_by_field_name("condition")
+                    consequence = child.child_by_field_name("consequence")
+                    rest = counts.get(condition.id, 0) + max(counts.get(consequence.id, 0), rest)
+                else:
+                    rest += counts.get(child.id, 0)
+            counts[node.id] = own + rest
+        else:
+            total = own + sum(counts.get(child.id, 0) for child in node.children)
+            body = node.child_by_field_name("body") if repeats is not None and node is not function_node else None
+            if body is not None and counts.get(body.id) and repeats(node):
+                total += (LOOP_BRANCHING - 1) * counts[body.id]
+                looped = True
+            counts[node.id] = total
+    return max(counts.get(function_node.id, 1), 1), looped
+
+
+def _returns_early(node):
+    """An `if` without else whose body always leaves the function."""
+    if node.type != "if_statement" or node.child_by_field_name("alternative") is not None:
+        return False
+    consequence = node.child_by_field_name("consequence")
+    if consequence is None or node.child_by_field_name("condition") is None:
+        return False
+    if consequence.type in EXIT_TYPES:
+        return True
+    last = consequence.named_children[-1] if consequence.named_children else None
+    return last is not None and last.type in EXIT_TYPES
@@ -0,0 +1,213 @@
+"""Repository-scale analysis with a persistent summary index.
+
+    python -m repo_index path/to/repo [--index PATH] [--top 20] [--json]
+
+Analyzes the .js/.py files under a directory and keeps per-file and
+per-function results in an SQLite index (by default .bigoh-index.sqlite
+in the repository). A file's entry is keyed by its content hash and the
+ANALYZER_VERSION that produced it, so a re-run only analyzes files whose
+content changed (or everything, after an analyzer upgrade):
+
+    - size and mtime unchanged: the file isn't even opened
+    - otherwise it is hashed straight from a read-only memory map, and
+      decoded and analyzed only if the hash differs from the indexed one
+
+Entries for deleted files are dropped. The output is every indexed
+function, ranked by the leading term of its time complexity.
+"""
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import sqlite3
+import sys
+import time
+
+from analyzer import analyzer, ANALYZER_VERSION
+from bulk import iter_source_paths
+from complexity import leading_order
+
+DEFAULT_INDEX = ".bigoh-index.sqlite"
+DEFAULT_EXCLUDE = (".git", ".hg", ".svn", "node_modules", "__pycache__", ".venv", "venv", ".tox")
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS files ("
+    "path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, digest TEXT NOT NULL,"
+    " version TEXT NOT NULL, language TEXT NOT NULL, time_complexity TEXT, space_complexity TEXT, error TEXT)",
+    "CREATE TABLE IF NOT EXISTS functions ("
+    "path TEXT NOT NULL, name TEXT NOT NULL, start_line INTEGER NOT NULL, end_line INTEGER NOT NULL,"
+    " complexity TEXT NOT NULL, reason TEXT NOT NULL, space_complexity TEXT,"
+    " base INTEGER NOT NULL, degree INTEGER NOT NULL, logs INTEGER NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS functions_path ON functions (path)",
+    "CREATE INDEX IF NOT EXISTS functions_rank ON functions (base DESC, degree DESC, logs DESC)",
+)
+
+
+def read_source(path, known_digest=None):
+    """(sha256 hex digest, text) of a file, read through a read-only mmap.
+
+    The digest is taken from the mapping without copying it; text is None
+    when the digest equals `known_digest`, so an unchanged file is never
+    decoded. Raises OSError or UnicodeDecodeError.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # Empty files can't be mapped
+            digest = hashlib.sha256().hexdigest()
+            return digest, None if digest == known_digest else ""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            digest = hashlib.sha256(mapped).hexdigest()
+            if digest == known_digest:
+                return digest, None
+            return digest, str(mapped, "utf8")
+
+
+class RepoIndex:
+    """The on-disk index of one repository's analysis results."""
+
+    def __init__(self, path: str, version: str = ANALYZER_VERSION):
+        self.path = path
+        self.version = version
+        self.conn = sqlite3.connect(path, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        for statement in SCHEMA:
+            self.conn.execute(statement)
+
+    def close(self):
+        self.conn.close()
+
+    def update(self, root, exclude=DEFAULT_EXCLUDE, workers=None, chunk_size=64):
+        """Brings the index up to date with the files under root; returns counts of what it did."""
+        known = {
+            row[0]: row[1:]
+            for row in self.conn.execute("SELECT path, size, mtime_ns, digest, version FROM files")
+        }
+        counts = {"files": 0, "analyzed": 0, "unchanged": 0, "removed": 0, "errors": 0}
+        window_size = (workers or os.cpu_count() or 1) * chunk_size
+        pending, touched, seen = [], [], set()
+
+        for path, language in iter_source_paths(root, exclude):
+            name = os.path.relpath(path, root).replace(os.sep, "/")
+            seen.add(name)
+            counts["files"] += 1
+            entry = known.get(name)
+            try:
+                stat = os.stat(path)
+                if entry is not None and entry[3] == self.version and entry[:2] == (stat.st_size, stat.st_mtime_ns):
+                    counts["unchanged"] += 1
+                    continue
+                current = entry[2] if entry is not None and entry[3] == self.version else None
+                digest, code = read_source(path, current)
+            except (OSError, UnicodeDecodeError) as e:
+                self._store_error(name, language, f"{type(e).__name__}: {e}")
+                counts["errors"] += 1
+                continue
+
+            if code is None:
+                # Touched but not changed (e.g. a fresh checkout): only the stat needs refreshing
+                touched.append((stat.st_size, stat.st_mtime_ns, name))
+                counts["unchanged"] += 1
+                continue
+            pending.append((name, language, code, digest, stat))
+            if len(pending) >= window_size:
+                self._analyze(pending, workers, chunk_size, counts)
+                pending = []
+        if pending:
+            self._analyze(pending, workers, chunk_size, counts)
+
+        removed = [(name,) for name in known if name not in seen]
+        with self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.executemany("UPDATE files SET size = ?, mtime_ns = ? WHERE path = ?", touched)
+            self.conn.executemany("DELETE FROM files WHERE path = ?", removed)
+            self.conn.executemany("DELETE FROM functions WHERE path = ?", removed)
+        counts["removed"] = len(removed)
+        return counts
+
+    def _analyze(self, pending, workers, chunk_size, counts):
+        results = analyzer.analyze_many(
+            [(code, language) for _, language, code, _, _ in pending], max_workers=workers, chunk_size=chunk_size)
+        with self.conn:
+            self.conn.execute("BEGIN")
+            for (name, language, _, digest, stat), (report, error) in zip(pending, results):
+                self.conn.execute("DELETE FROM functions WHERE path = ?", (name,))
+                report = report or {}
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (name, stat.st_size, stat.st_mtime_ns, digest, self.version, language,
+                     report.get("time_complexity"), report.get("space_complexity"), error),
+                )
+                self.conn.executemany(
+                    "INSERT INTO functions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (name, function["name"], function["start_line"], function["end_line"],
+                         function["complexity"], function["reason"], function.get("space_complexity"),
+                         *leading_order(function["complexity"]))
+                        for function in report.get("functions", ())
+                    ],
+                )
+                counts["errors" if error else "analyzed"] += 1
+
+    def _store_error(self, name, language, error):
+        # Size 0 and mtime -1 never match a stat, so the file is retried on the next run
+        with self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.execute("DELETE FROM functions WHERE path = ?", (name,))
+            self.conn.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, 0, -1, '', ?, ?, NULL, NULL, ?)",
+                (name, self.version, language, error),
+            )
+
+    def ranked(self, limit=None):
+        """Indexed functions, highest time complexity first."""
+        rows = self.conn.execute(
+            "SELECT path, name, start_line, end_line, complexity, reason, space_complexity FROM functions"
+            " ORDER BY base DESC, degree DESC, logs DESC, path, start_line LIMIT ?",
+            (-1 if limit is None else limit,),
+        )
+        keys = ("path", "name", "start_line", "end_line", "complexity", "reason", "space_complexity")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def errors(self):
+        return self.conn.execute("SELECT path, error FROM files WHERE error IS NOT NULL ORDER BY path").fetchall()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m repo_index", description="Analyze a repository incrementally.")
+    parser.add_argument("root", help="repository directory")
+    parser.add_argument("--index", help=f"index file (default: ROOT/{DEFAULT_INDEX})")
+    parser.add_argument("--top", type=int, default=20, help="functions to report (default: 20; 0 for all)")
+    parser.add_argument("--exclude", action="append", default=[], help="directory name to skip (repeatable)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=64, help="files per worker task")
+    parser.add_argument("--json", action="store_true", help="print the ranking as JSON")
+    args = parser.parse_args(argv)
+
+    index = RepoIndex(args.index or os.path.join(args.root, DEFAULT_INDEX))
+    started = time.perf_counter()
+    try:
+        counts = index.update(args.root, DEFAULT_EXCLUDE + tuple(args.exclude), args.workers, args.chunk_size)
+        ranking = index.ranked(args.top or None)
+        errors = index.errors()
+    finally:
+        index.close()
+        analyzer.shutdown()
+    print(
+        f"{counts['files']} files: {counts['analyzed']} analyzed, {counts['unchanged']} unchanged, "
+        f"{counts['removed']} removed, {counts['errors']} errors in {time.perf_counter() - started:.1f}s",
+        file=sys.stderr,
+    )
+    for path, error in errors:
+        print(f"error: {path}: {error}", file=sys.stderr)
+
+    if args.json:
+        print(json.dumps(ranking, indent=2))
+        return
+    for rank, function in enumerate(ranking, 1):
+        location = f"{function['path']}:{function['start_line']}"
+        print(f"{rank:>4}. {function['complexity']:<16} {function['space_complexity'] or '':<12} {location}  {function['name']}")
+
+
+if __name__ == "__main__":
+    main()
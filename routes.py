@@ -1,20 +1,194 @@
-from fastapi import APIRouter, HTTPException
-from models import CodeSnippet, AnalysisResponse
-from services import analyze_time_complexity
+import os
+import time
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from starlette.requests import ClientDisconnect
+from models import CodeSnippet, AnalysisResponse, BatchRequest, BatchResponse, SessionResponse, EditRequest
+from services import analyze_code, analyze_batch, analyze_stream
+from admission import admission, Overloaded
+from analyzer import analyzer, DeadlineExceeded
+from metrics import metrics, profiler
+from sessions import session_store
 
 router = APIRouter()
 
+
+class DuplexStreamingResponse(StreamingResponse):
+    """Streams results while the request body is still being read.
+
+    StreamingResponse normally reads `receive` to watch for disconnects,
+    which would swallow the body chunks the generator is consuming; here a
+    disconnect surfaces as a failed send instead.
+    """
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
+        if self.background is not None:
+            await self.background()
+
+
+MAX_CODE_LENGTH = 100_000
+MAX_BATCH_SIZE = 50000
+STREAM_WINDOW = int(os.getenv("ANALYSIS_STREAM_WINDOW", "64"))
+# Seconds a whole batch may take, queueing included
+BATCH_DEADLINE = float(os.getenv("ANALYSIS_BATCH_DEADLINE", "60"))
+
 @router.post("/analyze", response_model=AnalysisResponse)
-def analyze_code_endpoint(request: CodeSnippet):
-    if len(request.code) > 5000:
+async def analyze_code_endpoint(request: CodeSnippet):
+    if len(request.code) > MAX_CODE_LENGTH:
          raise HTTPException(status_code=400, detail="Code too long.")
 
-    # Call the Service
-    time_val, time_reason = analyze_time_complexity(request.code)
-    
+    # Timings per stage, filled in along the way and reported to /metrics
+    stats = {}
+    submitted = time.perf_counter()
+    language = analyzer.resolve_language(request.language, request.code)
+
+    def work(code, language, deadline):
+        stats["queue"] = time.perf_counter() - submitted
+        return profiler.run(analyze_code, code, language, deadline, stats)
+
+    def observe(status):
+        # A success is counted once the response is serialized, below
+        if status != "success":
+            _observe(language, len(request.code), submitted, stats, status)
+
+    # Call the Service, off the event loop and within the admission limits
+    report = await _admitted(work, request.code, request.language, observe=observe)
+
+    serializing = time.perf_counter()
+    body = AnalysisResponse(
+        complexity=report["time_complexity"],        # Legacy field
+        time_complexity=report["time_complexity"],
+        time_reason=report["time_reason"],
+        space_complexity=report["space_complexity"],
+        space_reason=report["space_reason"],
+        functions=report["functions"],
+        status="success",
+    ).model_dump_json()
+    stats["serialize"] = time.perf_counter() - serializing
+    _observe(language, len(request.code), submitted, stats, "success")
+    return Response(body, media_type="application/json")
+
+def _observe(language, code_size, submitted, stats, status):
+    # `language` is the resolved grammar name, so aliases count under it
+    metrics.observe(language, code_size, time.perf_counter() - submitted, stats, status)
+
+async def _admitted(fn, *args, observe, timeout=None):
+    """admission.run(), with being turned away or running out of time mapped to 429 and 503.
+
+    `observe(status)` is called with the outcome, for /metrics.
+    """
+    try:
+        result = await admission.run(fn, *args, timeout=timeout)
+    except Overloaded:
+        observe("overloaded")
+        raise HTTPException(status_code=429, detail="Too many analyses in progress.", headers={"Retry-After": "1"})
+    except DeadlineExceeded:
+        observe("deadline")
+        raise HTTPException(status_code=503, detail="Analysis deadline exceeded.", headers={"Retry-After": "1"})
+    except Exception:
+        observe("error")
+        raise
+    observe("success")
+    return result
+
+@router.post("/analyze/batch", response_model=BatchResponse)
+async def analyze_batch_endpoint(request: BatchRequest):
+    if len(request.snippets) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail="Too many snippets.")
+
+    # Oversized snippets fail on their own instead of rejecting the batch
+    accepted = [i for i, s in enumerate(request.snippets) if len(s.code) <= MAX_CODE_LENGTH]
+    snippets = [(request.snippets[i].code, request.snippets[i].language) for i in accepted]
+    languages = [analyzer.resolve_language(language, code) for code, language in snippets]
+    stats = {}
+    submitted = time.perf_counter()
+
+    def work(snippets, deadline):
+        stats["queue"] = time.perf_counter() - submitted
+        # The batch takes one admission slot; each snippet gets the /analyze deadline of its own
+        return analyze_batch(snippets, deadline, admission.timeout)
+
+    def observe(status):
+        # A batch that ran is counted below, each snippet with its own outcome
+        if status != "success":
+            metrics.observe_batch([(language, status) for language in languages], stats)
+
+    analyzed = await _admitted(work, snippets, timeout=BATCH_DEADLINE, observe=observe)
+    metrics.observe_batch(
+        [(language, "error" if error else "success") for language, (_, error) in zip(languages, analyzed)], stats)
+
+    results = [{"status": "error", "error": "Code too long."} for _ in request.snippets]
+    for i, (report, error) in zip(accepted, analyzed):
+        if error:
+            results[i] = {"status": "error", "error": error}
+        else:
+            results[i] = {**report, "status": "success"}
+
+    return {"results": results}
+
+@router.post("/analyze/stream")
+async def analyze_stream_endpoint(request: Request):
+    # One CodeSnippet JSON object per input line, one result per output line, same order
+    results = analyze_stream(request.stream(), MAX_CODE_LENGTH, STREAM_WINDOW)
+    return DuplexStreamingResponse(results, media_type="application/x-ndjson")
+
+def _session_response(session_id, result):
+    time_val, time_reason = result
     return {
+        "session_id": session_id,
         "complexity": time_val,        # Legacy field
         "time_complexity": time_val,
         "time_reason": time_reason,
         "status": "success"
-    }
\ No newline at end of file
+    }
+
+@router.post("/sessions", response_model=SessionResponse)
+async def create_session_endpoint(request: CodeSnippet):
+    if len(request.code) > MAX_CODE_LENGTH:
+        raise HTTPException(status_code=400, detail="Code too long.")
+
+    stats = {}
+    submitted = time.perf_counter()
+    language = analyzer.resolve_language(request.language, request.code)
+
+    def work(deadline):
+        stats["queue"] = time.perf_counter() - submitted
+        return session_store.create(request.code, language, deadline, stats)
+
+    session_id, session = await _admitted(
+        work, observe=lambda status: _observe(language, len(request.code), submitted, stats, status))
+    return _session_response(session_id, session.result)
+
+@router.post("/sessions/{session_id}/edits", response_model=SessionResponse)
+async def edit_session_endpoint(session_id: str, request: EditRequest):
+    session = session_store.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Unknown session.")
+
+    edits = [(e.start_byte, e.old_end_byte, e.new_text) for e in request.edits]
+    stats = {}
+    submitted = time.perf_counter()
+
+    def work(deadline):
+        stats["queue"] = time.perf_counter() - submitted
+        # An edit that runs out of time is rolled back, like an invalid one
+        return session.apply_edits(edits, MAX_CODE_LENGTH, deadline, stats)
+
+    def observe(status):
+        _observe(session.language, len(session.code_bytes), submitted, stats, status)
+
+    try:
+        result = await _admitted(work, observe=observe)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _session_response(session_id, result)
+
+@router.delete("/sessions/{session_id}")
+def delete_session_endpoint(session_id: str):
+    if not session_store.delete(session_id):
+        raise HTTPException(status_code=404, detail="Unknown session.")
+    return {"status": "success"}
@@ -1,9 +1,186 @@
-from analyzer import analyzer
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from pydantic import ValidationError
+from analyzer import analyzer, ANALYZER_VERSION, DeadlineExceeded
+from admission import admission, Overloaded
+from metrics import metrics
+from models import CodeSnippet
+from cache import ResultCache, SQLiteBackend, make_cache_key
 
 
-def analyze_time_complexity(code: str):
-	val, reason = analyzer.analyze(code, 'javascript')
-	return val, reason
+def _build_cache():
+	# Set ANALYSIS_CACHE_DB to share results between workers and across restarts
+	db_path = os.getenv("ANALYSIS_CACHE_DB")
+	return ResultCache(
+		max_entries=int(os.getenv("ANALYSIS_CACHE_SIZE", "1024")),
+		ttl=float(os.getenv("ANALYSIS_CACHE_TTL", "3600")),
+		backend=SQLiteBackend(db_path) if db_path else None,
+	)
+
+
+result_cache = _build_cache()
+
+
+def _cache_key(code: str, language: str) -> str:
+	# Keyed by the grammar the language resolves to, so "py", "auto" and
+	# "python" share one entry for the same code
+	return make_cache_key(code, analyzer.resolve_language(language, code), ANALYZER_VERSION)
+
+
+def analyze_code(code: str, language: str = 'javascript', deadline=None, stats=None):
+	"""Full report (see ComplexityAnalyzer.analyze_report), served from the cache when possible.
+
+	Raises DeadlineExceeded if a `deadline` is given and the analysis runs
+	past it; `stats` is filled in as analyze_report does, unless cached.
+	"""
+	key = _cache_key(code, language)
+	report = result_cache.get(key)
+	if report is None:
+		report = analyzer.analyze_report(code, language, deadline, stats)
+		result_cache.set(key, report)
+	return report
+
+
+def analyze_time_complexity(code: str, language: str = 'javascript'):
+	report = analyze_code(code, language)
+	return report["time_complexity"], report["time_reason"]
+
+
+def analyze_batch(snippets, deadline=None, timeout=None):
+	"""Takes (code, language) pairs; returns (report, error) pairs in order.
+
+	Uncached snippets are analyzed by ComplexityAnalyzer.analyze_many,
+	with its `deadline` and per-snippet `timeout`.
+	"""
+	results = [None] * len(snippets)
+	keys = [_cache_key(code, language) for code, language in snippets]
+
+	pending = []
+	for i, key in enumerate(keys):
+		cached = result_cache.get(key)
+		if cached is not None:
+			results[i] = (cached, None)
+		else:
+			pending.append(i)
+
+	analyzed = analyzer.analyze_many([snippets[i] for i in pending], deadline=deadline, timeout=timeout)
+	for i, (report, error) in zip(pending, analyzed):
+		results[i] = (report, error)
+		if error is None:
+			result_cache.set(keys[i], report)
+	return results
+
+
+async def iter_lines(chunks, max_line_bytes: int):
+	"""Splits an async stream of byte chunks into lines.
+
+	A line longer than max_line_bytes is dropped as it arrives and yielded as
+	None, so one runaway record can't make the buffer grow without bound.
+	"""
+	buffer = bytearray()
+	skipping = False
+	async for chunk in chunks:
+		buffer += chunk
+		start = 0
+		while True:
+			end = buffer.find(b"\n", start)
+			if end == -1:
+				break
+			if skipping:
+				skipping = False
+			else:
+				yield bytes(buffer[start:end])
+			start = end + 1
+		del buffer[:start]
+		if len(buffer) > max_line_bytes:
+			if not skipping:
+				yield None
+			skipping = True
+			buffer.clear()
+	if buffer and not skipping:
+		yield bytes(buffer)
+
+
+def analyze_ndjson_line(line, max_code_length: int, submitted=None, deadline=None) -> bytes:
+	"""One NDJSON input record in, one NDJSON result line out.
+
+	With `submitted` (time.perf_counter() when the record was queued), an
+	analyzed record is reported to /metrics the way an /analyze request is.
+	"""
+	if line is None:
+		return _ndjson({"status": "error", "error": "Line too long."})
+	try:
+		snippet = CodeSnippet.model_validate_json(line)
+	except ValidationError as e:
+		return _ndjson({"status": "error", "error": f"Invalid record: {e.errors()[0]['msg']}"})
+	if len(snippet.code) > max_code_length:
+		return _ndjson({"status": "error", "error": "Code too long."})
+
+	stats = {}
+	if submitted is not None:
+		stats["queue"] = time.perf_counter() - submitted
+	try:
+		report = analyze_code(snippet.code, snippet.language, deadline, stats)
+	except Exception as e:
+		_observe(snippet, submitted, stats, "deadline" if isinstance(e, DeadlineExceeded) else "error")
+		return _ndjson({"status": "error", "error": f"{type(e).__name__}: {e}"})
+	serializing = time.perf_counter()
+	body = _ndjson({
+		"complexity": report["time_complexity"],        # Legacy field
+		"time_complexity": report["time_complexity"],
+		"time_reason": report["time_reason"],
+		"space_complexity": report["space_complexity"],
+		"space_reason": report["space_reason"],
+		"functions": report["functions"],
+		"status": "success",
+	})
+	stats["serialize"] = time.perf_counter() - serializing
+	_observe(snippet, submitted, stats, "success")
+	return body
+
+
+def _observe(snippet, submitted, stats, status):
+	if submitted is not None:
+		language = analyzer.resolve_language(snippet.language, snippet.code)
+		metrics.observe(language, len(snippet.code), time.perf_counter() - submitted, stats, status)
+
+
+def _ndjson(record) -> bytes:
+	return json.dumps(record, separators=(",", ":")).encode("utf8") + b"\n"
+
+
+async def _admitted_line(line, max_code_length: int) -> bytes:
+	try:
+		return await admission.run(analyze_ndjson_line, line, max_code_length, time.perf_counter())
+	except Overloaded:
+		return _ndjson({"status": "error", "error": "Too many analyses in progress."})
+	except DeadlineExceeded:
+		return _ndjson({"status": "error", "error": "Analysis deadline exceeded."})
+
+
+async def analyze_stream(chunks, max_code_length: int, window: int = 64):
+	"""Analyzes NDJSON records from `chunks`, yielding result lines in input order.
+
+	At most `window` records are in flight. Input is only read when there is
+	room in the window, and the window only drains as fast as the consumer
+	takes results, so memory stays flat however large the stream is. Each
+	record is admitted like an /analyze request (see admission.py); one
+	turned away or past its deadline gets an error line of its own.
+	"""
+	# Generous per-line bound: JSON escaping can inflate code several times over
+	max_line_bytes = max_code_length * 6 + 1024
+	pending = deque()
+	async for line in iter_lines(chunks, max_line_bytes):
+		if line is not None and not line.strip():
+			continue
+		pending.append(asyncio.ensure_future(_admitted_line(line, max_code_length)))
+		if len(pending) >= window:
+			yield await pending.popleft()
+	while pending:
+		yield await pending.popleft()
 
 
 # Old CODE - kept for reference
@@ -0,0 +1,197 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from tree_sitter import Point
+from analyzer import analyzer, AnalysisContext
+from constant_table import FRAGMENT_TYPES, fragment_key
+
+
+def _point_at(code_bytes: bytes, offset: int) -> Point:
+    row = code_bytes.count(b"\n", 0, offset)
+    line_start = code_bytes.rfind(b"\n", 0, offset) + 1
+    return Point(row, offset - line_start)
+
+
+class AnalysisSession:
+    """One editor buffer: its current text, tree and per-subtree summaries.
+
+    Edits are applied to the previous tree with Tree.edit() and re-parsed
+    incrementally. Subtrees outside both the edited bytes and the ranges
+    tree-sitter reports as changed keep their previous summaries, so only
+    the edited region is walked again. Top-level statements (functions,
+    classes, and in JavaScript loops and the like) whose text is unchanged
+    and whose summary is kept are not walked at all: their part of the
+    constant table is carried over too. A buffer with syntax errors is
+    parsed and walked from scratch.
+    """
+
+    def __init__(self, code: str, language: str, deadline=None, stats=None):
+        self.language = analyzer.resolve_language(language, code)
+        self.code_bytes = None
+        self.tree = None
+        self.summaries = {}
+        self.constants_fingerprint = None
+        self.fragments = {}             # fragment_key -> constant_table.Fragment
+        self.result = None
+        self.lock = threading.Lock()
+        self._reanalyze(bytes(code, "utf8"), None, [], deadline, stats)
+
+    def apply_edits(self, edits, max_length=None, deadline=None, stats=None):
+        """Applies (start_byte, old_end_byte, new_text) edits in order.
+
+        Offsets are UTF-8 byte offsets into the buffer as it is after the
+        preceding edits in the same call. Raises ValueError, leaving the
+        session as it was, for an edit outside the buffer or when the new
+        buffer would be longer than `max_length` characters; the same goes
+        for DeadlineExceeded, when the analysis runs past `deadline`. A
+        `stats` dict is filled in as ComplexityAnalyzer.analyze_report does.
+        """
+        with self.lock:
+            # Validate and build the new buffer first, so a bad edit leaves
+            # the session untouched
+            code_bytes = self.code_bytes
+            tree_edits = []
+            for start, old_end, new_text in edits:
+                if not 0 <= start <= old_end <= len(code_bytes):
+                    raise ValueError(f"Edit range {start}:{old_end} is outside the buffer")
+                new_bytes = bytes(new_text, "utf8")
+                new_end = start + len(new_bytes)
+
+                start_point = _point_at(code_bytes, start)
+                old_end_point = _point_at(code_bytes, old_end)
+                code_bytes = code_bytes[:start] + new_bytes + code_bytes[old_end:]
+                tree_edits.append(dict(
+                    start_byte=start,
+                    old_end_byte=old_end,
+                    new_end_byte=new_end,
+                    start_point=start_point,
+                    old_end_point=old_end_point,
+                    new_end_point=_point_at(code_bytes, new_end),
+                ))
+            # Bytes bound characters from above, so most buffers skip the decode
+            if max_length is not None and len(code_bytes) > max_length:
+                if len(code_bytes.decode("utf8", "replace")) > max_length:
+                    raise ValueError("Code too long.")
+
+            # Edit a copy, so the session's tree is only replaced once the analysis succeeds
+            old_tree = self.tree.copy()
+            for tree_edit in tree_edits:
+                old_tree.edit(**tree_edit)
+            return self._reanalyze(code_bytes, old_tree, tree_edits, deadline, stats)
+
+    def _reanalyze(self, code_bytes, old_tree, tree_edits, deadline=None, stats=None):
+        parser = analyzer.parsers.get(self.language)
+        start = time.perf_counter()
+        tree, changed = None, []
+        if old_tree is not None and not old_tree.root_node.has_error:
+            tree = parser.parse(code_bytes, old_tree)
+            changed = [(r.start_byte, r.end_byte) for r in old_tree.changed_ranges(tree)]
+        if tree is None or tree.root_node.has_error:
+            # Error recovery depends on the tree it starts from, and can regroup
+            # text far from the edit: a buffer with syntax errors before or after
+            # the edit is parsed from scratch, and nothing from the last tree is kept
+            tree, changed, old_tree = parser.parse(code_bytes), [], None
+        parsed = time.perf_counter()
+
+        previous = self.summaries if old_tree is not None else {}
+        ctx = AnalysisContext(code_bytes, self.language, previous_summaries=previous, deadline=deadline)
+        ctx.old_span = _span_mapper(tree_edits, changed)
+        root = tree.root_node
+        reuse = self._reusable(ctx, root) if old_tree is not None else {}
+        analyzer.resolve_constants(ctx, root, reuse)
+        fingerprint = ctx.constants.fingerprint(ctx.resolver_memo, lambda node: analyzer.size_variable(ctx, node))
+        if fingerprint != self.constants_fingerprint:
+            # A loop bound can name a constant declared far from the edit, so
+            # once any binding changes no old summary can be trusted. Without
+            # them the reused statements are walked, and need their reads in
+            # the table: it is built again in full
+            ctx.previous_summaries = {}
+            if reuse:
+                analyzer.resolve_constants(ctx, root, {})
+                fingerprint = ctx.constants.fingerprint(ctx.resolver_memo, lambda node: analyzer.size_variable(ctx, node))
+        else:
+            ctx.pruned = [node for node in root.children if node.id in reuse]
+        self.result = analyzer.analyze_tree(ctx, tree)
+        if stats is not None:
+            stats.update(
+                parse=parsed - start, traverse=time.perf_counter() - parsed,
+                nodes=ctx.nodes, max_depth=ctx.max_depth,
+            )
+        self.code_bytes, self.tree, self.summaries = code_bytes, tree, ctx.summaries
+        self.constants_fingerprint = fingerprint
+        self.fragments = {fragment.key: fragment for fragment in ctx.constants.fragments}
+        return self.result
+
+    def _reusable(self, ctx, root):
+        """Top-level node id -> Fragment, for the statements an edit left
+        alone: same text as one of the last table's fragments, and a
+        summary to stand for them."""
+        reuse = {}
+        if self.fragments:
+            fragment_types = FRAGMENT_TYPES.get(self.language, ())
+            for node in root.children:
+                if node.type in fragment_types:
+                    fragment = self.fragments.get(fragment_key(node, ctx.code_bytes))
+                    if fragment is not None and ctx.cached_summary(node.start_byte, node.end_byte, node.type, False) is not None:
+                        reuse[node.id] = fragment
+        return reuse
+
+
+def _span_mapper(tree_edits, changed):
+    """Maps a span in the new tree to the same text's span in the old one.
+
+    Returns None for spans overlapping an edit or a structurally changed
+    range, whose old summaries can't be trusted.
+    """
+    def old_span(start, end):
+        for r_start, r_end in changed:
+            if start < r_end and r_start < end:
+                return None
+        # Undo the edits newest-first, each in the coordinates it was made in
+        for edit in reversed(tree_edits):
+            e_start, old_end, new_end = edit["start_byte"], edit["old_end_byte"], edit["new_end_byte"]
+            if end <= e_start:
+                continue
+            if start < new_end:
+                return None
+            start, end = start - new_end + old_end, end - new_end + old_end
+        return start, end
+    return old_span
+
+
+class SessionStore:
+    """Keeps the most recently used sessions, evicting the oldest past max_sessions.
+
+    Sessions live in this process only; see prefork.py for running more
+    than one worker.
+    """
+
+    def __init__(self, max_sessions: int = 256):
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, code: str, language: str = "javascript", deadline=None, stats=None):
+        session = AnalysisSession(code, language, deadline, stats)
+        session_id = uuid.uuid4().hex
+        with self._lock:
+            self._sessions[session_id] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return session_id, session
+
+    def get(self, session_id: str):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+            return session
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+
+session_store = SessionStore(int(os.getenv("ANALYSIS_MAX_SESSIONS", "256")))
@@ -0,0 +1,117 @@
+import asyncio
+import json
+import threading
+import time
+import pytest
+from fastapi import HTTPException
+from admission import AdmissionController, Overloaded
+from analyzer import analyzer, DeadlineExceeded
+
+
+def test_requests_beyond_the_queue_are_turned_away():
+    controller = AdmissionController(concurrency=1, queue_depth=1, timeout=5)
+    release = threading.Event()
+
+    def blocked(value, deadline):
+        release.wait(5)
+        return value
+
+    async def run():
+        first = asyncio.ensure_future(controller.run(blocked, 1))
+        second = asyncio.ensure_future(controller.run(blocked, 2))
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded):
+            await controller.run(blocked, 3)
+        release.set()
+        return await first, await second
+
+    assert asyncio.run(run()) == (1, 2)
+    assert controller.in_flight == 0
+    controller.shutdown()
+
+
+def test_queued_work_past_its_deadline_fails_fast():
+    controller = AdmissionController(concurrency=1, queue_depth=4, timeout=0.2)
+    started = []
+
+    def slow(value, deadline):
+        started.append(value)
+        time.sleep(0.5)
+        return value
+
+    async def run():
+        return await asyncio.gather(controller.run(slow, 1), controller.run(slow, 2), return_exceptions=True)
+
+    start = time.monotonic()
+    results = asyncio.run(run())
+    assert all(isinstance(result, DeadlineExceeded) for result in results)
+    assert time.monotonic() - start < 0.45
+    assert started == [1]           # the queued one never ran
+    controller.shutdown()
+
+
+def test_walk_stops_at_the_deadline():
+    code = "\n".join("for (const x of xs) { ys.map(f); }" for _ in range(2000))
+    with pytest.raises(DeadlineExceeded):
+        analyzer.analyze_report(code, "javascript", deadline=time.monotonic())
+    report = analyzer.analyze_report(code, "javascript", deadline=time.monotonic() + 60)
+    assert report["time_complexity"] == "O(N*M)"
+
+
+def test_analyze_endpoint_maps_overload_to_429(monkeypatch):
+    import routes
+    from models import CodeSnippet
+
+    response = asyncio.run(routes.analyze_code_endpoint(CodeSnippet(code="for (const x of xs) {}")))
+    assert json.loads(response.body)["time_complexity"] == "O(N)"
+
+    full = AdmissionController(concurrency=1, queue_depth=0, timeout=5)
+    full.in_flight = 1
+    monkeypatch.setattr(routes, "admission", full)
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(routes.analyze_code_endpoint(CodeSnippet(code="for (const x of xs) {}")))
+    assert error.value.status_code == 429
+
+
+def test_batch_stream_and_session_routes_are_admitted(monkeypatch):
+    import routes
+    import services
+    from models import BatchRequest, CodeSnippet, EditRequest
+    from services import analyze_stream
+
+    created = asyncio.run(routes.create_session_endpoint(CodeSnippet(code="for (const x of xs) {}")))
+    batch = asyncio.run(routes.analyze_batch_endpoint(BatchRequest(snippets=[{"code": "x.map(f)"}])))
+    assert batch["results"][0]["time_complexity"] == "O(N)"
+
+    full = AdmissionController(concurrency=1, queue_depth=0, timeout=5)
+    full.in_flight = 1
+    monkeypatch.setattr(routes, "admission", full)
+    monkeypatch.setattr(services, "admission", full)
+    for call in (
+        lambda: routes.analyze_batch_endpoint(BatchRequest(snippets=[{"code": "x.map(f)"}])),
+        lambda: routes.create_session_endpoint(CodeSnippet(code="let a = 1;")),
+        lambda: routes.edit_session_endpoint(created["session_id"], EditRequest(edits=[
+            {"start_byte": 0, "old_end_byte": 0, "new_text": "// x\n"}])),
+    ):
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(call())
+        assert error.value.status_code == 429
+
+    async def one_record():
+        yield b'{"code": "x.map(f)"}\n'
+
+    async def collect():
+        return [line async for line in analyze_stream(one_record(), 5000)]
+
+    assert json.loads(asyncio.run(collect())[0])["error"] == "Too many analyses in progress."
+
+
+def test_session_edit_past_its_deadline_is_rolled_back():
+    from sessions import AnalysisSession
+
+    code = "\n".join("for (const x of xs) { ys.map(f); }" for _ in range(2000))
+    session = AnalysisSession(code, "javascript")
+    with pytest.raises(DeadlineExceeded):
+        session.apply_edits([(0, 0, "// edited\n")], deadline=time.monotonic())
+    assert session.code_bytes == code.encode("utf8")
+    assert session.apply_edits([(0, 0, "// edited\n")]) == analyzer.analyze("// edited\n" + code)
@@ -0,0 +1,121 @@
+import subprocess
+import sys
+import pytest
+from analyzer import analyzer
+from boundary_resolver import get_boundary_resolver
+
+CONSTANT_CASES = [
+    ("i < 10", True),
+    ("i === 5", True),
+    ("i !== 0", True),
+    ("i < n", False),
+    ("i < 10 && i < n", False),
+    ("i < 10 || i < n", False),
+    ("i === 'stop'", True),
+    ("i < n && j < m", False),
+    ("(i < 10 && i < n) || j < k", False),
+    pytest.param("i < 10 && (j < 5 || k < 3)", False, marks=pytest.mark.xfail(reason="comparisons against a constant count as bounded")),
+    ("i < 10 + 2", True),
+    ("i < n + 1", False),
+    ("i < -5", True),
+    ("!flag", False),
+    ("!!true", True),
+    ("true", True),
+    ("false", True),
+    ("0", True),
+    ("'x'", True),
+    ("i", False),
+    ("arr.length < 10", True),
+    ("i < getN()", False),
+    ("getN() < 10", False),
+    ("value === null", True),
+    ("value === undefined", True),
+    ("5 < 10", True),
+    ("true || false", False),  # always true, never bounded
+    ("true && false", True),  # always false, never entered
+    ("((i < 10)) && (i < n)", False),
+    ("Math.PI < 4", True),
+    pytest.param("Math[foo] < 10", False, marks=pytest.mark.xfail(reason="comparisons against a constant count as bounded")),
+    ("0 && 1", True),
+    ("0 || 1", False),
+    ("'' || 'a'", False),
+    ("'' && 'a'", True),
+    ("((true))", True),
+    ("(flag ? 1 : 2) < 10", True),
+    pytest.param("(flag ? getN() : 2) < 10", False, marks=pytest.mark.xfail(reason="comparisons against a constant count as bounded")),
+    ("(true ? 1 : getN()) < 10", True),
+    ("(false ? getN() : 2) < 10", True),
+]
+
+
+@pytest.mark.parametrize("src, expected", CONSTANT_CASES)
+def test_is_constant(src, expected):
+    resolver = get_boundary_resolver()
+    assert resolver.is_constant(resolver.parse_condition(src)) == expected
+
+
+def test_import_has_no_side_effects():
+    # Importing must not build a resolver, load the grammar or print anything
+    code = (
+        "import boundary_resolver as b; "
+        "assert b._resolver is None; "
+        "assert b.javascript_language.cache_info().currsize == 0"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout == ""
+
+
+@pytest.mark.parametrize("code, expected", [
+    ("for (let i = 0; i < 10 && i < n; i++) {}", "O(N)"),
+    ("while (true) { x++; }", "O(N)"),
+    ("while (false) { x++; }", "O(1)"),
+    ("for (;;) {}", "O(N)"),
+    ("for (const x of xs) { if (x < 10) break; }", "O(N)"),
+    ("do { i++; } while (i < 5);", "O(1)"),
+])
+def test_loop_bounds_use_resolver(code, expected):
+    assert analyzer.analyze(code)[0] == expected
+
+
+def test_each_node_is_evaluated_once(monkeypatch):
+    resolver = get_boundary_resolver()
+    condition = "i < 10"
+    for k in range(50):
+        condition = f"!!(({condition}) && (k{k} ? j{k} < n : !!1)) || !(j{k})"
+    node = resolver.parse_condition(condition)
+
+    seen = []
+    for name in ("_truthiness", "_is_constant"):
+        original = getattr(resolver, name)
+        def spy(node, memo, original=original, name=name):
+            seen.append((name, node.id))
+            return original(node, memo)
+        monkeypatch.setattr(resolver, name, spy)
+
+    resolver.is_bounded_loop(node)
+    assert len(seen) == len(set(seen))
+
+
+def test_deep_condition_does_not_recurse():
+    condition = " && ".join(f"i{k} < 10" for k in range(5000))
+    assert analyzer.analyze(f"while ({condition}) {{ x++; }}")[0] == "O(1)"
+
+
+@pytest.mark.parametrize("code, expected", [
+    ("const LIMIT = 10; for (let i = 0; i < LIMIT; i++) {}", "O(1)"),
+    ("for (let i = 0; i < LIMIT; i++) {} const LIMIT = 10;", "O(1)"),
+    ("const A = 5, B = A * 2; for (let i = 0; i < B; i++) {}", "O(1)"),
+    ("let LIMIT = 10; for (let i = 0; i < LIMIT; i++) {}", "O(1)"),
+    ("let LIMIT = 10; LIMIT = n; for (let i = 0; i < LIMIT; i++) {}", "O(N)"),
+    ("let LIMIT = 10; LIMIT++; for (let i = 0; i < LIMIT; i++) {}", "O(N)"),
+    ("let L = 3; ({ L } = obj); for (let i = 0; i < L; i++) {}", "O(N)"),
+    ("const LIMIT = 10; function f(LIMIT) { for (let i = 0; i < LIMIT; i++) {} }", "O(N)"),
+    ("const L = 3; { let L = n; for (let i = 0; i < L; i++) {} }", "O(N)"),
+    ("const L = n.length; for (let i = 0; i < L; i++) {}", "O(N)"),
+    ("const a = b, b = a; for (let i = 0; i < a; i++) {}", "O(N)"),
+    ("const STOP = 0; while (STOP) {}", "O(1)"),
+])
+def test_loop_bounds_follow_constants(code, expected):
+    assert analyzer.analyze(code)[0] == expected
+    assert analyzer.analyze(code, engine="query")[0] == expected
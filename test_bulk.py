@@ -0,0 +1,59 @@
+import json
+import bulk
+
+
+def write_jsonl(path, records):
+    path.write_text("".join(json.dumps(r) + "\n" for r in records), encoding="utf8")
+
+
+def read_jsonl(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf8").splitlines()]
+
+
+def test_jsonl_run_and_resume(tmp_path):
+    source, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    records = [{"id": f"r{i}", "code": "for (const x of xs) {}" if i % 2 else "let a = 1;"} for i in range(10)]
+    write_jsonl(source, records)
+
+    bulk.main([str(source), "-o", str(output), "--workers", "2", "--chunk-size", "2"])
+    full = read_jsonl(output)
+    assert [r["id"] for r in full] == [r["id"] for r in records]
+    assert [r["time_complexity"] for r in full] == ["O(1)", "O(N)"] * 5
+
+    # Pretend the run died after the first window, with a torn line after it
+    first_window = sum(len(json.dumps(r)) + 1 for r in full[:4])
+    bulk.save_checkpoint(str(output) + ".checkpoint", str(source), 4, first_window)
+    with open(output, "ab") as f:
+        f.write(b'{"id": "torn')
+
+    bulk.main([str(source), "-o", str(output), "--workers", "2", "--chunk-size", "2", "--resume"])
+    assert read_jsonl(output) == full
+
+
+def test_directory_input_and_bad_records(tmp_path):
+    (tmp_path / "src" / "pkg").mkdir(parents=True)
+    (tmp_path / "src" / "a.js").write_text("items.map(f);")
+    (tmp_path / "src" / "pkg" / "b.py").write_text("for x in xs:\n    pass\n")
+    (tmp_path / "src" / "notes.txt").write_text("ignored")
+    output = tmp_path / "out.jsonl"
+
+    bulk.main([str(tmp_path / "src"), "-o", str(output), "--workers", "1"])
+    assert [(r["id"], r["time_complexity"]) for r in read_jsonl(output)] == [("a.js", "O(N)"), ("pkg/b.py", "O(N)")]
+
+    source = tmp_path / "in.jsonl"
+    source.write_text('{"id": 1, "code": "x.map(f)"}\nnot json\n{"id": 3}\n', encoding="utf8")
+    bulk.main([str(source), "-o", str(output), "--workers", "1"])
+    assert [r["status"] for r in read_jsonl(output)] == ["success", "error", "error"]
+
+
+def test_non_string_code_is_an_error_record(tmp_path):
+    source, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    write_jsonl(source, [{"id": "a", "code": 5}, {"id": "b", "code": "xs.map(f)", "language": ["js"]}, {"id": "c", "code": "xs.map(f)"}])
+    bulk.main([str(source), "-o", str(output), "--workers", "1"])
+    results = read_jsonl(output)
+    assert [(r["id"], r["status"]) for r in results] == [("a", "error"), ("b", "error"), ("c", "success")]
+    assert "'code' must be a string" in results[0]["error"]
+
+    # The checkpoint was written, so a resume doesn't trip over the bad record either
+    bulk.main([str(source), "-o", str(output), "--workers", "1", "--resume"])
+    assert read_jsonl(output) == results
@@ -0,0 +1,72 @@
+from cache import ResultCache, SQLiteBackend, make_cache_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_key_ignores_line_endings_and_trailing_whitespace():
+    a = make_cache_key("for (;;) {\r\n  f();   \r\n}\r\n", "javascript", "1")
+    b = make_cache_key("for (;;) {\n  f();\n}", "javascript", "1")
+    assert a == b
+    assert a != make_cache_key("for (;;) {\n  f();\n}", "python", "1")
+    assert a != make_cache_key("for (;;) {\n  f();\n}", "javascript", "2")
+    # Leading whitespace is indentation (Python) or shifts line numbers
+    assert make_cache_key("  x = 1", "python", "1") != make_cache_key("x = 1", "python", "1")
+    assert make_cache_key("\nx = 1", "python", "1") != make_cache_key("x = 1", "python", "1")
+
+
+def test_language_aliases_share_an_entry(monkeypatch):
+    import services
+    from analyzer import analyzer
+
+    monkeypatch.setattr(services, "result_cache", ResultCache())
+    calls = []
+    original = analyzer.analyze_report
+    monkeypatch.setattr(analyzer, "analyze_report", lambda *args: calls.append(args) or original(*args))
+    code = "def f(xs):\n    return sorted(xs)\n"
+    reports = [services.analyze_code(code, language) for language in ("python", "py", "auto")]
+    assert len(calls) == 1 and reports[0] == reports[1] == reports[2]
+
+
+def test_lru_evicts_least_recently_used():
+    cache = ResultCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = ResultCache(ttl=10, clock=clock)
+    cache.set("a", 1)
+    clock.now += 5
+    assert cache.get("a") == 1
+    clock.now += 10
+    assert cache.get("a") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_sqlite_backend_survives_new_cache_instance(tmp_path):
+    path = str(tmp_path / "results.db")
+    ResultCache(backend=SQLiteBackend(path)).set("k", ["O(N)", "reason"])
+
+    fresh = ResultCache(backend=SQLiteBackend(path))
+    assert fresh.get("k") == ["O(N)", "reason"]
+    assert fresh.stats()["size"] == 1
+
+
+def test_sqlite_backend_honours_ttl(tmp_path):
+    clock = FakeClock()
+    backend = SQLiteBackend(str(tmp_path / "results.db"), clock=clock)
+    backend.set("k", [1], ttl=10)
+    clock.now += 11
+    assert backend.get("k") is None
@@ -1,7 +1,7 @@
 import pytest
 from services import analyze_time_complexity
 
-@pytest.mark.parametrize("code_snippet, expected_complexity", [
+TIME_COMPLEXITY_CASES = [
     # --- Basic Structure ---
     ("let a = 1; let b = 2; return a + b;", "O(1)"),
     
@@ -54,8 +54,508 @@ from services import analyze_time_complexity
             if (heap.size() > k) heap.dequeue();
         }
     """, "O(N log N)"),
-])
+
+    # --- Spread Copies ---
+    ("for (const x of xs) { const copy = [...xs]; copy.pop(); }", "O(N^2)"),
+
+    # --- Syntax Errors (ERROR nodes) ---
+    ("for (const x of xs) { if ( }", "O(N)"),
+    ("function f(xs) { for (const x of xs) { for (const y of xs) { g(x, y; } } }", "O(N^2)"),
+    ("con1;\n{while (i { i++", "O(1)"),      # parses to an ERROR root
+    ("for (const z of f(z)) {}", "O(N)"),      # an alias of itself
+
+    # --- Triangular Loops (an inner bound is an outer counter) ---
+    ("for (let i = 0; i < n; i++) { for (let j = 0; j < i; j++) {} }", "O(N^2)"),
+]
+
+
+@pytest.mark.parametrize("code_snippet, expected_complexity", TIME_COMPLEXITY_CASES)
 def test_time_complexity_analysis(code_snippet, expected_complexity):
     complexity, reason = analyze_time_complexity(code_snippet)
     print(f"Reason: {reason}")
-    assert complexity == expected_complexity
\ No newline at end of file
+    assert complexity == expected_complexity
+
+
+@pytest.mark.parametrize("code_snippet, expected_complexity", TIME_COMPLEXITY_CASES)
+def test_query_engine_matches_walker(code_snippet, expected_complexity):
+    from analyzer import analyzer
+
+    walker = analyzer.analyze(code_snippet, engine="walker")
+    assert analyzer.analyze(code_snippet, engine="query") == walker
+    assert walker[0] == expected_complexity
+
+
+def test_flat_tree_is_released_after_the_walk():
+    from analyzer import analyzer, AnalysisContext
+
+    code = b"function f(xs) { for (const x of xs) { g(x); } }"
+    ctx = AnalysisContext(code, "javascript")
+    analyzer.analyze_tree(ctx, analyzer.parsers.get("javascript").parse(code))
+    assert ctx.flat is None
+    # A function the walk didn't summarize is flattened on its own
+    ctx.function_summaries.clear()
+    assert [report["complexity"] for report in analyzer.function_reports(ctx)] == ["O(N)"]
+    assert ctx.flat is None
+
+
+def test_concurrent_analyses_do_not_share_state():
+    from concurrent.futures import ThreadPoolExecutor
+
+    snippets = [
+        ("let a = 1;", "O(1)"),
+        ("for (let i = 0; i < n; i++) { console.log(i); }", "O(N)"),
+        ("for (const a of xs) { for (const b of ys) { f(a, b); } }", "O(N*M)"),
+    ] * 50
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda item: analyze_time_complexity(item[0])[0], snippets))
+    assert results == [expected for _, expected in snippets]
+
+
+def test_analyze_many_keeps_order_and_isolates_failures():
+    from analyzer import analyzer
+
+    snippets = [
+        ("for (let i = 0; i < n; i++) {}", "javascript"),
+        ("let broken = '\ud800';", "javascript"),  # lone surrogate can't be encoded
+        ("let a = 1;", "javascript"),
+    ] * 10
+    results = analyzer.analyze_many(snippets, max_workers=2, chunk_size=4)
+    try:
+        assert [r[0] and r[0]["time_complexity"] for r in results] == ["O(N)", None, "O(1)"] * 10
+        assert all(r[1].startswith("UnicodeEncodeError") for r in results[1::3])
+    finally:
+        analyzer.shutdown()
+
+
+@pytest.mark.parametrize("code_snippet, expected_complexity", [
+    # Long chains and deep nesting used to overflow the recursive walker
+    ("a" + ".map(f)" * 20000, "O(N)"),
+    ("x = " + "(" * 5000 + "1" + ")" * 5000, "O(1)"),
+    ("for (const a of b) {" * 1500 + "}" * 1500, "O(N^1500)"),
+])
+def test_deep_input_is_stack_safe(code_snippet, expected_complexity):
+    complexity, _ = analyze_time_complexity(code_snippet)
+    assert complexity == expected_complexity
+
+
+@pytest.mark.parametrize("code_snippet, expected_complexity", [
+    # Only the callee's own name counts, not substrings of the call text
+    ("const m = _.mapValues(obj, f);", "O(1)"),
+    ("const total = sum(items.map(f));", "O(N)"),
+    ("const keys = Object.keys(obj);", "O(N)"),
+    ("const keys = myObject.keys();", "O(1)"),
+])
+def test_calls_are_classified_by_callee_name(code_snippet, expected_complexity):
+    complexity, _ = analyze_time_complexity(code_snippet)
+    assert complexity == expected_complexity
+
+
+def test_function_report_and_local_call_costs():
+    from analyzer import analyzer
+
+    report = analyzer.analyze_report("""
+function helper(xs) {
+    for (const x of xs) { total += x; }
+}
+class Runner {
+    run(rows) { for (const r of rows) { this.each(r); } }
+    each(r) { return helper(r); }
+}
+const noop = () => 1;
+""")
+    functions = {f["name"]: f for f in report["functions"]}
+    assert list(functions) == ["helper", "run", "each", "noop"]
+    assert (functions["helper"]["start_line"], functions["helper"]["end_line"]) == (2, 4)
+    assert functions["helper"]["complexity"] == "O(N)"
+    # run -> this.each -> helper: the loop in helper runs once per row
+    assert functions["each"]["complexity"] == "O(N)"
+    assert functions["run"]["complexity"] == "O(N*M)"
+    assert functions["noop"]["complexity"] == "O(1)"
+    # helper and each only run through run, the one entry point
+    assert report["time_complexity"] == "O(N*M)"
+
+
+def test_python_method_calls_resolve_within_their_class():
+    from analyzer import analyzer
+
+    report = analyzer.analyze_report("""
+class Other:
+    def each(self, r):
+        return r
+
+class Runner:
+    def run(self, rows):
+        for r in rows:
+            self.each(r)
+
+    def each(self, r):
+        for x in r:
+            total(x)
+
+    @classmethod
+    def build(cls, rows):
+        return cls.sort_rows(rows)
+
+    @classmethod
+    def sort_rows(cls, rows):
+        return sorted(rows)
+""", "python")
+    functions = {(f["name"], f["start_line"]): f["complexity"] for f in report["functions"]}
+    # self.each is Runner.each, not Other.each
+    assert functions[("run", 7)] == "O(N*M)"
+    assert functions[("build", 16)] == "O(N log N)"
+    assert functions[("each", 3)] == "O(1)"
+
+
+MULTI_VARIABLE_CASES = [
+    ("for (const a of xs) { for (const b of ys) {} }", "O(N*M)"),
+    ("for (const row of grid) { for (const x of row) {} }", "O(N*M)"),
+    # Sorting ys once per x
+    ("for (const x of xs) { ys.sort(); }", "O(N*M log N)"),
+    ("xs.forEach(f); ys.sort();", "O(N log N + M)"),
+    # Smaller terms in the same variable are dropped
+    ("for (const x of xs) { for (const y of xs) {} } xs.sort();", "O(N^2)"),
+    # n is xs.length, so both loops walk xs
+    ("const n = xs.length; for (let i = 0; i < n; i++) { xs.includes(i); }", "O(N^2)"),
+]
+
+
+@pytest.mark.parametrize("code_snippet, expected_complexity", MULTI_VARIABLE_CASES)
+def test_costs_keep_one_variable_per_collection(code_snippet, expected_complexity):
+    from analyzer import analyzer
+
+    walker = analyzer.analyze(code_snippet)
+    assert analyzer.analyze(code_snippet, engine="query") == walker
+    assert walker[0] == expected_complexity
+
+
+def test_local_calls_take_their_arguments_sizes():
+    from analyzer import analyzer
+
+    report = analyzer.analyze_report("""
+function scan(items) { return items.filter(Boolean); }
+function pairs(xs) { for (const x of xs) { scan(xs); } }
+function fixed() { return scan([1, 2, 3]); }
+""")
+    functions = {f["name"]: f["complexity"] for f in report["functions"]}
+    assert functions == {"scan": "O(N)", "pairs": "O(N^2)", "fixed": "O(1)"}
+
+
+def test_cost_normal_form():
+    import pickle
+    from complexity import Cost, ONE
+
+    n, m = Cost.var("n"), Cost.var("m")
+    assert (n * n + n * n.log_of() + ONE).format() == "N^2"
+    assert (n + m * m.log_of()).format() == "N log N + M"
+    assert n * m is m * n
+    assert (n * m).substitute({"m": n}) is n * n
+    assert pickle.loads(pickle.dumps(n * m + n)) is n * m
+
+
+def test_costs_built_on_many_threads_are_interned_once():
+    import sys
+    import threading
+    from complexity import Cost
+
+    # Switch threads as often as possible, so misses race each other
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        barrier = threading.Barrier(8)
+        built = [[] for _ in range(8)]
+
+        def build(out):
+            barrier.wait()
+            for i in range(300):
+                n, m = Cost.var(f"concurrent{i}"), Cost.var(f"other{i}")
+                out.append(n * m + n * n.log_of())
+
+        threads = [threading.Thread(target=build, args=(out,)) for out in built]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    for costs in built[1:]:
+        assert all(a is b for a, b in zip(built[0], costs))
+
+
+def test_recursive_local_calls_terminate():
+    from analyzer import analyzer
+
+    report = analyzer.analyze_report("""
+function a(n) { return n ? b(n - 1) : 0; }
+function b(n) { for (const x of xs) {} return a(n); }
+""")
+    # n levels, each walking xs
+    assert [f["complexity"] for f in report["functions"]] == ["O(N*M)", "O(N*M)"]
+
+
+PYTHON_CASES = [
+    ("for x in xs:\n    pass", "O(N)"),
+    ("for i in range(10):\n    pass", "O(1)"),
+    ("for x in xs:\n    for y in ys:\n        pass", "O(N*M)"),
+    ("for x in xs:\n    for y in xs:\n        pass", "O(N^2)"),
+    ("ys = sorted(xs)\nfor x in xs:\n    for y in ys:\n        pass", "O(N^2)"),
+    ("import heapq\nh = []\nfor x in xs:\n    heapq.heappush(h, x)", "O(N log N)"),
+    ("while i < 10:\n    i += 1", "O(1)"),
+    ("r = [f(x) for x in xs]", "O(N)"),
+    ("r = [x * y for x in xs for y in ys]", "O(N*M)"),
+    ("r = [x for x in xs if x in ys.copy()]", "O(N*M)"),
+    ("r = [[x for x in row] for row in grid]", "O(N*M)"),
+    ("r = sum(x for x in xs)", "O(N)"),
+    ("r = [c for c in 'abc']", "O(1)"),
+    ("for x in xs:\n    heapq.heappush(h, x)", "O(N log N)"),
+    ("ys = sorted(xs)\nfor y in ys:\n    pass", "O(N log N)"),
+    ("x = (\nfor y in ys:\n  [", "O(1)"),      # parses to an ERROR root
+    # Aliases of themselves
+    ("nums = sorted(nums)\nfor x in nums:\n    pass", "O(N log N)"),
+    ("a = g(a)\nfor x in a:\n    pass", "O(N)"),
+    # Triangular loops
+    ("for i in range(n):\n    for j in range(i):\n        pass", "O(N^2)"),
+    ("r = [j for i in range(n) for j in range(i)]", "O(N^2)"),
+    ("for x in xs:\n    for j in range(x):\n        pass", "O(N*M)"),
+    # Copies and heapify
+    ("for x in xs:\n    ys = list(xs)", "O(N^2)"),
+    ("for x in xs:\n    seen = set(xs)", "O(N^2)"),
+    ("for x in xs:\n    s = set()\n    d = dict(a=1)\n    t = tuple([])", "O(N)"),
+    ("import heapq\nheapq.heapify(xs)", "O(N)"),
+    ("import heapq\nfor x in xs:\n    heapq.heapify(xs)", "O(N^2)"),
+]
+
+
+@pytest.mark.parametrize("code_snippet, expected_complexity", PYTHON_CASES)
+def test_python_analysis(code_snippet, expected_complexity):
+    from analyzer import analyzer
+
+    walker = analyzer.analyze(code_snippet, "python")
+    assert analyzer.analyze(code_snippet, "python", engine="query") == walker
+    assert walker[0] == expected_complexity
+
+
+# The same program in both languages
+EQUIVALENT_PROGRAMS = [
+    ("for (const x of xs) { const ys = Array.from(xs); }", "for x in xs:\n    ys = list(xs)"),
+    ("for (const x of xs) { const s = new Set(xs); }", "for x in xs:\n    s = set(xs)"),
+    ("for (const x of xs) { const m = new Map(); }", "for x in xs:\n    m = dict()"),
+    ("const ys = xs.slice();\nys.sort();", "ys = xs.copy()\nys.sort()"),
+]
+
+
+@pytest.mark.parametrize("javascript, python", EQUIVALENT_PROGRAMS)
+def test_languages_agree(javascript, python):
+    from analyzer import analyzer
+
+    assert analyzer.analyze(javascript, "javascript")[0] == analyzer.analyze(python, "python")[0]
+
+
+HALF_TYPED = {
+    "javascript": (
+        "const LIMIT = 10;\n"
+        "function f(a) { for (const x of a) { if (a.includes(x)) return x; } }\n"
+        "for (let i = 0; i < LIMIT; i++) { g(i); }\n"
+    ),
+    "python": (
+        "LIMIT = 10\n"
+        "def f(a):\n    for x in a:\n        if x in a:\n            return x\n"
+        "for i in range(LIMIT):\n    ys = sorted(xs)\n"
+    ),
+}
+
+
+@pytest.mark.parametrize("language", sorted(HALF_TYPED))
+def test_half_typed_input_is_analyzed(language):
+    from analyzer import analyzer
+
+    code = HALF_TYPED[language]
+    for end in range(1, len(code) + 1):
+        assert analyzer.analyze_report(code[:end], language)["time_complexity"]
+
+
+def test_language_auto_detection():
+    from analyzer import analyzer
+
+    assert analyzer.resolve_language("auto", "def f(xs):\n    return [x for x in xs]\n") == "python"
+    assert analyzer.resolve_language("auto", "function f(xs) { return xs.map(g); }") == "javascript"
+    assert analyzer.resolve_language("py") == "python"
+    assert analyzer.resolve_language("cobol") == "javascript"
+    assert analyzer.analyze("for x in xs:\n    for y in x:\n        pass\n", "auto")[0] == "O(N*M)"
+
+
+def test_grammars_load_on_first_use():
+    import subprocess
+    import sys
+
+    code = (
+        "import sys; from analyzer import analyzer; "
+        "analyzer.analyze('for (const x of xs) {}'); "
+        "assert 'tree_sitter_python' not in sys.modules, 'python grammar loaded early'; "
+        "assert analyzer.grammars.loaded() == ['javascript']"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+
+RECURSION_CASES = [
+    ("function fib(n) { if (n < 2) return n; return fib(n - 1) + fib(n - 2); }", "javascript", "O(2^N)"),
+    ("function fact(n) { return n <= 1 ? 1 : n * fact(n - 1); }", "javascript", "O(N)"),
+    ("""
+function search(xs, t, lo, hi) {
+    if (lo > hi) return -1;
+    const mid = (lo + hi) >> 1;
+    if (xs[mid] === t) return mid;
+    if (xs[mid] < t) return search(xs, t, mid + 1, hi);
+    return search(xs, t, lo, mid - 1);
+}
+search(items, 3, 0, items.length - 1);
+""", "javascript", "O(log N)"),
+    ("""
+function mergeSort(xs) {
+    if (xs.length <= 1) return xs;
+    const mid = Math.floor(xs.length / 2);
+    return merge(mergeSort(xs.slice(0, mid)), mergeSort(xs.slice(mid)));
+}
+function merge(a, b) {
+    const out = [];
+    let i = 0, j = 0;
+    while (i < a.length && j < b.length) out.push(a[i] < b[j] ? a[i++] : b[j++]);
+    return out;
+}
+""", "javascript", "O(N log N)"),
+    ("function walk(node) { if (!node) return; for (const child of node.children) walk(child); }", "javascript", "O(N)"),
+    ("""
+function isEven(n) { return n === 0 ? true : isOdd(n - 1); }
+function isOdd(n) { return n === 0 ? false : isEven(n - 1); }
+""", "javascript", "O(N)"),
+    ("def fib(n):\n    if n < 2:\n        return n\n    return fib(n - 1) + fib(n - 2)\n", "python", "O(2^N)"),
+    ("""
+def search(xs, lo, hi):
+    if lo > hi:
+        return -1
+    mid = (lo + hi) // 2
+    if xs[mid] < 0:
+        return search(xs, mid + 1, hi)
+    return search(xs, lo, mid - 1)
+""", "python", "O(log N)"),
+    # One call per iteration of a loop over the input: backtracking
+    ("""
+function sub(nums, i) {
+    for (let j = i; j < nums.length; j++) sub(nums, j + 1);
+}
+""", "javascript", "O(2^N*N)"),
+    ("""
+def permute(nums):
+    res = []
+    def backtrack(path, used):
+        if len(path) == len(nums):
+            res.append(path[:])
+            return
+        for i in range(len(nums)):
+            if used[i]:
+                continue
+            used[i] = True
+            path.append(nums[i])
+            backtrack(path, used)
+            path.pop()
+            used[i] = False
+    backtrack([], [False] * len(nums))
+    return res
+""", "python", "O(2^N*N)"),
+    # Methods recurse through self, like this. in JavaScript
+    ("class S:\n    def fib(self, n):\n        if n < 2:\n            return n\n        return self.fib(n - 1) + self.fib(n - 2)\n",
+     "python", "O(2^N)"),
+    ("class S { fib(n) { if (n < 2) return n; return this.fib(n - 1) + this.fib(n - 2); } }", "javascript", "O(2^N)"),
+]
+
+
+@pytest.mark.parametrize("code_snippet, language, expected_complexity", RECURSION_CASES)
+def test_recurrences(code_snippet, language, expected_complexity):
+    from analyzer import analyzer
+
+    assert analyzer.analyze(code_snippet, language)[0] == expected_complexity
+
+
+@pytest.mark.parametrize("code_snippet, language, kind", [
+    ("function f(n) { return f(n / 2); }", "javascript", "divide-and-conquer"),
+    ("function f(n) { return f(n / 2); }\nf(xs.length);", "javascript", "divide-and-conquer"),
+    ("function fib(n) { if (n < 2) return n; return fib(n - 1) + fib(n - 2); }", "javascript", "exponential"),
+    ("import heapq\nfor x in xs:\n    heapq.heappush(h, x)", "python", None),
+])
+def test_log_and_exponential_reasons_name_the_recurrence(code_snippet, language, kind):
+    from analyzer import analyzer
+    from recursion import REASONS
+
+    _, reason = analyzer.analyze(code_snippet, language)
+    if kind is None:
+        assert reason not in REASONS.values()
+    else:
+        assert reason == REASONS[kind]
+
+
+def test_recursion_is_reported_per_function():
+    from analyzer import analyzer
+
+    report = analyzer.analyze_report("""
+function fib(n) { return n < 2 ? n : fib(n - 1) + fib(n - 2); }
+function table() { return fib(30); }
+function run(n) { return fib(n); }
+""")
+    functions = {f["name"]: f for f in report["functions"]}
+    assert functions["fib"]["reason"].startswith("Branching recursion")
+    # A constant argument makes even an exponential call constant
+    assert functions["table"]["complexity"] == "O(1)"
+    assert functions["run"]["complexity"] == "O(2^N)"
+
+
+SPACE_CASES = [
+    ("""
+function twoSum(nums, target) {
+    const seen = new Map();
+    for (let i = 0; i < nums.length; i++) {
+        if (seen.has(target - nums[i])) return true;
+        seen.set(nums[i], i);
+    }
+    return false;
+}
+""", "javascript", "O(N)"),
+    ("function reverse(a) { for (let i = 0, j = a.length - 1; i < j; i++, j--) { const t = a[i]; a[i] = a[j]; a[j] = t; } }", "javascript", "O(1)"),
+    ("const copy = items.slice(); copy.sort();", "javascript", "O(N)"),
+    ("const both = [...a, ...b];", "javascript", "O(N + M)"),
+    ("const counts = {}; for (const w of words) { counts[w] = (counts[w] || 0) + 1; }", "javascript", "O(N)"),
+    ("for (let i = 0; i < n; i++) { const row = []; for (let j = 0; j < m; j++) row.push(0); grid.push(row); }", "javascript", "O(N*M)"),
+    ("for (let i = 0; i < n; i++) { grid.push(new Array(m)); }", "javascript", "O(N*M)"),
+    ("function fib(n) { if (n < 2) return n; return fib(n - 1) + fib(n - 2); }", "javascript", "O(N)"),
+    ("""
+function search(xs, t, lo, hi) {
+    if (lo > hi) return -1;
+    const mid = (lo + hi) >> 1;
+    if (xs[mid] < t) return search(xs, t, mid + 1, hi);
+    return search(xs, t, lo, mid - 1);
+}
+""", "javascript", "O(log N)"),
+    ("def double(xs):\n    return [x * 2 for x in xs]\n", "python", "O(N)"),
+    ("def total(xs):\n    return sum(x * 2 for x in xs)\n", "python", "O(1)"),
+    ("def keep(xs):\n    out = []\n    for x in xs:\n        out.append(x)\n    return out\n", "python", "O(N)"),
+]
+
+
+@pytest.mark.parametrize("code_snippet, language, expected_space", SPACE_CASES)
+def test_space_complexity(code_snippet, language, expected_space):
+    from analyzer import analyzer
+
+    assert analyzer.analyze_report(code_snippet, language)["space_complexity"] == expected_space
+
+
+def test_space_is_reported_per_function():
+    from analyzer import analyzer
+
+    report = analyzer.analyze_report("""
+function add(s, x) { s.add(x); }
+function fill(xs) { const seen = new Set(); for (const x of xs) add(seen, x); return seen; }
+""")
+    functions = {f["name"]: f for f in report["functions"]}
+    assert functions["add"]["space_complexity"] == "O(1)"
+    assert functions["fill"]["space_complexity"] == "O(N)"
+    assert report["space_reason"] == "Collections or copies proportional to the input"
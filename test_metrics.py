@@ -0,0 +1,107 @@
+import asyncio
+from metrics import Histogram, ServiceMetrics, SlowRequestProfiler
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("latency_seconds", "Latency.", (0.1, 1), ("language",))
+    for value in (0.05, 0.5, 0.7, 3):
+        histogram.observe(value, "python")
+    assert histogram.render()[2:] == [
+        'latency_seconds_bucket{language="python",le="0.1"} 1',
+        'latency_seconds_bucket{language="python",le="1"} 3',
+        'latency_seconds_bucket{language="python",le="+Inf"} 4',
+        'latency_seconds_sum{language="python"} 4.25',
+        'latency_seconds_count{language="python"} 4',
+    ]
+
+
+def test_service_metrics_by_language_size_and_stage():
+    metrics = ServiceMetrics()
+    metrics.observe("python", 5_000, 0.02, {"parse": 0.001, "traverse": 0.01, "nodes": 400, "max_depth": 7})
+    metrics.observe("cobol", 50, 0.001, {}, status="overloaded")
+    text = metrics.render()
+    assert 'analysis_request_seconds_count{language="python",size="10k"} 1' in text
+    assert 'analysis_requests_total{language="other",status="overloaded"} 1' in text
+    assert 'analysis_stage_seconds_count{stage="traverse"} 1' in text
+    assert 'analysis_max_depth_bucket{le="10"} 1' in text
+
+
+def test_profiler_keeps_the_slowest_dumps(tmp_path, monkeypatch):
+    import metrics
+
+    # Each call takes as long as it says, on a clock only it advances
+    now = [100.0]
+    monkeypatch.setattr(metrics.time, "perf_counter", lambda: now[0])
+
+    def work(seconds):
+        now[0] += seconds
+
+    profiler = SlowRequestProfiler(str(tmp_path), keep=2, sample_rate=1.0)
+    for seconds in (0.03, 0.001, 0.06, 0.02):
+        profiler.run(work, seconds)
+    kept = profiler.slowest()
+    assert [round(seconds, 6) for seconds, _ in kept] == [0.06, 0.03]
+    assert [path.split("/")[-1].split("-")[0] for _, path in kept] == ["60ms", "30ms"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(path.split("/")[-1] for _, path in kept)
+
+
+def test_analyze_endpoint_reports_stage_timings(monkeypatch):
+    import routes
+    from models import CodeSnippet
+
+    metrics = ServiceMetrics()
+    monkeypatch.setattr(routes, "metrics", metrics)
+    asyncio.run(routes.analyze_code_endpoint(CodeSnippet(code="for (const x of xs) { for (const y of x) {} }\n// metrics")))
+    text = metrics.render()
+    for stage in ("queue", "parse", "traverse", "serialize"):
+        assert f'analysis_stage_seconds_count{{stage="{stage}"}} 1' in text
+    assert 'analysis_requests_total{language="javascript",status="success"} 1' in text
+    assert 'analysis_nodes_count 1' in text
+
+
+def test_analyze_endpoint_counts_failures_as_errors(monkeypatch):
+    import pytest
+    import routes
+    from models import CodeSnippet
+
+    def broken(code, language, deadline, stats):
+        raise RuntimeError("boom")
+
+    metrics = ServiceMetrics()
+    monkeypatch.setattr(routes, "metrics", metrics)
+    monkeypatch.setattr(routes, "analyze_code", broken)
+    with pytest.raises(RuntimeError):
+        asyncio.run(routes.analyze_code_endpoint(CodeSnippet(code="xs.map(f) // failing")))
+    text = metrics.render()
+    assert 'analysis_requests_total{language="javascript",status="error"} 1' in text
+    assert 'status="success"' not in text
+
+
+def test_aliases_and_other_routes_are_reported_by_grammar(monkeypatch):
+    import routes
+    import services
+    from models import BatchRequest, CodeSnippet, EditRequest
+
+    metrics = ServiceMetrics()
+    monkeypatch.setattr(routes, "metrics", metrics)
+    monkeypatch.setattr(services, "metrics", metrics)
+    asyncio.run(routes.analyze_code_endpoint(CodeSnippet(code="def f(xs):\n    return xs\n# alias", language="py")))
+    created = asyncio.run(routes.create_session_endpoint(CodeSnippet(code="for x in xs:\n    pass\n", language="auto")))
+    asyncio.run(routes.edit_session_endpoint(created["session_id"], EditRequest(edits=[
+        {"start_byte": 0, "old_end_byte": 0, "new_text": "# edited\n"}])))
+    asyncio.run(routes.analyze_batch_endpoint(BatchRequest(snippets=[{"code": "x.map(f)", "language": "js"}] * 3)))
+
+    async def records():
+        yield b'{"code": "xs.sort() // streamed", "language": "js"}\n'
+
+    async def stream():
+        return [line async for line in services.analyze_stream(records(), 5000)]
+
+    asyncio.run(stream())
+    text = metrics.render()
+    assert 'analysis_requests_total{language="python",status="success"} 3' in text
+    assert 'analysis_requests_total{language="javascript",status="success"} 4' in text
+    assert "other" not in text
+    # /analyze, two session analyses, the batch and the stream record all waited in the queue
+    assert 'analysis_stage_seconds_count{stage="queue"} 5' in text
+    assert 'analysis_stage_seconds_count{stage="traverse"} 4' in text
@@ -0,0 +1,50 @@
+import asyncio
+import json
+import pytest
+import main
+import prefork
+from analyzer import analyzer
+
+
+def test_preload_loads_every_language():
+    assert analyzer.preload() == ["javascript", "python"]
+    assert sorted(analyzer.grammars.loaded()) == ["javascript", "python"]
+    assert set(analyzer.query_engine._queries) == {"javascript", "python"}
+
+
+def test_not_ready_until_warmed_up(monkeypatch):
+    state = prefork.WorkerState()
+    monkeypatch.setattr(prefork, "state", state)
+    monkeypatch.setattr(main, "state", state)
+    assert main.readiness().status_code == 503
+
+    asyncio.run(prefork.warm_up())
+    assert state.ready and state.cold_start > 0
+    ready = main.readiness()
+    assert ready["status"] == "ready"
+    assert ready["memory"]["rss"] > 0
+    assert "worker_cold_start_seconds" in main.metrics.render()
+    json.dumps(ready)
+
+
+def test_warm_up_only_runs_preloaded_languages(monkeypatch):
+    warmed = []
+    original = analyzer.analyze_report
+
+    def spy(code, language, *args, **kwargs):
+        warmed.append(language)
+        return original(code, language, *args, **kwargs)
+
+    monkeypatch.setattr(prefork, "state", prefork.WorkerState())
+    monkeypatch.setattr(prefork, "PRELOAD", ["javascript"])
+    monkeypatch.setattr(analyzer, "analyze_report", spy)
+    asyncio.run(prefork.warm_up())
+    assert warmed == ["javascript"]
+    assert analyzer.preload([]) == []
+
+
+def test_preload_languages_are_checked():
+    assert prefork._preload_languages(" python, javascript") == ["python", "javascript"]
+    assert prefork._preload_languages("") == []
+    with pytest.raises(ValueError, match="cobol"):
+        prefork._preload_languages("javascript,cobol")
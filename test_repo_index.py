@@ -0,0 +1,57 @@
+import os
+
+import pytest
+
+import repo_index
+from complexity import leading_order
+from repo_index import RepoIndex
+
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf8")
+
+
+@pytest.fixture
+def repo(tmp_path):
+    root = tmp_path / "repo"
+    write(root / "a.js", "function pairs(xs) { for (const x of xs) { for (const y of xs) {} } }\n")
+    write(root / "lib" / "b.py", "def ordered(xs):\n    return sorted(xs)\n")
+    write(root / "lib" / "empty.py", "")
+    write(root / "node_modules" / "dep.js", "function skipped(xs) { return xs.map(f); }\n")
+    return root
+
+
+def test_only_changed_files_are_reanalyzed(repo, tmp_path):
+    index = RepoIndex(str(tmp_path / "index.sqlite"))
+    assert index.update(str(repo), workers=1) == {"files": 3, "analyzed": 3, "unchanged": 0, "removed": 0, "errors": 0}
+    assert index.update(str(repo), workers=1)["unchanged"] == 3
+
+    # Touched but identical: hashed, not analyzed
+    os.utime(repo / "a.js", ns=(1, 1))
+    assert index.update(str(repo), workers=1)["analyzed"] == 0
+
+    write(repo / "lib" / "b.py", "def ordered(xs):\n    return xs\n")
+    (repo / "a.js").unlink()
+    counts = index.update(str(repo), workers=1)
+    assert (counts["analyzed"], counts["removed"]) == (1, 1)
+    assert [(f["path"], f["name"], f["complexity"]) for f in index.ranked()] == [("lib/b.py", "ordered", "O(1)")]
+    index.close()
+
+    # A new analyzer version invalidates every entry
+    index = RepoIndex(str(tmp_path / "index.sqlite"), version="next")
+    assert index.update(str(repo), workers=1)["analyzed"] == 2
+    index.close()
+
+
+def test_ranking_and_cli(repo, tmp_path, capsys):
+    write(repo / "lib" / "c.js", "function line(xs) { return xs.map(f); }\nfunction fixed() { return 1; }\n")
+    repo_index.main([str(repo), "--index", str(tmp_path / "index.sqlite"), "--workers", "1", "--top", "3"])
+    lines = capsys.readouterr().out.splitlines()
+    assert [line.split()[-1] for line in lines] == ["pairs", "ordered", "line"]
+
+
+def test_leading_order():
+    ranks = ["O(1)", "O(log N)", "O(N)", "O(N log N)", "O(N*M + K)", "O(N^2 log N)", "O(2^N)"]
+    assert sorted(ranks, key=leading_order) == ranks
+    assert leading_order("O(2^N*N^2 log^2 N)") == (2, 2, 2)
@@ -0,0 +1,187 @@
+import random
+import pytest
+from analyzer import analyzer
+from sessions import AnalysisSession
+
+FUNCTIONS = "".join(
+    f"function f{i}(xs) {{ for (const x of xs) {{ total += x; }} }}\n" for i in range(200)
+)
+
+
+def count_scored_nodes(monkeypatch):
+    calls = []
+    original = analyzer._score
+
+    def spy(ctx, node_type, node, is_chain):
+        calls.append(node_type)
+        return original(ctx, node_type, node, is_chain)
+
+    monkeypatch.setattr(analyzer, "_score", spy)
+    return calls
+
+
+def test_edit_matches_fresh_analysis():
+    session = AnalysisSession("for (let i = 0; i < n; i++) { f(i); }", "javascript")
+    assert session.result[0] == "O(N)"
+
+    start = session.code_bytes.index(b"f(i)")
+    result = session.apply_edits([(start, start + 4, "for (const y of ys) { g(y); }")])
+    assert result == analyzer.analyze(session.code_bytes.decode("utf8"))
+    assert result[0] == "O(N*M)"
+
+
+def test_edit_only_rewalks_changed_region(monkeypatch):
+    session = AnalysisSession(FUNCTIONS, "javascript")
+    scored = count_scored_nodes(monkeypatch)
+
+    start = session.code_bytes.index(b"total += x", 1000)
+    session.apply_edits([(start, start + len("total += x"), "total += x.map(g)")])
+    # Only the spine down to the edited function is walked, not all 200 functions
+    assert 0 < len(scored) < 100
+
+    assert session.result == analyzer.analyze(session.code_bytes.decode("utf8"))
+    assert session.result[0] == "O(N*M)"
+
+
+def test_sequential_edits_and_multibyte_text():
+    session = AnalysisSession("const s = read('é');\n", "javascript")
+    end = len(session.code_bytes)
+    session.apply_edits([
+        (end, end, "for (const c of s) {}\n"),
+        (0, 0, "// ünïcode\n"),
+    ])
+    assert session.code_bytes.decode("utf8") == "// ünïcode\nconst s = read('é');\nfor (const c of s) {}\n"
+    assert session.result[0] == "O(N)"
+
+
+def test_bad_edit_leaves_session_untouched():
+    session = AnalysisSession("let a = 1;", "javascript")
+    with pytest.raises(ValueError):
+        session.apply_edits([(0, 3, "const"), (50, 60, "x")])
+    assert session.code_bytes == b"let a = 1;"
+
+    # Over the size limit, counted in characters like on creation
+    with pytest.raises(ValueError, match="too long"):
+        session.apply_edits([(0, 0, "x" * 10)], max_length=15)
+    session.apply_edits([(0, 0, "// é\n")], max_length=15)
+    assert session.code_bytes == "// é\nlet a = 1;".encode("utf8")
+
+
+def test_editing_a_constant_rechecks_loops_that_use_it():
+    code = "const LIMIT = 10;\n" + FUNCTIONS + "for (let i = 0; i < LIMIT; i++) { for (const x of xs) {} }\n"
+    session = AnalysisSession(code, "javascript")
+    assert session.result[0] == "O(N)"
+
+    # The loop is far from the edit, but its bound changes with it
+    start = len("const LIMIT = ")
+    result = session.apply_edits([(start, start + 2, "n")])
+    assert result == analyzer.analyze(session.code_bytes.decode("utf8"))
+    assert result[0] == "O(N*M)"
+
+
+@pytest.mark.parametrize("anchor, text", [
+    ("function f(", "L, "),                         # a parameter
+    ("function f() {", " var L = n;"),              # a var
+    ("function f() {", " function L() {}"),         # a function name
+])
+def test_shadowing_a_constant_rechecks_loops_that_use_it(anchor, text):
+    code = "const L = 10;\nfunction f() { for (let i = 0; i < L; i++) { g(i); } }\n"
+    session = AnalysisSession(code, "javascript")
+    assert session.result[0] == "O(1)"
+
+    start = session.code_bytes.index(anchor.encode()) + len(anchor)
+    result = session.apply_edits([(start, start, text)])
+    assert result == analyzer.analyze(session.code_bytes.decode("utf8"))
+    assert result[0] == "O(N)"
+
+
+def test_edit_reuses_unchanged_top_level_statements(monkeypatch):
+    import analyzer as analyzer_module
+    session = AnalysisSession(FUNCTIONS + "for (const x of xs) { total += x; }\n", "javascript")
+    fragments = dict(session.fragments)
+    flattened = []
+    original = analyzer_module.flatten
+
+    def spy(root, *args, **kwargs):
+        flat = original(root, *args, **kwargs)
+        flattened.append(len(flat))
+        return flat
+
+    monkeypatch.setattr(analyzer_module, "flatten", spy)
+    start = session.code_bytes.index(b"total += x", 1000)
+    session.apply_edits([(start, start + len("total += x"), "total += x.map(g)")])
+
+    # The other statements' constant-table fragments are carried over, and
+    # only the edited one is flattened below its top-level slot
+    assert sum(session.fragments.get(key) is fragment for key, fragment in fragments.items()) == 200
+    assert max(flattened) < 300
+    assert session.result == analyzer.analyze(session.code_bytes.decode("utf8"))
+
+
+@pytest.mark.parametrize("code, old, new", [
+    # A call in an unchanged function starts to reach a local function
+    ("function g(xs) { return q(xs); }\ng(items);\n", "g(items);", "function q(xs) { return xs.sort(); }"),
+    # A free name in an unchanged loop starts to read a constant
+    ("for (let i = 0; i < n; i++) { t += i; }\n{ const n = 5; for (let j = 0; j < n; j++) {} }\n",
+     "{ const n = 5; for (let j = 0; j < n; j++) {} }", "const n = 10;"),
+])
+def test_new_declaration_rechecks_unchanged_statements(code, old, new):
+    session = AnalysisSession(code, "javascript")
+    start = session.code_bytes.index(old.encode())
+    result = session.apply_edits([(start, start + len(old), new)])
+    assert result == analyzer.analyze(session.code_bytes.decode("utf8"))
+
+
+@pytest.mark.parametrize("language, code", [
+    ("javascript", "const L = 10;\nfunction f(a) { for (const x of a) { g(x); } }\nfor (let i = 0; i < L; i++) { f(i); }\n"),
+    ("python", "L = 10\ndef f(a):\n    for x in a:\n        g(x)\nfor i in range(L):\n    f(i)\n"),
+])
+def test_typing_a_program_one_character_at_a_time(language, code):
+    # Most buffers on the way have syntax errors, some an ERROR root
+    session = AnalysisSession("", language)
+    for i, char in enumerate(code):
+        result = session.apply_edits([(i, i, char)])
+        assert result == analyzer.analyze(code[:i + 1], language)
+
+
+INVALID_BUFFERS = {
+    "javascript": (
+        "for (let i = 0; i < LIMIT; i++) { g(i); }\n"
+        "function f(a) { fo)r (const x n of a) { a.incLIMITlude{s(x); } }\n"
+        "function fib(k) { returk : fib(k-1) + fib(k-2); }\n"
+    ),
+    "python": (
+        "LIMIT = 10\nfor i in range(LIMIT):\n    g(i)\n"
+        "def f(a):\n    fo)r x n in a:\n        a.index(x\n"
+        "def fib(k):\n    returk fib(k-1) + fib(k-2)\n"
+    ),
+}
+
+
+def test_edit_next_to_a_syntax_error():
+    code = INVALID_BUFFERS["javascript"]
+    session = AnalysisSession(code, "javascript")
+    result = session.apply_edits([(23, 23, "x")])
+    assert result == analyzer.analyze(code[:23] + "x" + code[23:], "javascript")
+
+
+@pytest.mark.parametrize("language", sorted(INVALID_BUFFERS))
+def test_edits_to_invalid_buffers_match_fresh_analysis(language):
+    # Error recovery depends on the tree a parse starts from
+    for seed in range(5):
+        rng = random.Random(seed)
+        code = INVALID_BUFFERS[language]
+        session = AnalysisSession(code, language)
+        for _ in range(40):
+            start = rng.randrange(len(code) + 1)
+            end = min(len(code), start + rng.choice([0, 0, 1, 2]))
+            text = rng.choice(["", "x", "(", ")", "{", "}", ":", " ", "\n", "fib(k)", "for"])
+            result = session.apply_edits([(start, end, text)])
+            code = code[:start] + text + code[end:]
+            assert result == analyzer.analyze(code, language), (seed, code)
+
+
+def test_session_with_an_alias_of_itself():
+    # The constant fingerprint names every binding's size
+    session = AnalysisSession("nums = sorted(nums)\nfor x in nums:\n    pass\n", "python")
+    assert session.result[0] == "O(N log N)"
@@ -0,0 +1,38 @@
+import asyncio
+import json
+from services import analyze_stream, iter_lines
+
+
+async def chunked(data: bytes, size: int):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def collect(agen):
+    async def run():
+        return [item async for item in agen]
+    return asyncio.run(run())
+
+
+def test_results_come_back_in_input_order():
+    records = [
+        {"code": "for (let i = 0; i < n; i++) {}"},
+        {"code": "let a = 1;"},
+        {"code": "for (const a of xs) { for (const b of ys) {} }", "language": "javascript"},
+    ] * 20
+    body = "\n".join(json.dumps(r) for r in records).encode("utf8")
+
+    lines = collect(analyze_stream(chunked(body, 7), max_code_length=5000, window=4))
+    results = [json.loads(line) for line in lines]
+    assert [r["time_complexity"] for r in results] == ["O(N)", "O(1)", "O(N*M)"] * 20
+
+
+def test_bad_records_fail_alone():
+    body = b'{"code": "let a = 1;"}\nnot json\n\n{"language": "javascript"}\n{"code": "x.map(f)"}\n'
+    results = [json.loads(line) for line in collect(analyze_stream(chunked(body, 5), 5000, window=2))]
+    assert [r["status"] for r in results] == ["success", "error", "error", "success"]
+
+
+def test_overlong_line_is_dropped_without_buffering_it():
+    body = b"a" * 100 + b"\nok\n"
+    assert collect(iter_lines(chunked(body, 8), max_line_bytes=16)) == [None, b"ok"]
@@ -0,0 +1,73 @@
+import math
+import time
+import pytest
+from verifier import VerificationError, fit, measure, pick_function, verify
+
+SIZES = [1, 2, 3, 4, 5, 6, 8, 10, 12, 15, 19, 24, 30, 37, 46, 58, 72, 90, 113, 141, 176]
+GROWTH = {
+    "O(1)": lambda n: 1,
+    "O(log N)": lambda n: math.log2(n),
+    "O(N)": lambda n: n,
+    "O(N log N)": lambda n: n * math.log2(n),
+    "O(N^2)": lambda n: n * n,
+    "O(N^3)": lambda n: n ** 3,
+    "O(2^N)": lambda n: 1.6 ** n,
+}
+
+
+@pytest.mark.parametrize("model", list(GROWTH))
+def test_fit_recovers_the_growth_model(model):
+    pytest.importorskip("numpy")
+    sizes = SIZES[:12] if model == "O(2^N)" else SIZES
+    # 2% deterministic jitter on top of a fixed call overhead
+    points = [(n, (1e-7 + 1e-8 * GROWTH[model](n)) * (1 + 0.02 * (-1) ** i)) for i, n in enumerate(sizes)]
+    name, confidence, _ = fit(points)
+    assert name == model
+    assert confidence > 0.5
+
+
+def test_pick_function():
+    code = "import os\n\ndef first(xs, k):\n    return xs\n\ndef second():\n    pass\n"
+    assert pick_function(code) == ("first", 2)
+    assert pick_function(code, "second") == ("second", 0)
+    with pytest.raises(VerificationError):
+        pick_function(code, "missing")
+
+
+def test_pick_function_counts_required_parameters():
+    code = (
+        "def search(xs, target=0, *, key=None):\n    pass\n"
+        "def merge(a, /, b, c=1, *rest, **options):\n    pass\n"
+        "def ranked(xs, *, by):\n    pass\n"
+    )
+    assert pick_function(code, "search") == ("search", 1)
+    assert pick_function(code, "merge") == ("merge", 2)
+    with pytest.raises(VerificationError, match="by"):
+        pick_function(code, "ranked")
+
+
+def test_measure_stops_on_budget_errors_and_size():
+    points, reason = measure("def f(xs):\n    return xs\n", "f", 1, budget=5, max_size=64)
+    assert reason == "done"
+    sizes = [n for n, _ in points]
+    assert sizes == sorted(sizes) and sizes[-1] <= 64 and all(t > 0 for _, t in points)
+
+    points, reason = measure("import time\ndef f(n):\n    time.sleep(n / 100)\n", "f", 1, kind="int", budget=1)
+    assert reason == "budget" and points
+
+    # A forked child holding the pipes open doesn't outlast the budget
+    started = time.monotonic()
+    points, reason = measure("import os, time\nos.fork()\ndef f(xs):\n    time.sleep(100)\n", "f", 1, budget=1)
+    assert reason == "budget" and time.monotonic() - started < 5
+
+    points, reason = measure("def f(xs):\n    if len(xs) > 3:\n        raise ValueError('big')\n", "f", 1, budget=5)
+    assert "ValueError: big" in reason and len(points) == 3
+
+
+def test_verify_reports_the_static_verdict_next_to_the_fit():
+    pytest.importorskip("numpy")
+    code = "def pairs(xs):\n    for x in xs:\n        for y in xs:\n            pass\n"
+    result = verify(code, budget=30, max_size=512)
+    assert result["function"] == "pairs" and result["static"] == "O(N^2)"
+    assert result["empirical"] == "O(N^2)" and result["agrees"]
+    assert 0 <= result["confidence"] <= 1
@@ -0,0 +1,335 @@
+"""Empirical check of the static verdict for Python snippets.
+
+    python -m verifier snippet.py [--function f] [--input list] [--budget 10] [--json]
+    python -m verifier corpus.jsonl --corpus [--disagreements [--min-confidence 0.5]]
+
+Runs one function of the snippet in a sandboxed subprocess over a growing
+series of input sizes, times it in batches, and fits growth models
+(1, log N, N, N log N, N^2, N^3, 2^N) by least squares on the relative
+error. The simplest model that fits about as well as the best one is
+reported next to the analyzer's verdict for that function, with a
+confidence: how much better it fits than the best model it ruled out.
+
+The sandbox runs the snippet in an isolated interpreter (-I) with an
+empty environment, in a temporary directory, under CPU, memory, file
+size, open-file and process-count limits, in its own session, which is
+killed as a whole when the budget runs out. It is not a security
+boundary: only verify code you would be willing to run. Every
+parameter of the function gets an input of the same kind and size;
+--input picks the kind. Fitting needs NumPy.
+"""
+import argparse
+import ast
+import json
+import math
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+from analyzer import analyzer
+from bulk import iter_jsonl
+from complexity import leading_order
+
+INPUT_KINDS = ("list", "sorted", "int", "str")
+MIN_POINTS = 5
+# Fits within this fraction of the best one count as fitting as well
+TOLERANCE = 0.1
+# A model whose growing term is less than this share of the time at the
+# largest size is the constant model in disguise, and isn't considered
+MIN_GROWTH_SHARE = 0.1
+
+# name, (exponential base, degree, log degree) as complexity.leading_order gives it, f(n).
+# "O(2^N)" stands for any c^N: its base is fitted too, from EXPONENTIAL_BASES.
+MODELS = (
+    ("O(1)", (1, 0, 0), None),
+    ("O(log N)", (1, 0, 1), lambda n, np: np.log2(n)),
+    ("O(N)", (1, 1, 0), lambda n, np: n),
+    ("O(N log N)", (1, 1, 1), lambda n, np: n * np.log2(n)),
+    ("O(N^2)", (1, 2, 0), lambda n, np: n ** 2),
+    ("O(N^3)", (1, 3, 0), lambda n, np: n ** 3),
+    ("O(2^N)", (2, 0, 0), "exponential"),
+)
+ORDERS = {name: order for name, order, _ in MODELS}
+EXPONENTIAL_BASES = [1 + step / 20 for step in range(2, 61)]      # 1.1 .. 4
+
+# Runs in the sandbox: reads its config on stdin, prints one [size, seconds per call] line per size
+CHILD = r"""
+import json, random, resource, sys, time
+
+config = json.loads(sys.stdin.read())
+memory = config["memory"]
+resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+resource.setrlimit(resource.RLIMIT_CPU, (config["cpu"], config["cpu"] + 1))
+resource.setrlimit(resource.RLIMIT_FSIZE, (0, 0))
+resource.setrlimit(resource.RLIMIT_NOFILE, (16, 16))
+# No forking: a child would outlive the batch and hold the output pipe open
+resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+sys.setrecursionlimit(100_000)
+
+namespace = {"__name__": "__verified__"}
+exec(compile(config["code"], "<snippet>", "exec"), namespace)
+function = namespace[config["function"]]
+rng = random.Random(0)
+
+def make(kind, n):
+    if kind == "int":
+        return n
+    if kind == "str":
+        return "".join(rng.choice("abcdefgh") for _ in range(n))
+    # Distinct values, so searches for a duplicate or a match can't stop early
+    values = rng.sample(range(4 * n), n)
+    return sorted(values) if kind == "sorted" else values
+
+def fresh(inputs):
+    return [list(x) if isinstance(x, list) else x for x in inputs]
+
+def run(inputs, calls, mutates):
+    if not mutates:
+        start = time.perf_counter()
+        for _ in range(calls):
+            function(*inputs)
+        return time.perf_counter() - start
+    # A function that sorts or consumes its input gets a fresh copy per call, copied outside the clock
+    elapsed = 0.0
+    for _ in range(calls):
+        args = fresh(inputs)
+        start = time.perf_counter()
+        function(*args)
+        elapsed += time.perf_counter() - start
+    return elapsed
+
+n = 1
+while n <= config["max_size"]:
+    inputs = [make(config["kind"], n) for _ in range(config["arity"])]
+    probe = fresh(inputs)
+    function(*probe)
+    mutates = probe != inputs
+    calls = 1
+    while (elapsed := run(inputs, calls, mutates)) < config["min_batch"]:
+        calls *= 2
+    best = elapsed / calls
+    for _ in range(config["batches"] - 1):
+        best = min(best, run(inputs, calls, mutates) / calls)
+    print(json.dumps([n, best]), flush=True)
+    if best > config["max_call"]:
+        break
+    n = max(n + 1, int(n * config["growth"]))
+"""
+
+
+class VerificationError(Exception):
+    """The snippet can't be verified: no such function, or too few timings."""
+
+
+def pick_function(code, name=None):
+    """(name, required parameter count) of `name`, or of the snippet's first top-level function.
+
+    Parameters with defaults are left to them; a required keyword-only
+    parameter can't be given an input, so such a function can't be verified.
+    """
+    functions = {
+        node.name: node.args
+        for node in ast.parse(code).body
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+    }
+    if name is None:
+        if not functions:
+            raise VerificationError("No top-level function to verify")
+        name = next(iter(functions))
+    if name not in functions:
+        raise VerificationError(f"No top-level function named {name!r}")
+    args = functions[name]
+    required = [arg.arg for arg, default in zip(args.kwonlyargs, args.kw_defaults) if default is None]
+    if required:
+        raise VerificationError(f"{name}() has required keyword-only parameters: {', '.join(required)}")
+    return name, len(args.posonlyargs) + len(args.args) - len(args.defaults)
+
+
+def measure(code, function, arity, kind="list", budget=10.0, max_size=1 << 16,
+            growth=1.25, min_batch=0.005, batches=3, memory=1 << 30):
+    """Runs `function` in the sandbox at growing sizes for at most `budget` seconds.
+
+    Returns ([(size, seconds per call)], stop reason). The series stops at
+    `max_size`, after the first size whose call took more than a tenth of
+    the budget, on an exception, or when the budget runs out (the timings
+    collected until then are kept).
+    """
+    config = {
+        "code": code, "function": function, "arity": arity, "kind": kind, "max_size": max_size,
+        "growth": growth, "min_batch": min_batch, "batches": batches, "max_call": budget / 10,
+        "memory": memory, "cpu": math.ceil(budget) + 1,
+    }
+    with tempfile.TemporaryDirectory() as sandbox:
+        process = subprocess.Popen(
+            [sys.executable, "-I", "-c", CHILD], cwd=sandbox, env={},
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            text=True, start_new_session=True,
+        )
+        try:
+            output, errors = process.communicate(json.dumps(config), timeout=budget)
+            reason = "done" if process.returncode == 0 else _last_line(errors) or f"exit status {process.returncode}"
+        except subprocess.TimeoutExpired:
+            # The whole session, in case the snippet forked despite RLIMIT_NPROC
+            # (which root isn't held to): a surviving child keeps the pipes open
+            _kill_group(process)
+            try:
+                # What was printed before the kill is still there
+                output, errors = process.communicate(timeout=1)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                output, errors = "", ""
+            reason = "budget"
+    points = []
+    for line in output.splitlines():
+        try:
+            size, seconds = json.loads(line)
+        except ValueError:
+            continue
+        points.append((size, seconds))
+    return points, reason
+
+
+def _kill_group(process):
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def _last_line(text):
+    lines = text.strip().splitlines()
+    return lines[-1] if lines else ""
+
+
+def fit(points):
+    """Fits every model to (size, seconds) points; returns (name, confidence, {name: residual}).
+
+    Each model is t = a + b f(n) with b >= 0, fitted by least squares on
+    the relative error so that small and large sizes weigh the same. The
+    simplest model within TOLERANCE of the best fit wins; its confidence
+    is 1 - its residual over the best residual among the other models, so
+    0 when another model fits as well (and 1 when no other model fits).
+    Points must be in increasing size order.
+    """
+    import numpy as np
+
+    n = np.array([size for size, _ in points], dtype=float)
+    t = np.array([seconds for _, seconds in points], dtype=float)
+
+    def residual(f):
+        columns = [np.ones_like(n)] if f is None else [np.ones_like(n), f]
+        if not all(np.all(np.isfinite(column)) for column in columns):
+            return None     # c^N at sizes it plainly didn't take
+        design = np.column_stack(columns) / t[:, None]
+        coefficients, *_ = np.linalg.lstsq(design, np.ones_like(t), rcond=None)
+        if f is not None:
+            growth = coefficients[1] * f[-1]
+            if coefficients[1] < 0 or growth < MIN_GROWTH_SHARE * (coefficients[0] + growth):
+                return None
+        return float(np.sum((design @ coefficients - 1) ** 2))
+
+    residuals = {}
+    with np.errstate(over="ignore", invalid="ignore"):
+        for name, _, model in MODELS:
+            if model == "exponential":
+                fits = [r for r in (residual(np.power(base, n)) for base in EXPONENTIAL_BASES) if r is not None]
+                value = min(fits, default=None)
+            else:
+                value = residual(None if model is None else model(n, np))
+            if value is not None:
+                residuals[name] = value
+
+    best = min(residuals.values())
+    chosen = next(name for name, _, _ in MODELS if residuals.get(name, math.inf) <= best * (1 + TOLERANCE))
+    others = [value for name, value in residuals.items() if name != chosen]
+    confidence = 1 - residuals[chosen] / min(others) if others else 1.0
+    return chosen, max(0.0, confidence), residuals
+
+
+def verify(code, function=None, kind="list", budget=10.0, **options):
+    """Static verdict and empirical fit for one function of a Python snippet."""
+    name, arity = pick_function(code, function)
+    report = analyzer.analyze_report(code, "python")
+    static = next((f["complexity"] for f in report["functions"] if f["name"] == name), report["time_complexity"])
+
+    started = time.perf_counter()
+    points, reason = measure(code, name, arity, kind, budget, **options)
+    if len(points) < MIN_POINTS:
+        raise VerificationError(f"Only {len(points)} timings before stopping ({reason})")
+    empirical, confidence, residuals = fit(points)
+    return {
+        "function": name,
+        "static": static,
+        "empirical": empirical,
+        "confidence": round(confidence, 3),
+        "agrees": leading_order(static) == ORDERS[empirical],
+        "sizes": [points[0][0], points[-1][0]],
+        "points": len(points),
+        "stopped": reason,
+        "seconds": round(time.perf_counter() - started, 3),
+        "residuals": {m: round(r, 6) for m, r in residuals.items()},
+    }
+
+
+def _print(result, label=None):
+    if label is not None:
+        print(f"{label}: ", end="")
+    verdict = "agrees" if result["agrees"] else "DISAGREES"
+    print(
+        f"{result['function']}: static {result['static']}, measured {result['empirical']} "
+        f"(confidence {result['confidence']:.2f}, n = {result['sizes'][0]}..{result['sizes'][1]}, "
+        f"{result['points']} sizes, stopped: {result['stopped']}) {verdict}"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m verifier", description=__doc__.splitlines()[0])
+    parser.add_argument("input", help="Python file, or a JSONL corpus with --corpus")
+    parser.add_argument("--corpus", action="store_true", help="input is JSONL; verify each Python record")
+    parser.add_argument("--function", help="function to run (default: the first top-level one)")
+    parser.add_argument("--input", dest="kind", choices=INPUT_KINDS, default="list", help="what each argument is")
+    parser.add_argument("--budget", type=float, default=10.0, help="seconds per snippet (default: 10)")
+    parser.add_argument("--max-size", type=int, default=1 << 16, help="largest input size (default: 65536)")
+    parser.add_argument("--disagreements", action="store_true", help="only print results that disagree")
+    parser.add_argument("--min-confidence", type=float, default=0.5,
+                        help="with --disagreements, skip fits less confident than this (default: 0.5)")
+    parser.add_argument("--json", action="store_true", help="print results as JSON lines")
+    args = parser.parse_args(argv)
+    options = {"kind": args.kind, "budget": args.budget, "max_size": args.max_size}
+
+    if args.corpus:
+        snippets = [
+            (record_id, code)
+            for record_id, code, language, error in iter_jsonl(args.input, "code", "id", "python")
+            if error is None and analyzer.resolve_language(language, code) == "python"
+        ]
+    else:
+        with open(args.input, "r", encoding="utf8") as f:
+            snippets = [(None, f.read())]
+
+    failed = 0
+    for record_id, code in snippets:
+        try:
+            result = verify(code, args.function, **options)
+        except (VerificationError, SyntaxError) as e:
+            failed += 1
+            if args.json:
+                print(json.dumps({"id": record_id, "status": "error", "error": str(e)}))
+            elif not args.disagreements:
+                print(f"{record_id or args.input}: {e}", file=sys.stderr)
+            continue
+        if args.disagreements and (result["agrees"] or result["confidence"] < args.min_confidence):
+            continue
+        if args.json:
+            print(json.dumps({"id": record_id, "status": "success", **result}))
+        else:
+            _print(result, record_id)
+    if snippets and failed == len(snippets):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()